@@ -1,7 +1,8 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import chromadb
+from app.adapters.rag.chroma_cache import get_handle_cache
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -15,18 +16,37 @@ class RetrievedDoc:
     page: Optional[int] = None
 
 
+def _embedding_name(embedding_fn: Any) -> Optional[str]:
+    """캐시 키용 임베딩 모델 이름. id()는 GC 뒤 재사용될 수 있어 모델 이름이나 클래스 이름을 씁니다."""
+    if embedding_fn is None:
+        return None
+    for attr in ("model_name", "model", "_model_name"):
+        name = getattr(embedding_fn, attr, None)
+        if isinstance(name, str) and name:
+            return name
+    cls = type(embedding_fn)
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
 class ChromaAdapter:
     """Chroma DB에서 유사 문서를 검색하는 어댑터입니다."""
 
-    def __init__(self, persist_dir: str, embedding_fn=None):
+    def __init__(self, persist_dir: str, embedding_fn=None, embedding_model: Optional[str] = None):
         logger.info("ChromaAdapter 초기화: persist_dir=%s", persist_dir)
-        self._client = chromadb.PersistentClient(path=persist_dir)
+        self._persist_dir = persist_dir
+        self._cache = get_handle_cache(persist_dir)
         self._embedding_fn = embedding_fn
+        self._embedding_model = embedding_model or _embedding_name(embedding_fn)
+
+    @property
+    def _client(self):
+        return self._cache.get(("client",), lambda: chromadb.PersistentClient(path=self._persist_dir))
 
     def _open(self, collection_name: str):
-        return self._client.get_collection(
-            name=collection_name,
-            embedding_function=self._embedding_fn,
+        """컬렉션 핸들은 (이름, 임베딩 모델)마다 한 번만 열고, 인덱스 버전이 바뀔 때만 다시 엽니다."""
+        return self._cache.get(
+            ("collection", collection_name, self._embedding_model),
+            lambda: self._client.get_collection(name=collection_name, embedding_function=self._embedding_fn),
         )
 
     @staticmethod
@@ -34,6 +54,23 @@ class ChromaAdapter:
         """distance 값을 0~1 범위로 정규화된 유사도로 변환합니다."""
         return max(0.0, min(1.0, 1.0 - float(distance)))
 
+    def query_by_vector(self, collection_name: str, embedding: Sequence[float], top_k: int = 5) -> List[Tuple[str, float]]:
+        """미리 구한 질문 임베딩으로 상위 top_k개 (문서 id, 유사도)를 구합니다 (임베딩 호출 없음)."""
+        coll = self._open(collection_name)
+        result = coll.query(query_embeddings=[list(embedding)], n_results=top_k, include=["distances"])
+        return [(str(_id), self._to_similarity(dist)) for _id, dist in zip(result["ids"][0], result["distances"][0])]
+
+    def get_docs(self, collection_name: str, ids: Sequence[str]) -> Dict[str, RetrievedDoc]:
+        """id로 본문/메타데이터를 읽습니다. score는 채우지 않습니다(0)."""
+        if not ids:
+            return {}
+        got = self._open(collection_name).get(ids=list(ids), include=["documents", "metadatas"])
+        out: Dict[str, RetrievedDoc] = {}
+        for _id, doc, md in zip(got["ids"], got["documents"], got["metadatas"]):
+            md = md or {}
+            out[str(_id)] = RetrievedDoc(id=str(_id), content=doc, score=0.0, source=md.get("source"), page=md.get("page"))
+        return out
+
     def query_similar(self, collection_name: str, query_text: str, top_k: int = 5) -> List[RetrievedDoc]:
         """지정된 컬렉션에서 query_text와 유사한 문서를 검색합니다."""
         logger.info("Chroma 검색 실행: collection=%s, top_k=%d", collection_name, top_k)
@@ -0,0 +1,153 @@
+"""Chroma 핸들(클라이언트, 컬렉션, LangChain vectorstore/retriever) 프로세스 캐시.
+
+의료 질문마다 `Chroma(...)`/`get_collection`을 새로 만들면 persistent 디렉토리를 열고 인덱스를 읽는 비용을
+매번 냅니다. 여기서는 (persist_dir, 키)마다 핸들을 한 번만 만들어 스레드 사이에서 공유하고,
+디스크의 인덱스 버전이 바뀌었을 때만 새 핸들로 바꿔 끼웁니다(이전 핸들은 쓰던 요청이 끝나면 정리됨).
+
+인덱스 버전은 `<persist_dir>/index_version` 파일 내용(적재 스크립트가 쓰면 우선)이나, 없으면
+`chroma.sqlite3`(와 -wal)의 수정 시각·크기입니다. 확인은 CHROMA_VERSION_CHECK_S마다 한 번만 합니다.
+"""
+from __future__ import annotations
+import time
+from pathlib import Path
+from threading import RLock
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from app.core.config import config
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+VERSION_FILE = "index_version"
+
+
+def index_version(persist_dir: str) -> Optional[str]:
+    """디스크 인덱스의 버전 문자열. 인덱스가 아직 없으면 None."""
+    root = Path(persist_dir)
+    marker = root / VERSION_FILE
+    try:
+        return "v:" + marker.read_text(encoding="utf-8").strip()
+    except OSError:
+        pass
+    parts = []
+    for name in ("chroma.sqlite3", "chroma.sqlite3-wal"):
+        try:
+            st = (root / name).stat()
+        except OSError:
+            continue
+        parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+    return "|".join(parts) or None
+
+
+def _detach_chroma_system(persist_dir: str) -> None:
+    """이 경로의 chromadb 공유 System만 캐시에서 떼어 내, 다음에 만드는 클라이언트가 새 인덱스를 읽게 합니다.
+
+    chromadb는 같은 경로의 클라이언트끼리 System을 공유합니다. `clear_system_cache()`는 프로세스의 모든 System을
+    멈추므로 쓰지 않고, 떼어 낸 System도 멈추지 않습니다. 이전 핸들을 쥔 요청은 그대로 끝까지 검색하고,
+    마지막 핸들이 사라지면 함께 정리됩니다.
+    """
+    try:
+        from chromadb.api.shared_system_client import SharedSystemClient
+    except ImportError:
+        try:
+            from chromadb.api.client import SharedSystemClient
+        except ImportError:
+            return
+    systems = getattr(SharedSystemClient, "_identifier_to_system", None)
+    if not isinstance(systems, dict):
+        logger.warning("chromadb 공유 System 캐시를 찾지 못했습니다 (이전 인덱스를 계속 쓸 수 있음)")
+        return
+    for ident in {str(persist_dir), str(Path(persist_dir).resolve())}:
+        systems.pop(ident, None)
+
+
+class ChromaHandleCache:
+    """한 persist 디렉토리의 핸들 캐시. get(key, factory)는 키마다 factory를 한 번만 호출합니다."""
+
+    def __init__(self, persist_dir: str, check_interval_s: Optional[float] = None):
+        self.persist_dir = str(persist_dir)
+        self.check_interval_s = config.CHROMA_VERSION_CHECK_S if check_interval_s is None else check_interval_s
+        self._lock = RLock()
+        self._handles: Dict[Hashable, Any] = {}
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+        self.stats: Dict[str, Any] = {"hits": 0, "builds": 0, "refreshes": 0, "build_ms": 0.0}
+
+    def _check_version(self) -> None:
+        now = time.monotonic()
+        if self._handles and now - self._checked_at < self.check_interval_s:
+            return
+        self._checked_at = now
+        version = index_version(self.persist_dir)
+        if self._handles and version != self._version:
+            logger.info("Chroma 인덱스 버전 변경: %s -> %s, 핸들을 다시 만듭니다 (%s)", self._version, version, self.persist_dir)
+            self._swap()
+            self.stats["refreshes"] += 1
+        self._version = version
+
+    def _swap(self) -> None:
+        # 이전 핸들은 지우지 않고 새 표로 바꿔 끼웁니다. 이미 핸들을 받아 간 요청은 이전 인덱스로 마저 검색합니다
+        self._handles = {}
+        _detach_chroma_system(self.persist_dir)
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._check_version()
+            handle = self._handles.get(key)
+            if handle is not None:
+                self.stats["hits"] += 1
+                return handle
+            started = time.perf_counter()
+            handle = factory()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._handles[key] = handle
+            self.stats["builds"] += 1
+            self.stats["build_ms"] += elapsed_ms
+            # 핸들을 여는 과정에서 chroma가 sqlite에 쓸 수 있으므로 만든 뒤의 버전을 기준으로 삼습니다
+            self._version = index_version(self.persist_dir)
+            self._checked_at = time.monotonic()
+        logger.info("Chroma 핸들 생성: %s (%.1fms)", key, elapsed_ms)
+        return handle
+
+    def current_version(self) -> Optional[str]:
+        """확인 주기를 지켜 읽은 현재 인덱스 버전 (결과 캐시 키에 씁니다)."""
+        with self._lock:
+            self._check_version()
+            return self._version
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._swap()
+            self._version = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "persist_dir": self.persist_dir,
+                "version": self._version,
+                "handles": [repr(k) for k in self._handles],
+                **self.stats,
+                "build_ms": round(self.stats["build_ms"], 1),
+            }
+
+
+_caches: Dict[str, ChromaHandleCache] = {}
+_caches_lock = RLock()
+
+
+def get_handle_cache(persist_dir: str) -> ChromaHandleCache:
+    """persist 디렉토리별 프로세스 공용 캐시."""
+    key = str(Path(persist_dir).resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = ChromaHandleCache(persist_dir)
+        return cache
+
+
+def handle_cache_stats() -> List[Dict[str, Any]]:
+    with _caches_lock:
+        return [c.snapshot() for c in _caches.values()]
+
+
+__all__ = ["ChromaHandleCache", "get_handle_cache", "handle_cache_stats", "index_version", "VERSION_FILE"]
@@ -0,0 +1,145 @@
+"""정규화한 질문 기준의 검색 결과 캐시 (search_medical_sources 앞단).
+
+같은 의료 질문("임신 중 타이레놀 먹어도 돼?")이 사용자마다 반복되는데, 매번 OpenAI로 질문을 임베딩하고
+Chroma를 검색했습니다. 여기서는 두 단계로 캐시합니다.
+- 결과: (컬렉션, 인덱스 버전, 정규화 질문, k) -> 상위 k개 (문서 id, 점수). 인덱스가 바뀌면 키가 달라져 자연히 무효화됩니다.
+- 임베딩: (임베딩 모델, 정규화 질문) -> 질문 임베딩. 인덱스가 바뀌어 결과를 다시 검색할 때도 임베딩 호출은 건너뜁니다.
+
+둘 다 LRU + TTL로 내보내고 적중률을 `stats()`(/admin/rag/stats)로 보여 줍니다.
+"""
+from __future__ import annotations
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+Hit = Tuple[str, float]
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_query(text: str) -> str:
+    """캐시 키용 질문 정규화: 유니코드 NFKC, 대소문자 접기, 공백·구두점 제거.
+
+    띄어쓰기가 사람마다 달라("임신중"/"임신 중") 공백은 없앱니다. 조사와 어미는 뜻을 바꾸므로
+    ("타이레놀만"/"타이레놀도") 그대로 둡니다.
+    """
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return _NON_WORD.sub("", text)
+
+
+class _LRUTTL:
+    """OrderedDict 기반 LRU + TTL 저장소. 잠금은 호출하는 쪽(RetrievalCache)이 잡습니다."""
+
+    def __init__(self, maxsize: int, ttl_s: float):
+        self.maxsize = max(0, maxsize)
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = self.misses = self.expired = self.evicted = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        stored_at, value = item
+        if self.ttl_s > 0 and time.monotonic() - stored_at > self.ttl_s:
+            del self._data[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.maxsize:
+            return
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evicted += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+class RetrievalCache:
+    """질문 검색 결과(문서 id, 점수)와 질문 임베딩의 프로세스 캐시."""
+
+    def __init__(self, maxsize: int = 1024, ttl_s: float = 3600, embed_maxsize: int = 4096):
+        self._lock = Lock()
+        self._results = _LRUTTL(maxsize, ttl_s)
+        self._embeddings = _LRUTTL(embed_maxsize, ttl_s)
+        self.last_miss_ms = 0.0
+
+    def search(
+        self,
+        collection: str,
+        query: str,
+        k: int,
+        *,
+        version: Optional[str],
+        embed_model: str,
+        embed_fn: Callable[[str], Sequence[float]],
+        search_fn: Callable[[Sequence[float], int], List[Hit]],
+    ) -> List[Hit]:
+        """캐시된 상위 k개 (id, 점수)를 돌려주고, 없으면 embed_fn/search_fn으로 구해 저장합니다."""
+        norm = normalize_query(query)
+        if not norm:
+            return search_fn(embed_fn(query), k)
+        key = (collection, version, norm, k)
+        with self._lock:
+            hits = self._results.get(key)
+            embedding = None if hits is not None else self._embeddings.get((embed_model, norm))
+        if hits is not None:
+            logger.debug("검색 캐시 적중: collection=%s, k=%d", collection, k)
+            return list(hits)
+
+        started = time.perf_counter()
+        if embedding is None:
+            embedding = list(embed_fn(query))
+            with self._lock:
+                self._embeddings.put((embed_model, norm), embedding)
+        hits = list(search_fn(embedding, k))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._results.put(key, tuple(hits))
+            self.last_miss_ms = elapsed_ms
+        return hits
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._embeddings.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "results": self._results.snapshot(),
+                "embeddings": self._embeddings.snapshot(),
+                "last_miss_ms": round(self.last_miss_ms, 1),
+            }
+
+
+__all__ = ["RetrievalCache", "normalize_query"]
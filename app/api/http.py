@@ -1,19 +1,23 @@
 # app/api/http.py
 from __future__ import annotations
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from app.core.io_payload import InputEnvelope, OutputEnvelope, InputPayload, InputMetadata
 from app.core.logger import get_logger
 from app.core.pydantic_utils import safe_model_dump
 from app.graphs.main_graph import compile_app_graph
 from functools import lru_cache
 from app.core.state import AgentState
-from app.core.dependencies import get_diary_repo, get_chat_repo, get_profile_repo
+from app.core.dependencies import get_diary_repo, get_chat_repo, get_profile_repo, get_memory_index, get_snapshot_repo, get_search_repo
+from app.core.dependencies import get_async_activity_repo, get_async_chat_repo, get_async_diary_repo, get_async_persona_repo, get_async_profile_repo
+from app.core.db_executor import call_write, db_executor_stats
 from app.services.diary_repo import DiaryEntry
 from app.services.chat_repo import ChatLog
-from app.services.profile_repo import BabyProfile, MotherProfile
+from app.services import persona_repo
+from app.utils.db_utils import connection_stats
+from app.utils.schema import schema_status
 import json
+from typing import Any, Dict, Optional
 from pydantic import BaseModel
-from app.services.persona_repo import get_latest_child_persona, get_persona_summary
 from app.nodes.persona_agent_node import persona_agent_node
 from app.nodes.medical_qna_node import medical_qna_node
 from app.nodes.baby_smalltalk_node import baby_smalltalk_node
@@ -45,11 +49,7 @@ def get_app_graph():
 def chat(envelope: InputEnvelope) -> OutputEnvelope:
     # 이 세션에 대한 프로필이 존재하는지 확인합니다 (방어적 처리)
     try:
-        profile_repo = get_profile_repo()
-        if profile_repo.get_baby(envelope.session_id) is None:
-            profile_repo.upsert_baby(BabyProfile(session_id=envelope.session_id))
-        if profile_repo.get_mother(envelope.session_id) is None:
-            profile_repo.upsert_mother(MotherProfile(session_id=envelope.session_id))
+        call_write(get_profile_repo().ensure_profiles, envelope.session_id)
     except Exception:
         pass
 
@@ -58,7 +58,8 @@ def chat(envelope: InputEnvelope) -> OutputEnvelope:
     # Pydantic 모델에서 받은 metadata를 v1/v2 호환 plain dict로 정규화합니다
         user_meta = safe_model_dump(envelope.payload.metadata)
 
-        chat_repo.save_message(
+        call_write(
+            chat_repo.save_message,
             ChatLog(
                 session_id=envelope.session_id,
                 role="user",
@@ -70,6 +71,12 @@ def chat(envelope: InputEnvelope) -> OutputEnvelope:
     except Exception as e:
         logger.exception("사용자 메시지 저장 실패: %s", str(e))
 
+    # 대화 기억 검색이 임베딩 API를 기다리지 않도록 이번 메시지의 임베딩을 미리 계산해 둡니다
+    try:
+        get_memory_index().prefetch_query(envelope.payload.text)
+    except Exception:
+        logger.exception("대화 메모리 검색어 임베딩 예약 실패: session=%s", envelope.session_id)
+
     state_in = AgentState(session_id=envelope.session_id, input=envelope)
     state_out = AgentState(**get_app_graph().invoke(state_in))
 
@@ -90,7 +97,8 @@ def chat(envelope: InputEnvelope) -> OutputEnvelope:
                 "meta": res_meta,
             }
 
-            chat_repo.save_message(
+            call_write(
+                chat_repo.save_message,
                 ChatLog(
                     session_id=envelope.session_id,
                     role="assistant",
@@ -102,6 +110,13 @@ def chat(envelope: InputEnvelope) -> OutputEnvelope:
     except Exception as e:
         logger.exception("어시스턴트 메시지 저장 실패: %s", str(e))
 
+    # 이번 턴의 메시지를 백그라운드 배치로 세션 벡터 인덱스에 추가합니다 (write-behind면 기록 뒤 flush 리스너가 예약)
+    try:
+        if not get_chat_repo().write_behind:
+            get_memory_index().schedule(envelope.session_id)
+    except Exception:
+        logger.exception("대화 메모리 인덱싱 예약 실패: session=%s", envelope.session_id)
+
     return state_out.final or OutputEnvelope.err("INTERNAL_ERROR", "응답 생성 실패", retryable=False)
 
 
@@ -114,11 +129,7 @@ def chat_expert(envelope: InputEnvelope) -> OutputEnvelope:
     """
     # ensure profiles exist defensively
     try:
-        profile_repo = get_profile_repo()
-        if profile_repo.get_baby(envelope.session_id) is None:
-            profile_repo.upsert_baby(BabyProfile(session_id=envelope.session_id))
-        if profile_repo.get_mother(envelope.session_id) is None:
-            profile_repo.upsert_mother(MotherProfile(session_id=envelope.session_id))
+        call_write(get_profile_repo().ensure_profiles, envelope.session_id)
     except Exception:
         pass
 
@@ -156,9 +167,9 @@ class CombineFaceRequest(BaseModel):
 
 
 @router.post("/diary", response_model=dict)
-def save_diary(payload: DiarySaveRequest):
-    repo = get_diary_repo()
-    repo.save_diary(DiaryEntry(session_id=payload.session_id, date=payload.date, content=payload.content))
+async def save_diary(payload: DiarySaveRequest):
+    repo = get_async_diary_repo()
+    await repo.save_diary(DiaryEntry(session_id=payload.session_id, date=payload.date, content=payload.content))
     return {"ok": True, "date": payload.date}
 
 
@@ -226,55 +237,196 @@ def get_diary(session_id: str, target_date: str):
 
 
 @router.get("/chat/{session_id}/history", response_model=dict)
-def get_chat_history(session_id: str):
-    repo = get_chat_repo()
-    msgs = repo.get_session_messages(session_id)
-    return {"ok": True, "messages": [safe_model_dump(m) for m in msgs]}
+async def get_chat_history(
+    session_id: str,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    include_meta: bool = True,
+    day: Optional[str] = None,
+):
+    """대화 기록을 반환한다. 파라미터가 없으면 예전처럼 세션 전체를 반환한다.
+
+    before_id/after_id/limit/day 중 하나라도 주면 id 기준 키셋 페이지 하나를 반환한다. 이전 페이지는
+    next_before_id를, 이후 페이지는 next_after_id를 다음 요청에 넘기면 된다. day(YYYY-MM-DD)를 주면 그날 안에서만 넘긴다.
+    include_meta=false면 meta_json(리치 결과)을 비워서 담고, has_meta로 리치 결과 유무만 알린다.
+    """
+    from app.core.config import config
+
+    def dump(m) -> dict:
+        return {**safe_model_dump(m), "meta_json": m.meta_text() if include_meta else None, "has_meta": m.has_meta()}
+
+    repo = get_async_chat_repo()
+    if before_id is None and after_id is None and limit is None and day is None:
+        return {"ok": True, "messages": [dump(m) for m in await repo.get_session_messages(session_id)]}
+
+    limit = min(max(1, limit or config.CHAT_HISTORY_PAGE_SIZE), config.CHAT_HISTORY_MAX_PAGE_SIZE)
+    msgs, has_more = await repo.get_messages_page(
+        session_id, before_id=before_id, after_id=after_id, limit=limit, day=day
+    )
+    forward = after_id is not None and before_id is None
+    return {
+        "ok": True,
+        "messages": [dump(m) for m in msgs],
+        "has_more": has_more,
+        "next_before_id": msgs[0].id if msgs and has_more and not forward else None,
+        "next_after_id": msgs[-1].id if msgs and has_more and forward else None,
+    }
+
+
+# /history/{target_date}보다 먼저 선언해야 "count"가 날짜로 매칭되지 않습니다
+@router.get("/chat/{session_id}/history/count", response_model=dict)
+async def get_chat_history_count(session_id: str):
+    """세션 메시지 수와 첫/마지막 메시지 id를 반환한다."""
+    return {"ok": True, **(await get_async_chat_repo().count_messages(session_id))}
 
 
 @router.get("/chat/{session_id}/history/{target_date}", response_model=dict)
-def get_chat_history_by_date(session_id: str, target_date: str):
-    """특정 날짜(YYYY-MM-DD) 기준으로 메시지 조회"""
-    repo = get_chat_repo()
-    msgs = repo.get_messages_by_date(session_id, target_date)
-    return {"ok": True, "messages": [safe_model_dump(m) for m in msgs]}
+async def get_chat_history_by_date(session_id: str, target_date: str, include_meta: bool = True):
+    """특정 날짜(YYYY-MM-DD) 기준으로 메시지 조회 (include_meta=false면 meta_json은 비워서 반환)"""
+    from app.services.chat_repo import rows_to_dicts
+
+    rows = await get_async_chat_repo().get_rows_by_day_range(session_id, target_date, target_date)
+    return {"ok": True, "messages": rows_to_dicts(rows, include_meta=include_meta)}
+
+
+@router.get("/chat/{session_id}/message/{message_id}/result", response_model=dict)
+async def get_chat_message_result(session_id: str, message_id: int):
+    """메시지 한 건의 리치 결과(text, data, meta)를 풀어서 반환한다."""
+    msgs = await get_async_chat_repo().get_messages_by_ids(session_id, [message_id])
+    if not msgs:
+        raise HTTPException(status_code=404, detail="message not found")
+    m = msgs[0]
+    return {"ok": True, "id": m.id, "role": m.role, "result": m.decoded_meta()}
+
+
+@router.post("/chat/import", response_model=dict)
+async def import_chat_history(
+    request: Request,
+    format: Optional[str] = None,
+    session_id: Optional[str] = None,
+    tz: Optional[str] = None,
+    summarize: bool = True,
+    index: bool = True,
+):
+    """JSONL/CSV 대화 기록을 요청 본문에서 스트리밍으로 읽어 일괄 가져온다.
+
+    format이 없으면 Content-Type(text/csv면 csv)으로 정한다. session_id는 레코드에 세션이 없을 때 쓴다.
+    tz는 오프셋 없는 created_at의 시간대다(기본 KST).
+    버퍼(IMPORT_STREAM_BUFFER_KB)가 찰 때마다 writer 스레드에서 파싱·검증·기록하며, 잘못된 행은 건너뛰고 개수와 예시를 돌려준다.
+    """
+    from app.core.config import config
+    from app.core.db_executor import run_write
+    from app.services.chat_import import ChatImporter, RecordParser
+
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "jsonl")
+    try:
+        parser = RecordParser(fmt)
+        importer = ChatImporter(default_session=session_id, tz=tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    limit = max(1, config.IMPORT_STREAM_BUFFER_KB) * 1024
+    buf, size = [], 0
+    async for data in request.stream():
+        buf.append(data)
+        size += len(data)
+        if size >= limit:
+            block, buf, size = b"".join(buf), [], 0
+            await run_write(lambda b=block: importer.feed(parser.feed(b)))
+    block = b"".join(buf)
+    await run_write(lambda: importer.feed(parser.feed(block, final=True)))
+    return await run_write(importer.finish, summarize=summarize, index=index)
 
 
 @router.post("/profile/init/{session_id}", response_model=dict)
-def init_profile(session_id: str):
+async def init_profile(session_id: str):
     """Create baby and mother profile records for the given session_id if they don't exist."""
-    repo = get_profile_repo()
-    created = {"baby": False, "mother": False}
-    try:
-        if repo.get_baby(session_id) is None:
-            repo.upsert_baby(BabyProfile(session_id=session_id))
-            created["baby"] = True
-    except Exception:
-        pass
+    created = await get_async_profile_repo().ensure_profiles(session_id)
+    return {"ok": True, "created": created}
 
-    try:
-        if repo.get_mother(session_id) is None:
-            repo.upsert_mother(MotherProfile(session_id=session_id))
-            created["mother"] = True
-    except Exception:
-        pass
 
-    return {"ok": True, "created": created}
+@router.get("/session/{session_id}/bootstrap", response_model=dict)
+def session_bootstrap(session_id: str, target_date: Optional[str] = None):
+    """화면 초기화용 세션 데이터(프로필, 최신 페르소나, 요약, 일기 상태, 최근 대화)를 한 번에 반환한다.
+
+    세션 스냅샷 한 행에서 읽으며, 스냅샷이 없거나 프로필이 비어 있으면 프로필을 만들고 다시 구성한다.
+    """
+    from datetime import date
+
+    target_date = target_date or date.today().isoformat()
+    snapshots = get_snapshot_repo()
+    data = snapshots.bootstrap(session_id, target_date)
+    if data["baby"] is None or data["mother"] is None:
+        # init_profile을 대신합니다. 새로 만든 프로필은 upsert 경로에서 스냅샷에 반영됩니다
+        call_write(get_profile_repo().ensure_profiles, session_id)
+        data = snapshots.bootstrap(session_id, target_date)
+    # 스냅샷의 페르소나는 DB 기준이므로, 이 워커의 페르소나 캐시가 뒤처져 있으면 맞춥니다
+    persona_repo.observe_child_persona(session_id, data.get("persona"))
+    return {"ok": True, "session_id": session_id, **data}
+
+
+@router.get("/session/{session_id}/calendar", response_model=dict)
+async def session_calendar(session_id: str, month: Optional[str] = None):
+    """month(YYYY-MM, 기본: 이번 달 KST)에 대화나 일기가 있는 날짜를 daily_activity 한 번의 범위 조회로 반환한다."""
+    import re
+    from datetime import datetime
+    from app.services.chat_repo import KST
+
+    month = month or datetime.now(KST).strftime("%Y-%m")
+    if not re.fullmatch(r"\d{4}-\d{2}", month):
+        raise HTTPException(status_code=400, detail="month must be YYYY-MM")
+    days = await get_async_activity_repo().get_month(session_id, month)
+    return {
+        "ok": True,
+        "month": month,
+        "days": [d._asdict() for d in days],
+        "chat_days": [d.day for d in days if d.user_msgs or d.assistant_msgs],
+        "diary_days": [d.day for d in days if d.has_diary],
+    }
+
+
+@router.get("/session/{session_id}/export")
+def export_session(session_id: str, gzip: bool = False, tables: Optional[str] = None):
+    """세션의 대화/일기/프로필/페르소나를 NDJSON으로 스트리밍 내보낸다.
+
+    gzip=true면 .ndjson.gz로 압축해 보낸다. tables는 쉼표로 구분한 레코드 type(chat, diary 등)으로 범위를 제한한다.
+    """
+    from fastapi.responses import StreamingResponse
+    from app.core.config import config
+    from app.services.export_repo import iter_session_export, gzip_stream, batch_lines
+
+    # 쓰기 지연 버퍼에 남은 대화도 내보내기에 포함되도록 먼저 기록합니다
+    get_chat_repo().flush()
+    only = [t.strip() for t in tables.split(",") if t.strip()] if tables else None
+    lines = iter_session_export(str(config.DB_PATH), session_id, only)
+    filename = f"{session_id}.ndjson"
+    if gzip:
+        return StreamingResponse(
+            gzip_stream(lines),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.gz"'},
+        )
+    return StreamingResponse(
+        batch_lines(lines),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/profile/{session_id}", response_model=dict)
-def get_profile(session_id: str):
+async def get_profile(session_id: str):
     """Return baby and mother profiles plus latest persona and today's summary."""
+    personas = get_async_persona_repo()
     try:
-        repo = get_profile_repo()
-        baby = repo.get_baby(session_id)
-        mother = repo.get_mother(session_id)
+        repo = get_async_profile_repo()
+        baby = await repo.get_baby(session_id)
+        mother = await repo.get_mother(session_id)
     except Exception:
         baby = None
         mother = None
 
     try:
-        persona = get_latest_child_persona(session_id)
+        persona = await personas.get_latest_child_persona(session_id)
     except Exception:
         persona = None
 
@@ -282,7 +434,7 @@ def get_profile(session_id: str):
         from datetime import date
 
         today = date.today().isoformat()
-        summary = get_persona_summary(session_id, today)
+        summary = await personas.get_persona_summary(session_id, today)
     except Exception:
         summary = None
 
@@ -296,10 +448,11 @@ def get_profile(session_id: str):
 
 
 @router.get("/persona/{session_id}", response_model=dict)
-def get_persona(session_id: str):
+async def get_persona(session_id: str):
     """세션의 최신 페르소나와 최신 요약을 반환한다."""
+    personas = get_async_persona_repo()
     try:
-        persona = get_latest_child_persona(session_id)
+        persona = await personas.get_latest_child_persona(session_id)
     except Exception:
         persona = None
 
@@ -308,14 +461,14 @@ def get_persona(session_id: str):
         from datetime import date
 
         today = date.today().isoformat()
-        summary = get_persona_summary(session_id, today)
+        summary = await personas.get_persona_summary(session_id, today)
     except Exception:
         summary = None
 
     try:
-        profile_repo = get_profile_repo()
-        baby = profile_repo.get_baby(session_id)
-        mother = profile_repo.get_mother(session_id)
+        profile_repo = get_async_profile_repo()
+        baby = await profile_repo.get_baby(session_id)
+        mother = await profile_repo.get_mother(session_id)
         baby_dump = safe_model_dump(baby) if baby else None
         mother_dump = safe_model_dump(mother) if mother else None
     except Exception:
@@ -331,6 +484,12 @@ def get_persona(session_id: str):
     }
 
 
+@router.get("/persona/{session_id}/versions", response_model=dict)
+async def get_persona_versions(session_id: str, limit: int = 20):
+    """세션의 페르소나 버전 이력(최신순)을 반환한다."""
+    return {"ok": True, "versions": await get_async_persona_repo().list_child_persona_versions(session_id, limit=limit)}
+
+
 @router.post("/persona/{session_id}/refresh", response_model=dict)
 def refresh_persona(session_id: str, background: bool = True):
     """페르소나 재생성 트리거.
@@ -356,3 +515,113 @@ def refresh_persona(session_id: str, background: bool = True):
             return {"ok": True, "triggered": "sync"}
         except Exception:
             raise HTTPException(status_code=500, detail="failed to run persona generation")
+
+
+def _run_search(q: str, session_id: Optional[str], types: str, limit: int) -> Dict[str, Any]:
+    limit = max(1, min(int(limit), 100))
+    chat_repo = get_chat_repo()
+    if chat_repo.pending_count():
+        # 방금 저장한 대화도 검색되도록 쓰기 지연 버퍼를 먼저 기록합니다
+        chat_repo.flush()
+    wanted = tuple(t.strip() for t in types.split(",") if t.strip())
+    return {"ok": True, **get_search_repo().search(q, session_id=session_id, types=wanted, limit=limit)}
+
+
+@router.get("/search", response_model=dict)
+def search(q: str, session_id: str, types: str = "chat,diary", limit: int = 20):
+    """한 세션의 대화/일기 전문 검색. 공백으로 구분한 검색어를 모두 포함하는 결과를 관련도 순으로 반환한다."""
+    if not session_id.strip():
+        raise HTTPException(status_code=422, detail="session_id is required")
+    return _run_search(q, session_id, types, limit)
+
+
+@router.get("/admin/search", response_model=dict)
+def admin_search(q: str, session_id: Optional[str] = None, types: str = "chat,diary", limit: int = 20):
+    """운영용 전문 검색. session_id를 빼면 모든 세션에서 찾는다."""
+    return _run_search(q, session_id, types, limit)
+
+
+@router.post("/admin/chat/compact", response_model=dict)
+def compact_chat_logs(older_than_days: Optional[int] = None, session_id: Optional[str] = None, background: bool = True):
+    """오래된 대화를 세션·월별 압축 세그먼트로 옮긴다. 기본은 백그라운드로 실행한다."""
+    from app.core.config import config
+    from app.core.background import submit_background
+    from app.services.chat_archive import compact_chat_logs as compact
+
+    if background:
+        submit_background(compact, str(config.DB_PATH), older_than_days, session_id)
+        return {"ok": True, "triggered": "background"}
+    return compact(str(config.DB_PATH), older_than_days, session_id)
+
+
+@router.get("/admin/chat/archive", response_model=dict)
+def chat_archive_stats():
+    """압축 보관 세그먼트 통계(세그먼트/세션/행 수, 원본 대비 압축률)."""
+    from app.core.config import config
+    from app.services.chat_archive import archive_stats
+
+    return {"ok": True, **archive_stats(str(config.DB_PATH))}
+
+
+@router.get("/admin/db/stats", response_model=dict)
+def db_stats():
+    """SQLite 커넥션 재사용 통계, PRAGMA 설정, 확인된 스키마 버전, async DB 실행기 대기/실행 시간을 반환한다."""
+    return {"ok": True, "connections": connection_stats(), "schema": schema_status(), "executor": db_executor_stats()}
+
+
+@router.get("/admin/db/shards", response_model=dict)
+def db_shards():
+    """샤드별 파일 크기, 세션 수, 대화/일기 행 수(샤드마다 동시에 조회해 합산)."""
+    from app.core.config import config
+    from app.utils.db_utils import shard_stats
+
+    return {"ok": True, **shard_stats(str(config.DB_PATH))}
+
+
+@router.post("/admin/db/backup", response_model=dict)
+def backup_db(background: bool = True, pages: Optional[int] = None, sleep_ms: Optional[int] = None):
+    """SQLite 온라인 백업 스냅샷을 만든다(샤딩 모드면 모든 샤드). 기본은 백그라운드로 실행하며 결과는 /admin/db/backups에서 본다."""
+    from app.core.background import submit_background
+    from app.utils.backup import backup_all
+
+    if background:
+        submit_background(backup_all, pages=pages, sleep_ms=sleep_ms)
+        return {"ok": True, "triggered": "background"}
+    return backup_all(pages=pages, sleep_ms=sleep_ms)
+
+
+@router.post("/admin/db/retention", response_model=dict)
+def enforce_db_retention(background: bool = True, dry_run: bool = False, vacuum: bool = True):
+    """보존 정책(RETENTION_*)으로 오래된 행을 작은 배치로 지우고 증분 VACUUM으로 빈 공간을 돌려준다. dry_run이면 지울 행 수만 센다."""
+    from app.core.background import submit_background
+    from app.services.retention import enforce_retention
+
+    if background and not dry_run:
+        submit_background(enforce_retention, dry_run=False, vacuum=vacuum)
+        return {"ok": True, "triggered": "background"}
+    return enforce_retention(dry_run=dry_run, vacuum=vacuum)
+
+
+@router.get("/admin/db/retention", response_model=dict)
+def db_retention_stats():
+    """보존 정책 설정, 샤드별 파일/빈 공간 크기(auto_vacuum 모드 포함), 최근 실행 결과."""
+    from app.services.retention import retention_stats
+
+    return {"ok": True, **retention_stats()}
+
+
+@router.get("/admin/db/backups", response_model=dict)
+def list_db_backups():
+    """백업 스냅샷 목록과 이 프로세스의 최근 백업 지표(소요 시간, 처리량, 단계별 최대 복사 시간)."""
+    from app.utils.backup import backup_stats, list_all_backups
+
+    return {"ok": True, "backups": list_all_backups(), **backup_stats()}
+
+
+@router.get("/admin/rag/stats", response_model=dict)
+def rag_stats():
+    """Chroma 핸들 캐시 상태(인덱스 버전, 재사용/생성/재생성 횟수)와 검색 결과·질문 임베딩 캐시 적중률."""
+    from app.adapters.rag.chroma_cache import handle_cache_stats
+    from app.core.dependencies import get_retrieval_cache
+
+    return {"ok": True, "handles": handle_cache_stats(), "retrieval": get_retrieval_cache().stats()}
@@ -0,0 +1,104 @@
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import config
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 요청 경로를 막지 않도록 임베딩/요약 같은 후처리 작업을 실행하는 공용 스레드 풀입니다.
+# import 시점에 스레드를 만들지 않도록 첫 제출 시 지연 생성합니다.
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = Lock()
+# 주기 작업: 이름 -> (스레드, 중지 이벤트). 오래 걸리는 정리 작업이 풀 작업자를 붙잡지 않도록 전용 스레드에서 돕니다.
+_periodic: Dict[str, Tuple[Thread, Event]] = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=config.BACKGROUND_WORKERS,
+                thread_name_prefix="bg",
+            )
+        return _executor
+
+
+def submit_background(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """fn을 백그라운드 스레드에서 실행합니다. 예외는 로깅만 하고 삼킵니다."""
+    name = getattr(fn, "__qualname__", repr(fn))
+
+    def _run():
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            logger.exception("백그라운드 작업 실패: %s", name)
+            return None
+
+    return _get_executor().submit(_run)
+
+
+def schedule_periodic(
+    name: str,
+    interval_s: float,
+    fn: Callable[..., Any],
+    *args: Any,
+    initial_delay_s: Optional[float] = None,
+    **kwargs: Any,
+) -> bool:
+    """fn을 interval_s마다 데몬 스레드에서 실행합니다. 같은 name이 이미 돌고 있으면 등록하지 않고 False를 반환합니다.
+
+    첫 실행은 initial_delay_s(기본: interval_s) 뒤이며, 예외는 로깅만 하고 다음 주기에 다시 실행합니다.
+    """
+    if interval_s <= 0:
+        return False
+    with _lock:
+        entry = _periodic.get(name)
+        if entry is not None and entry[0].is_alive():
+            return False
+        stop = Event()
+
+        def _loop():
+            delay = interval_s if initial_delay_s is None else initial_delay_s
+            while not stop.wait(delay):
+                try:
+                    fn(*args, **kwargs)
+                except Exception:
+                    logger.exception("주기 작업 실패: %s", name)
+                delay = interval_s
+
+        thread = Thread(target=_loop, name=f"periodic-{name}", daemon=True)
+        _periodic[name] = (thread, stop)
+    thread.start()
+    logger.info("주기 작업 등록: %s (every %.0fs)", name, interval_s)
+    return True
+
+
+def stop_periodic(name: Optional[str] = None, timeout: float = 5.0) -> None:
+    """주기 작업을 멈춥니다(name이 없으면 전부). 실행 중인 회차는 끝날 때까지 최대 timeout초 기다립니다."""
+    with _lock:
+        names = [name] if name else list(_periodic)
+        entries = [_periodic.pop(n) for n in names if n in _periodic]
+    for _, stop in entries:
+        stop.set()
+    for thread, _ in entries:
+        thread.join(timeout)
+
+
+def shutdown_background(wait: bool = True, cancel_pending: bool = False) -> None:
+    """애플리케이션 종료 시 주기 작업을 멈추고 대기 중인 백그라운드 작업을 정리합니다.
+
+    cancel_pending이면 아직 시작하지 않은 작업은 버리고, wait이면 실행 중인 작업이 끝날 때까지 기다립니다.
+    """
+    global _executor
+    stop_periodic(timeout=5.0 if wait else 0.5)
+    with _lock:
+        ex, _executor = _executor, None
+    if ex is not None:
+        ex.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+
+__all__ = ["submit_background", "schedule_periodic", "stop_periodic", "shutdown_background"]
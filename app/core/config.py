@@ -11,8 +11,33 @@ class AppConfig:
     
     CHROMA_DIR = STORAGE_DIR / "chroma"
     CHROMA_COLLECTION = ""
+    # Chroma 핸들 캐시(app.adapters.rag.chroma_cache): 디스크 인덱스 버전 확인 주기(초)
+    CHROMA_VERSION_CHECK_S = float(os.getenv("CHROMA_VERSION_CHECK_S", "5"))
+    # 시작 시 미리 열어 둘 컬렉션 (쉼표 구분, 비우면 첫 질문 때 엽니다)
+    CHROMA_WARMUP_COLLECTIONS = [c.strip() for c in os.getenv("CHROMA_WARMUP_COLLECTIONS", "").split(",") if c.strip()]
+    # 검색 결과 캐시(app.adapters.rag.retrieval_cache): 결과/질문 임베딩 최대 개수, TTL(초, 0이면 만료 없음)
+    RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+    RETRIEVAL_EMBED_CACHE_SIZE = int(os.getenv("RETRIEVAL_EMBED_CACHE_SIZE", "4096"))
+    RETRIEVAL_CACHE_TTL_S = float(os.getenv("RETRIEVAL_CACHE_TTL_S", "3600"))
 
     DB_PATH = STORAGE_DIR / "db" / "app.db"
+    # 세션 샤딩: 1보다 크면 세션을 DB_PATH(샤드 0)와 app_s01.db ... 파일로 나눠 저장합니다.
+    # 세션 -> 샤드 배치는 이 값에 따라 정해지므로 운영 중에 바꾸지 않습니다.
+    DB_SHARDS = max(1, int(os.getenv("DB_SHARDS", "1")))
+
+    # SQLite 커넥션 설정 (스레드별 재사용 커넥션에 적용)
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+    DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+    DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+    DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+    # async 저장소 파사드(app.core.db_executor): 읽기 전용 스레드 수. 쓰기는 단일 writer 스레드입니다
+    DB_READ_WORKERS = int(os.getenv("DB_READ_WORKERS", "4"))
+
+    # 온라인 백업 (sqlite3 backup API): 한 단계에 복사할 페이지 수, 단계 사이 쉬는 시간, 보관 개수
+    BACKUP_DIR = Path(os.getenv("BACKUP_DIR", str(STORAGE_DIR / "backups")))
+    BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+    BACKUP_STEP_SLEEP_MS = int(os.getenv("BACKUP_STEP_SLEEP_MS", "5"))
+    BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
 
     # OpenAI
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -21,6 +46,50 @@ class AppConfig:
     DEFAULT_LLM_MODEL = "gpt-4o-mini"
     DEFAULT_EMBED_MODEL = "text-embedding-3-small"
 
+    # Background jobs
+    BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "2"))
+
+    # Semantic chat memory (세션별 벡터 인덱스)
+    MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "4"))
+    MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "4"))
+    MEMORY_EMBED_BATCH = int(os.getenv("MEMORY_EMBED_BATCH", "64"))
+    MEMORY_CACHE_SESSIONS = int(os.getenv("MEMORY_CACHE_SESSIONS", "256"))
+
+    # Chat log write-behind (그룹 커밋). 기본은 동기 저장입니다.
+    CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+    CHAT_FLUSH_INTERVAL_MS = int(os.getenv("CHAT_FLUSH_INTERVAL_MS", "20"))
+    CHAT_FLUSH_BATCH = int(os.getenv("CHAT_FLUSH_BATCH", "256"))
+
+    # Chat history 페이지 크기 (키셋 페이지네이션)
+    CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "50"))
+    CHAT_HISTORY_MAX_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_MAX_PAGE_SIZE", "500"))
+
+    # Chat log cold storage: 이 일수보다 오래된 대화를 세션·월별 압축 세그먼트로 옮깁니다 (0이면 끔)
+    CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", "90"))
+    CHAT_ARCHIVE_ZLIB_LEVEL = int(os.getenv("CHAT_ARCHIVE_ZLIB_LEVEL", "6"))
+
+    # chat meta_json 압축 기준: 중복 제거 후 JSON이 이 바이트 이상이면 zlib BLOB으로 저장합니다 (0이면 끔)
+    CHAT_META_COMPRESS_MIN_BYTES = int(os.getenv("CHAT_META_COMPRESS_MIN_BYTES", "512"))
+
+    # 대화 일괄 가져오기: 파일은 이 행 수마다, HTTP 스트림은 이만큼(KiB) 모일 때마다 한 트랜잭션으로 기록합니다
+    IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "20000"))
+    IMPORT_STREAM_BUFFER_KB = int(os.getenv("IMPORT_STREAM_BUFFER_KB", "4096"))
+
+    # 최신 페르소나 프로세스 캐시: 이 시간(초)이 지난 항목은 읽을 때 DB의 최신 버전과 다시 비교합니다(다중 워커 대비)
+    PERSONA_CACHE_REVALIDATE_S = float(os.getenv("PERSONA_CACHE_REVALIDATE_S", "30"))
+
+    # Session bootstrap snapshot (세션 스냅샷에 유지할 최근 대화 수)
+    SNAPSHOT_RECENT_TURNS = int(os.getenv("SNAPSHOT_RECENT_TURNS", "8"))
+
+    # 보존 정책 / 증분 VACUUM (app.services.retention). 삭제 정책은 0이면 끕니다
+    RETENTION_INTERVAL_MIN = int(os.getenv("RETENTION_INTERVAL_MIN", "360"))  # 서버 백그라운드 주기 (0이면 끔)
+    RETENTION_CHAT_DAYS = int(os.getenv("RETENTION_CHAT_DAYS", "0"))  # 일기/요약이 끝난 원본 대화를 이 일수 후 삭제
+    RETENTION_PERSONA_VERSIONS_KEEP = int(os.getenv("RETENTION_PERSONA_VERSIONS_KEEP", "0"))  # 세션별 최근 N개 버전만 유지
+    RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+    RETENTION_BATCH_SLEEP_MS = int(os.getenv("RETENTION_BATCH_SLEEP_MS", "10"))
+    VACUUM_PAGES_PER_STEP = int(os.getenv("VACUUM_PAGES_PER_STEP", "256"))
+    VACUUM_MAX_STEPS = int(os.getenv("VACUUM_MAX_STEPS", "200"))  # 한 번 실행에서 돌릴 최대 단계 수 (0이면 끝까지)
+
     # Environment
     ENV = os.getenv("ENV", "dev")
 
@@ -0,0 +1,170 @@
+"""async 코드에서 SQLite 저장소를 부르기 위한 전용 DB 실행기.
+
+`async def` 엔드포인트/노드에서 동기 저장소를 그대로 부르면 이벤트 루프가 막힙니다. 여기서는
+- 읽기: DB_READ_WORKERS개 스레드의 전용 풀 (스레드마다 get_connection의 재사용 커넥션을 씁니다)
+- 쓰기: 단일 writer 스레드 (쓰기를 한 줄로 세워 SQLite 쓰기 잠금 경합과 busy 대기를 없앱니다)
+에서 실행하고 결과를 await로 돌려줍니다. 요청 스레드 풀(anyio)이나 백그라운드 풀과 섞이지 않습니다.
+동기 엔드포인트와 백그라운드 작업의 짧은 쓰기도 `call_write`로 같은 writer 스레드에 세웁니다.
+
+제출부터 실행 시작까지의 대기 시간(queue), 실행 시간(run), 대기 중 작업 수를 종류별로 모아
+`db_executor_stats()`(/admin/db/stats)로 보여 줍니다.
+"""
+from __future__ import annotations
+import asyncio
+import functools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, current_thread
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+from app.core.config import config
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+_T = TypeVar("_T")
+_SAMPLES = 1024
+
+_lock = Lock()
+_pools: Dict[str, ThreadPoolExecutor] = {}
+
+
+class _Metrics:
+    __slots__ = ("submitted", "completed", "failed", "pending", "queue_ms", "run_ms", "max_queue_ms", "max_run_ms")
+
+    def __init__(self) -> None:
+        self.submitted = self.completed = self.failed = self.pending = 0
+        self.queue_ms: Deque[float] = deque(maxlen=_SAMPLES)
+        self.run_ms: Deque[float] = deque(maxlen=_SAMPLES)
+        self.max_queue_ms = self.max_run_ms = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        q, r = sorted(self.queue_ms), sorted(self.run_ms)
+
+        def pct(xs, p):
+            return round(xs[min(len(xs) - 1, int(len(xs) * p))], 3) if xs else None
+
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "pending": self.pending,
+            "queue_ms": {"p50": pct(q, 0.5), "p95": pct(q, 0.95), "max": round(self.max_queue_ms, 3)},
+            "run_ms": {"p50": pct(r, 0.5), "p95": pct(r, 0.95), "max": round(self.max_run_ms, 3)},
+        }
+
+
+_metrics: Dict[str, _Metrics] = {"read": _Metrics(), "write": _Metrics()}
+
+
+def _pool(kind: str) -> ThreadPoolExecutor:
+    with _lock:
+        pool = _pools.get(kind)
+        if pool is None:
+            workers = max(1, config.DB_READ_WORKERS) if kind == "read" else 1
+            pool = _pools[kind] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"db-{kind}")
+        return pool
+
+
+def _timed(kind: str, fn: Callable[..., _T], args: tuple, kwargs: dict) -> Callable[[], _T]:
+    m = _metrics[kind]
+    submitted = time.perf_counter()
+    with _lock:
+        m.submitted += 1
+        m.pending += 1
+
+    def _call() -> _T:
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = fn(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            done = time.perf_counter()
+            queue_ms, run_ms = (started - submitted) * 1000, (done - started) * 1000
+            with _lock:
+                m.pending -= 1
+                m.completed += ok
+                m.failed += not ok
+                m.queue_ms.append(queue_ms)
+                m.run_ms.append(run_ms)
+                m.max_queue_ms = max(m.max_queue_ms, queue_ms)
+                m.max_run_ms = max(m.max_run_ms, run_ms)
+
+    return _call
+
+
+async def _run(kind: str, fn: Callable[..., _T], args: tuple, kwargs: dict) -> _T:
+    return await asyncio.get_running_loop().run_in_executor(_pool(kind), _timed(kind, fn, args, kwargs))
+
+
+async def run_read(fn: Callable[..., _T], *args: Any, **kwargs: Any) -> _T:
+    """fn을 읽기 풀에서 실행하고 결과를 기다립니다."""
+    return await _run("read", fn, args, kwargs)
+
+
+async def run_write(fn: Callable[..., _T], *args: Any, **kwargs: Any) -> _T:
+    """fn을 단일 writer 스레드에서 실행하고 결과를 기다립니다. 쓰기는 제출 순서대로 하나씩 실행됩니다."""
+    return await _run("write", fn, args, kwargs)
+
+
+def call_write(fn: Callable[..., _T], *args: Any, **kwargs: Any) -> _T:
+    """동기 코드용 run_write. fn을 writer 스레드에서 실행하고 끝날 때까지 기다립니다.
+
+    writer 스레드 안에서 다시 부르면(쓰기 함수가 다른 쓰기를 부르는 경우) 교착을 피하려고 바로 실행합니다.
+    """
+    if current_thread().name.startswith("db-write"):
+        return fn(*args, **kwargs)
+    return _pool("write").submit(_timed("write", fn, args, kwargs)).result()
+
+
+class AsyncFacade:
+    """동기 저장소(객체 또는 모듈)를 감싸 지정한 메서드를 async로 노출합니다.
+
+    reads에 있는 이름은 읽기 풀, writes에 있는 이름은 writer 스레드에서 실행됩니다. 그 밖의 이름은 노출하지 않습니다.
+    """
+
+    def __init__(self, target: Any, reads: tuple = (), writes: tuple = ()):
+        self._target = target
+        self._kinds = {**{n: "read" for n in reads}, **{n: "write" for n in writes}}
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        kind = self.__dict__.get("_kinds", {}).get(name)
+        if kind is None:
+            raise AttributeError(name)
+        fn = getattr(self._target, name)
+
+        @functools.wraps(fn)
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await _run(kind, fn, args, kwargs)
+
+        return call
+
+    @property
+    def sync(self) -> Any:
+        """감싼 동기 저장소."""
+        return self._target
+
+
+def db_executor_stats() -> Dict[str, Any]:
+    """읽기/쓰기 실행기의 작업 수와 대기(queue)/실행 시간 분포(최근 샘플 기준)."""
+    with _lock:
+        out = {kind: m.snapshot() for kind, m in _metrics.items()}
+        out["read"]["workers"] = max(1, config.DB_READ_WORKERS)
+        out["write"]["workers"] = 1
+        out["started"] = sorted(_pools)
+    return out
+
+
+def shutdown_db_executor(wait: bool = True) -> None:
+    """애플리케이션 종료 시 호출합니다. 대기 중인 쓰기는 wait=True면 끝까지 실행합니다."""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
+
+
+__all__ = ["run_read", "run_write", "call_write", "AsyncFacade", "db_executor_stats", "shutdown_db_executor"]
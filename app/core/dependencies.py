@@ -2,13 +2,22 @@ from __future__ import annotations
 import os
 from functools import lru_cache
 from typing import Optional
-from typing import Optional
 
 from app.adapters.llm.openai_adapter import OpenAIAdapter
 from app.services.profile_repo import ProfileRepository
 from app.services.diary_repo import DiaryRepository
 from app.services.chat_repo import ChatRepository
+from app.services.memory_repo import ChatMemoryIndex
+from app.services.snapshot_repo import SnapshotRepository
+from app.services.search_repo import SearchRepository
+from app.services.activity_repo import ActivityRepository
 from app.core.config import config
+from app.core.db_executor import AsyncFacade
+from app.core.logger import get_logger
+from app.adapters.rag.chroma_cache import get_handle_cache
+from app.adapters.rag.retrieval_cache import RetrievalCache
+
+logger = get_logger(__name__)
 
 # 주의: import 시점에 무거운 어댑터/서비스 인스턴스를 생성하지 마세요.
 # 아래의 지연 생성(getter)을 사용해 import-time 부작용을 피하고 테스트를 용이하게 합니다.
@@ -30,27 +39,55 @@ def get_chroma_vectorstore(collection_name: Optional[str]):
     """
     LangChain Chroma VectorStore.
     OpenAIAdapter.get_embedding_model() 이 반환하는 OpenAIEmbeddings(LC 규격)를 그대로 사용.
+    컬렉션마다 한 번만 만들어 공유하고, 디스크 인덱스 버전이 바뀔 때만 다시 만듭니다 (chroma_cache).
     """
-    coll = collection_name
-    oa = get_openai()
-    embeddings = oa.get_embedding_model(model=DEFAULT_EMBED_MODEL)  # ⬅️ 직접 사용
-    # 무거운 의존성은 지연 임포트하여 import 시점 부작용을 방지합니다
-    from langchain_community.vectorstores import Chroma
-
-    return Chroma(
-        collection_name=coll,
-        persist_directory=str(CHROMA_DIR),
-        embedding_function=embeddings,
-    )
+    def build():
+        oa = get_openai()
+        embeddings = oa.get_embedding_model(model=DEFAULT_EMBED_MODEL)  # ⬅️ 직접 사용
+        # 무거운 의존성은 지연 임포트하여 import 시점 부작용을 방지합니다
+        from langchain_community.vectorstores import Chroma
+
+        return Chroma(
+            collection_name=collection_name,
+            persist_directory=str(CHROMA_DIR),
+            embedding_function=embeddings,
+        )
+
+    return get_handle_cache(str(CHROMA_DIR)).get(("vectorstore", collection_name, DEFAULT_EMBED_MODEL), build)
+
+@lru_cache(maxsize=1)
+def get_chroma_adapter():
+    """문서 id 단위 검색용 chromadb 어댑터 (핸들은 chroma_cache에서 공유)."""
+    from app.adapters.rag.chroma_adapter import ChromaAdapter
+
+    return ChromaAdapter(str(CHROMA_DIR))
+
 
 def get_chroma_retriever(collection_name: Optional[str], *, k: int = 5):
     """
-    LangChain VectorStoreRetriever (간단 검색용).
+    LangChain VectorStoreRetriever (간단 검색용). (컬렉션, k)마다 캐시된 vectorstore 위에 한 번만 만듭니다.
     """
-    # 타입 수준 의존성도 지연 임포트합니다
-    from langchain_core.vectorstores import VectorStoreRetriever  # type: ignore
+    return get_handle_cache(str(CHROMA_DIR)).get(
+        ("retriever", collection_name, k),
+        lambda: get_chroma_vectorstore(collection_name).as_retriever(search_kwargs={"k": k}),
+    )
 
-    return get_chroma_vectorstore(collection_name).as_retriever(search_kwargs={"k": k})
+@lru_cache(maxsize=1)
+def get_retrieval_cache() -> RetrievalCache:
+    """정규화 질문 기준 검색 결과/질문 임베딩 캐시 (싱글톤)"""
+    return RetrievalCache(
+        maxsize=config.RETRIEVAL_CACHE_SIZE,
+        ttl_s=config.RETRIEVAL_CACHE_TTL_S,
+        embed_maxsize=config.RETRIEVAL_EMBED_CACHE_SIZE,
+    )
+
+def warmup_chroma(collection_names) -> None:
+    """시작 시 컬렉션 핸들을 미리 만들어 첫 질문의 지연을 없앱니다. 실패해도 질문 때 다시 시도합니다."""
+    for name in collection_names:
+        try:
+            get_chroma_retriever(name)
+        except Exception:
+            logger.exception("Chroma 워밍업 실패: %s", name)
 
 
 @lru_cache(maxsize=1)
@@ -65,4 +102,76 @@ def get_diary_repo() -> DiaryRepository:
 
 @lru_cache(maxsize=1)
 def get_chat_repo() -> ChatRepository:
-    return ChatRepository(db_path=str(config.DB_PATH))
+    repo = ChatRepository(db_path=str(config.DB_PATH))
+    if repo.write_behind:
+        # write-behind 모드에서는 배치가 실제로 기록된 뒤에 세션 벡터 인덱싱을 다시 예약합니다
+        repo.add_flush_listener(lambda session_ids: [get_memory_index().schedule(s) for s in session_ids])
+    return repo
+
+
+@lru_cache(maxsize=1)
+def get_memory_index() -> ChatMemoryIndex:
+    return ChatMemoryIndex(db_path=str(config.DB_PATH))
+
+
+@lru_cache(maxsize=1)
+def get_snapshot_repo() -> SnapshotRepository:
+    return SnapshotRepository(db_path=str(config.DB_PATH))
+
+
+@lru_cache(maxsize=1)
+def get_search_repo() -> SearchRepository:
+    return SearchRepository(db_path=str(config.DB_PATH))
+
+
+@lru_cache(maxsize=1)
+def get_activity_repo() -> ActivityRepository:
+    return ActivityRepository(db_path=str(config.DB_PATH))
+
+
+# ── async 파사드: async def 엔드포인트/노드에서 이벤트 루프를 막지 않고 저장소를 부릅니다.
+# 읽기는 DB 읽기 풀, 쓰기는 단일 writer 스레드에서 실행됩니다 (app.core.db_executor).
+@lru_cache(maxsize=1)
+def get_async_chat_repo() -> AsyncFacade:
+    return AsyncFacade(
+        get_chat_repo(),
+        reads=(
+            "get_recent_messages", "get_messages_by_date", "get_messages_by_ids", "get_session_messages",
+            "get_session_rows", "get_rows_by_day_range", "get_messages_page", "count_messages",
+        ),
+        writes=("save_message", "delete_session", "delete_last_message", "flush"),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_diary_repo() -> AsyncFacade:
+    return AsyncFacade(
+        get_diary_repo(),
+        reads=("get_diary_by_date", "list_diary_rows", "list_diaries"),
+        writes=("save_diary", "delete_diary"),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_profile_repo() -> AsyncFacade:
+    return AsyncFacade(
+        get_profile_repo(),
+        reads=("get_baby", "get_mother"),
+        writes=("upsert_baby", "upsert_mother", "ensure_profiles"),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_persona_repo() -> AsyncFacade:
+    from app.services import persona_repo
+
+    return AsyncFacade(
+        persona_repo,
+        reads=("get_persona_summary", "get_latest_child_persona", "list_child_persona_versions"),
+        writes=("upsert_persona_summary", "insert_child_persona"),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_activity_repo() -> AsyncFacade:
+    return AsyncFacade(get_activity_repo(), reads=("get_range", "get_month"), writes=("rebuild",))
@@ -14,6 +14,7 @@ from app.nodes.diary_node import diary_node
 from app.nodes.persona_history_node import persona_history_node
 from app.nodes.persona_agent_node import persona_agent_node
 from app.nodes.persona_updater_node import persona_updater_node
+from app.nodes.turn_insights_node import turn_insights_node
 
 # 툴 레지스트리
 from app.tools.tool_registry import get_all_tools
@@ -30,6 +31,7 @@ def compile_app_graph():
         "diary_node":         diary_node,
         "persona_agent_node": persona_agent_node,
         "persona_updater_node": persona_updater_node,
+        "turn_insights_node": turn_insights_node,
     }
 
     def _dispatch(state: AgentState) -> AgentState:
@@ -46,18 +48,13 @@ def compile_app_graph():
             return state
 
         # persona 관련 백그라운드 트리거: persona_history_node가 이미 실행되었고
-        # 아직 백그라운드가 트리거되지 않았다면 agent/updater를 비동기적으로 호출
+        # 아직 백그라운드가 트리거되지 않았다면 요약/페르소나/프로필 통합 분석을 한 번 예약
         try:
             if state.metadata.get("history_block") and not state.metadata.get("persona_background_triggered"):
-                # 호출 시 두 노드는 자체적으로 비동기 태스크를 생성하므로 여기서는 단순 호출
                 try:
-                    persona_agent_node(state)
-                except Exception:
-                    # 로그는 각 노드가 처리
-                    pass
-                try:
-                    persona_updater_node(state)
+                    turn_insights_node(state)
                 except Exception:
+                    # 로그는 노드가 처리
                     pass
                 state.metadata["persona_background_triggered"] = True
         except Exception:
@@ -5,6 +5,10 @@ from app.api.http import router as api_router
 from app.utils.migrations import run_migrations
 from app.core.config import config
 from app.core.logger import get_logger
+from app.core.background import schedule_periodic, shutdown_background, submit_background
+from app.core.db_executor import shutdown_db_executor
+from app.utils.db_utils import close_all_connections
+from app.services.chat_repo import flush_all_chat_buffers
 from contextlib import asynccontextmanager
 
 def create_app() -> FastAPI:
@@ -20,9 +24,25 @@ def create_app() -> FastAPI:
             logger.info("마이그레이션 적용 완료")
         except Exception:
             logger.exception("시작 시 마이그레이션 적용 실패")
+        if config.RETENTION_INTERVAL_MIN > 0:
+            from app.services.retention import enforce_retention
+
+            # 보존 정책 + 증분 VACUUM (작은 배치로 나눠 실행하므로 요청 처리와 함께 돌아도 됩니다)
+            schedule_periodic("retention", config.RETENTION_INTERVAL_MIN * 60, enforce_retention, str(config.DB_PATH))
+        if config.CHROMA_WARMUP_COLLECTIONS:
+            from app.core.dependencies import warmup_chroma
+
+            # 벡터스토어/리트리버 핸들을 미리 열어 둡니다 (시작을 막지 않도록 백그라운드에서)
+            submit_background(warmup_chroma, config.CHROMA_WARMUP_COLLECTIONS)
         yield
-    # shutdown(종료 시 작업)
-    logger.info("애플리케이션 종료 중")
+        # shutdown(종료 시 작업)
+        logger.info("애플리케이션 종료 중")
+        flush_all_chat_buffers()
+        # 실행 중인 백그라운드 작업이 커넥션을 다 쓸 때까지 기다립니다 (아직 시작 안 한 인덱싱 등은 다음 실행 때 다시 예약됨)
+        shutdown_background(wait=True, cancel_pending=True)
+        # 대기 중인 쓰기를 마친 뒤 커넥션을 닫습니다
+        shutdown_db_executor(wait=True)
+        close_all_connections()
 
     app = FastAPI(title="Moms Diary Chatbot API", version="0.1.0", lifespan=lifespan)
 
@@ -10,9 +10,25 @@ from app.core.config import config
 from app.core.state import AgentState
 from app.core.io_payload import OutputEnvelope, InputEnvelope
 from app.core.logger import get_logger
+from app.tools.persona_tools import recall_chats, format_memory_section
 
 logger = get_logger(__name__)
 
+
+def _history_section(state: AgentState, query: str) -> str:
+    """유사도 기반 과거 대화 + 최근 몇 턴을 history_section으로 만듭니다.
+
+    메모리 검색이 실패하면 history_block의 최근 대화 10개로 폴백합니다.
+    """
+    try:
+        return format_memory_section(recall_chats(state.session_id, query))
+    except Exception:
+        logger.exception("baby_smalltalk_node: 대화 메모리 조회 실패, 최근 대화로 폴백")
+    history_block = state.metadata.get("history_block") or {}
+    recent = history_block.get("recent_chats") or []
+    return "" if not recent else "[최근대화]\n" + "\n".join([f"[{r.get('role')}] {r.get('text')}" for r in recent[-10:]])
+
+
 def baby_smalltalk_node(state: AgentState, mode: str = "small_talk") -> AgentState:
     llm = get_llm_with_tools(temperature=0.0)
     logger.debug("baby_smalltalk_node 호출: mode=%s, session=%s", mode, state.input.session_id)
@@ -27,8 +43,7 @@ def baby_smalltalk_node(state: AgentState, mode: str = "small_talk") -> AgentSta
         history_block = state.metadata.get("history_block") or {}
         persona = history_block.get("persona") if history_block else None
         persona_section = "" if not persona else f"[페르소나]\n{persona}\n"
-        recent = history_block.get("recent_chats") or []
-        history_section = "" if not recent else "[최근대화]\n" + "\n".join([f"[{r.get('role')}] {r.get('text')}" for r in recent[-10:]])
+        history_section = _history_section(state, (state.input.payload.text or "") if state.input.payload else expert_text)
 
         prompt = prompt.partial(persona_section=persona_section, history_section=history_section)
         chain = prompt | llm | StrOutputParser()
@@ -57,8 +72,7 @@ def baby_smalltalk_node(state: AgentState, mode: str = "small_talk") -> AgentSta
     history_block = state.metadata.get("history_block") or {}
     persona = history_block.get("persona") if history_block else None
     persona_section = "" if not persona else f"[페르소나]\n{persona}\n"
-    recent = history_block.get("recent_chats") or []
-    history_section = "" if not recent else "[최근대화]\n" + "\n".join([f"[{r.get('role')}] {r.get('text')}" for r in recent[-10:]])
+    history_section = _history_section(state, text)
 
     prompt = prompt.partial(persona_section=persona_section, history_section=history_section)
     chain = prompt | llm | StrOutputParser()
@@ -9,12 +9,14 @@ from langchain_core.output_parsers import PydanticOutputParser
 from app.core.tooling import get_llm_with_tools, get_llm
 from app.prompts.diary_prompts import DETECT_SYSTEM, DIARY_SYSTEM_PROMPT
 from app.core.dependencies import get_openai, get_chat_repo, get_diary_repo, get_profile_repo
+from app.core.db_executor import call_write
 from app.core.logger import get_logger
 from app.core.config import config
 from app.core.state import AgentState
 from app.core.io_payload import OutputEnvelope, InputEnvelope
 from app.services.diary_repo import DiaryEntry
 from app.core.pydantic_utils import safe_model_dump
+from app.tools.persona_tools import recall_chats, format_memory_section
 
 def diary_node(state: AgentState) -> AgentState:
     env: InputEnvelope = state.input
@@ -91,11 +93,15 @@ def diary_node(state: AgentState) -> AgentState:
             persona = history_block.get("persona")
             if persona:
                 persona_section = "[페르소나]\n" + str(persona)
-            recent = history_block.get("recent_chats") or []
-            if recent:
-                history_section = "[최근대화]\n" + "\n".join([f"[{r.get('role')}] {r.get('text')}" for r in recent[-20:]])
     except Exception:
         persona_section = ""
+
+    # 그날의 메시지는 이미 {messages}로 들어가므로, 그와 관련된 이전 대화만 유사도로 가져옵니다
+    try:
+        memory = recall_chats(env.session_id, messages_text[-2000:], last_n=0, exclude_ids=[m.id for m in msgs if m.id])
+        history_section = format_memory_section(memory)
+    except Exception:
+        logger.exception("diary_node: 대화 메모리 조회 실패")
         history_section = ""
 
     mother_section = ""
@@ -124,8 +130,6 @@ def diary_node(state: AgentState) -> AgentState:
             try:
                 history_block = state.metadata.get("history_block") if state and state.metadata else None
                 if history_block:
-                    recent = history_block.get("recent_chats") or []
-                    invoke_kwargs["history"] = "\n".join([f"[{r.get('role')}] {r.get('text')}" for r in recent[-20:]])
                     if history_block.get("persona"):
                         invoke_kwargs["persona"] = history_block.get("persona")
             except Exception:
@@ -172,7 +176,7 @@ def diary_node(state: AgentState) -> AgentState:
     except Exception:
         # diary가 plain dict이거나 속성이 없으면 무시합니다
         pass
-    diary_repo.save_diary(diary)
+    call_write(diary_repo.save_diary, diary)
 
     state.final = OutputEnvelope.ok_diary(
         text=diary.content,
@@ -5,7 +5,7 @@ from typing import Any
 from pydantic import BaseModel, Field
 from app.core.state import AgentState
 from app.core.logger import get_logger
-from app.services import persona_repo
+from app.core.dependencies import get_async_persona_repo
 from app.core.tooling import get_llm
 
 logger = get_logger(__name__)
@@ -115,7 +115,10 @@ async def _build_and_save_persona(session_id: str, history_block: dict[str, Any]
             except Exception:
                 persona_obj.setdefault("tags", [])
 
-            persona_repo.insert_child_persona(session_id=session_id, persona_json=json.dumps(persona_obj, ensure_ascii=False))
+            # 이벤트 루프에서 실행되므로 DB 쓰기는 writer 스레드로 넘깁니다
+            await get_async_persona_repo().insert_child_persona(
+                session_id=session_id, persona_json=json.dumps(persona_obj, ensure_ascii=False)
+            )
             logger.info("persona_agent: persona saved for session=%s", session_id)
         except Exception:
             logger.exception("persona_agent: failed to persist persona for %s", session_id)
@@ -1,22 +1,93 @@
 from __future__ import annotations
-import asyncio
 import re
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 from pydantic import BaseModel, Field, ValidationError
 from app.core.state import AgentState
 from app.core.logger import get_logger
 from app.services.profile_repo import ProfileRepository, BabyProfile, MotherProfile
 from app.core.dependencies import get_profile_repo
+from app.core.background import submit_background
+from app.core.db_executor import call_write
 
 logger = get_logger(__name__)
 
 
-def _extract_candidates(text: str) -> Dict[str, Any]:
-    if not text:
-        return {}
+# ─ 로컬 사전(lexicon) 기반 프리필터 ─
+# 대부분의 대화("안녕", "오늘 산책했어")에는 프로필 정보가 없으므로 LLM 추출 전에
+# 정규식으로 먼저 걸러냅니다. 확실한 경우는 바로 추출하고, 애매한 경우만 LLM으로 넘깁니다.
+_PROFILE_HINT_RE = re.compile(
+    r"\d{1,3}\s*(?:주|살|세)|이름|태명|나이|성별|아들|딸(?!기)|남자\s*아[이기]|여자\s*아[이기]|남아|여아|라고\s*(?:불러|해|지었)"
+)
+# 임신 주차: "임신 20주", "20주차"
+_WEEK_RE = re.compile(r"임신\s*(\d{1,2})\s*주|(\d{1,2})\s*주\s*차")
+_BARE_WEEK_RE = re.compile(r"\d{1,2}\s*주")
+# 서술을 맺는 어미와 절의 끝. 나이/성별은 이 뒤가 절 끝일 때만 "현재 사실"로 봅니다
+_COPULA = r"(?:이에요|예요|이래요|래요|이래|래|이야|야|입니다|이랍니다|이다|임)"
+_CLAUSE_END = r"\s*(?:[.!?~,]|$)"
+# 산모 나이: "제 나이는 32(살)이에요", "저는 32살이에요", 절 첫머리의 "32살이에요"
+# "나는 20살 때 처음 서울 왔어요"처럼 과거 시점이거나 "언니는 30살"처럼 다른 사람이면 확정하지 않습니다
+_MOTHER_AGE_RE = re.compile(
+    r"(?:제|내|저의|나의)\s*나이(?:는|가)?\s*(\d{2})\s*(?:살|세)?\s*" + _COPULA + "?" + _CLAUSE_END
+    + r"|(?:(?:저는|나는|난|전|제가|내가)\s*|(?:^|[.!?~\n]\s*))(\d{2})\s*(?:살|세)\s*" + _COPULA + "?" + _CLAUSE_END,
+    re.MULTILINE,
+)
+_BARE_AGE_RE = re.compile(r"\d{1,3}\s*(?:살|세)|나이")
+# 성별: 주어가 사용자 자신의 아기("우리 아기는 아들이래요", "제 아기 성별은 딸")일 때만 확정합니다.
+# "언니네 아기가 아들이래요", "친구는 딸이래요"처럼 다른 사람 이야기일 수 있으면 LLM으로 넘깁니다
+_OWN_BABY = r"(?:우리|저희|제|내)\s*(?:아기|애기|아가|애|뱃속\s*아기|태아)\s*(?:성별)?\s*(?:은|는|이|가)?\s*"
+_GENDER_RE = {
+    "M": re.compile(_OWN_BABY + r"(?:아들|남자\s*아[이기]|남아)\s*" + _COPULA + "?" + _CLAUSE_END),
+    "F": re.compile(_OWN_BABY + r"(?:딸|여자\s*아[이기]|여아)\s*" + _COPULA + "?" + _CLAUSE_END),
+}
+_BARE_GENDER_RE = re.compile(r"성별|아들|딸(?!기)|남자\s*아[이기]|여자\s*아[이기]|남아|여아")
+# 이름은 조사/어미와 섞여 경계가 애매하므로("콩이야" = 콩+이야? 콩이+야?) 항상 LLM으로 넘깁니다
+_NAME_RE = re.compile(r"이름|태명|라고\s*(?:불러|해|지었)")
+
+# 프리필터 결과 통계: skipped(LLM 불필요, 후보 없음) / direct(로컬 추출) / escalated(LLM 호출)
+PREFILTER_STATS: Dict[str, int] = {"skipped": 0, "direct": 0, "escalated": 0}
+
+
+def _scan_profile_lexicon(text: str) -> Tuple[Dict[str, Dict[str, Any]], bool]:
+    """(로컬 추출 후보, LLM 필요 여부)를 반환합니다."""
+    baby: Dict[str, Any] = {}
+    mother: Dict[str, Any] = {}
+    ambiguous = False
+
+    m = _WEEK_RE.search(text)
+    if m:
+        week = int(m.group(1) or m.group(2))
+        if 0 <= week <= 42:
+            baby["week"] = week
+    elif _BARE_WEEK_RE.search(text):
+        ambiguous = True  # "2주 전에" 같은 기간 표현일 수 있음
+
+    m = _MOTHER_AGE_RE.search(text)
+    if m:
+        age = int(m.group(1) or m.group(2))
+        if 0 <= age <= 100:
+            mother["age"] = age
+    elif _BARE_AGE_RE.search(text):
+        ambiguous = True  # 누구의 나이인지 알 수 없음
+
+    genders = {g for g, rx in _GENDER_RE.items() if rx.search(text)}
+    if len(genders) == 1:
+        baby["gender"] = genders.pop()
+    elif genders or _BARE_GENDER_RE.search(text):
+        ambiguous = True
 
-    raw: Dict[str, Any] = {}
+    if _NAME_RE.search(text):
+        ambiguous = True
 
+    candidates: Dict[str, Dict[str, Any]] = {}
+    if baby:
+        candidates["baby"] = baby
+    if mother:
+        candidates["mother"] = mother
+    return candidates, ambiguous
+
+
+def _llm_extract_candidates(text: str) -> Dict[str, Any]:
+    """LLM으로 프로필 후보를 추출합니다. 값이 있는 필드만 dict로 반환합니다."""
     try:
         system_prompt = (
             """
@@ -61,49 +132,85 @@ def _extract_candidates(text: str) -> Dict[str, Any]:
         return {}
 
     candidates: Dict[str, Any] = {}
+    for key, model_cls in (("baby", BabyProfile), ("mother", MotherProfile)):
+        src = raw_candidate.get(key) if isinstance(raw_candidate, dict) else None
+        if not src or not isinstance(src, dict):
+            continue
+        try:
+            model_cls(**src)
+        except ValidationError:
+            logger.debug("persona_updater: %s candidate validation failed from LLM: %s", key, src)
+            continue
+        fields = {
+            k: v for k, v in src.items()
+            if v is not None and k not in ("session_id", "created_at", "updated_at")
+        }
+        if fields.get("gender") == "U":
+            fields.pop("gender")
+        if fields:
+            candidates[key] = fields
+    return candidates
 
-    try:
-        baby_src = raw_candidate.get("baby") if isinstance(raw_candidate, dict) else None
-        if baby_src and isinstance(baby_src, dict):
-            baby_profile = BabyProfile(**baby_src)
-    except ValidationError:
-        logger.debug("persona_updater: baby candidate validation failed from LLM: %s", baby_src)
 
-    try:
-        mother_src = raw_candidate.get("mother") if isinstance(raw_candidate, dict) else None
-        if mother_src and isinstance(mother_src, dict):
-            mother_profile = MotherProfile(**mother_src)
-    except ValidationError:
-        logger.debug("persona_updater: mother candidate validation failed from LLM: %s", mother_src)
-
-    candidates = {
-        "baby": baby_profile,
-        "mother": mother_profile,
-    }
-    print("=== Profile Candidates ===")
-    print(candidates)
+def prefilter_profile(text: str) -> Tuple[Dict[str, Dict[str, Any]], bool]:
+    """로컬 프리필터만 실행해 (확정 후보, LLM 추출 필요 여부)를 반환합니다."""
+    if not text or not _PROFILE_HINT_RE.search(text):
+        PREFILTER_STATS["skipped"] += 1
+        return {}, False
+
+    local, ambiguous = _scan_profile_lexicon(text)
+    PREFILTER_STATS["escalated" if ambiguous else "direct"] += 1
+    logger.debug("persona_updater: lexicon candidates=%s, ambiguous=%s", local, ambiguous)
+    return local, ambiguous
+
+
+def _extract_candidates(text: str) -> Dict[str, Any]:
+    """프로필 후보를 {"baby": {...}, "mother": {...}} 형태(값이 있는 필드만)로 반환합니다.
+
+    1) 프로필 단서가 전혀 없으면 LLM 없이 빈 dict
+    2) 단서가 모두 확정적이면 로컬 추출 결과만 사용
+    3) 애매한 단서가 있으면 LLM 추출 결과를 쓰고, LLM이 비워 둔 필드만 로컬 값으로 채움
+    """
+    local, ambiguous = prefilter_profile(text)
+    if not ambiguous:
+        return local
+
+    candidates = _llm_extract_candidates(text)
+    for key, fields in local.items():
+        merged = candidates.setdefault(key, {})
+        for field, value in fields.items():
+            merged.setdefault(field, value)
+    logger.debug("persona_updater: merged candidates=%s", candidates)
     return candidates
 
 
 def _process_and_update(session_id: str, text: str) -> None:
-    repo: ProfileRepository = get_profile_repo()
     cands = _extract_candidates(text)
     if not cands:
         logger.debug("persona_updater: no candidates extracted for session=%s", session_id)
         return
+    # 읽고-고쳐-쓰는 갱신이라 writer 스레드에서 통째로 실행합니다
+    call_write(apply_profile_candidates, session_id, cands)
+
 
+def apply_profile_candidates(session_id: str, cands: Dict[str, Any]) -> None:
+    """후보 dict에 값이 있는 필드만 프로필에 반영합니다."""
+    repo: ProfileRepository = get_profile_repo()
     baby_c = cands.get("baby")
     if baby_c:
         baby = repo.get_baby(session_id) or BabyProfile(session_id=session_id)
         updated = False
-        if baby_c.get("name") or not baby.name:
-            baby.name = baby_c.get("name")
-            updated = True
-        if baby_c.get("week") or not baby.week:
-            baby.week = int(baby_c.get("week"))
+        if baby_c.get("name") and baby_c["name"] != baby.name:
+            baby.name = baby_c["name"]
             updated = True
-        if baby_c.get("gender") or (not baby.gender or baby.gender == "U"):
-            baby.gender = baby_c.get("gender")
+        if baby_c.get("week") is not None and baby_c["week"] != baby.week:
+            try:
+                baby.week = int(baby_c["week"])
+                updated = True
+            except Exception:
+                pass
+        if baby_c.get("gender") in ("M", "F") and baby_c["gender"] != baby.gender:
+            baby.gender = baby_c["gender"]
             updated = True
 
         if updated:
@@ -122,12 +229,12 @@ def _process_and_update(session_id: str, text: str) -> None:
             mother = MotherProfile(session_id=session_id)
 
         m_updated = False
-        if mother_c.get("name") or not mother.name:
-            mother.name = mother_c.get("name")
+        if mother_c.get("name") and mother_c["name"] != mother.name:
+            mother.name = mother_c["name"]
             m_updated = True
-        if mother_c.get("age") is not None or not mother.age:
+        if mother_c.get("age") is not None and mother_c["age"] != mother.age:
             try:
-                mother.age = int(mother_c.get("age"))
+                mother.age = int(mother_c["age"])
                 m_updated = True
             except Exception:
                 pass
@@ -150,20 +257,14 @@ def persona_updater_node(state: AgentState) -> AgentState:
 
     logger.info("persona_updater_node triggered for session=%s, text_len=%d", session_id, len(text))
 
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = None
-
-    if loop and loop.is_running():
-        asyncio.create_task(_process_and_update(session_id, text))
-    else:
-        logger.info("persona_agent_node: event loop not running, running task in background via asyncio.run()")
-        try:
-            asyncio.run(_process_and_update(session_id, text))
-        except Exception:
-            logger.exception("persona_updater: run failed for %s", session_id)
+    # 프로필 단서가 없는 메시지는 백그라운드 작업조차 만들지 않습니다
+    if not _PROFILE_HINT_RE.search(text):
+        PREFILTER_STATS["skipped"] += 1
+        return state
+
+    # _process_and_update는 동기 함수이므로 공용 백그라운드 스레드 풀에서 실행합니다
+    submit_background(_process_and_update, session_id, text)
 
     return state
 
-__all__ = ["persona_updater_node"]
+__all__ = ["persona_updater_node", "prefilter_profile", "apply_profile_candidates"]
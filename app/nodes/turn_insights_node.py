@@ -0,0 +1,179 @@
+"""
+turn_insights_node
+
+한 턴마다 필요한 백그라운드 분석(일간 요약, 아기 페르소나, 프로필 추출)을
+하나의 구조화 출력 LLM 호출로 처리하고, 결과를 각 저장소에 나눠 기록(fan-out)합니다.
+
+기존에는 summarize_week_tool / persona_agent_node / persona_updater_node가 같은 대화를
+각각 LLM에 보내 턴마다 최대 3번 호출했습니다.
+"""
+from __future__ import annotations
+import json
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+from app.core.state import AgentState
+from app.core.logger import get_logger
+from app.core.background import submit_background
+from app.core.db_executor import call_write
+from app.services import persona_repo
+from app.prompts.persona_prompts import TURN_INSIGHTS_SYSTEM, TURN_INSIGHTS_USER
+from app.nodes.persona_updater_node import prefilter_profile, apply_profile_candidates
+
+logger = get_logger(__name__)
+
+
+class PersonaPart(BaseModel):
+    summary: str = Field(default="", description="한 문단으로 된 아이 페르소나 요약 문자")
+    traits: List[str] = Field(default_factory=list, description="아이의 성격/특성 리스트")
+
+
+class BabyUpdate(BaseModel):
+    name: Optional[str] = Field(default=None, description="아기 이름(태명)")
+    week: Optional[int] = Field(default=None, ge=0, le=42, description="임신 주차")
+    gender: Optional[str] = Field(default=None, description="M | F")
+
+
+class MotherUpdate(BaseModel):
+    name: Optional[str] = Field(default=None, description="산모 이름")
+    age: Optional[int] = Field(default=None, ge=0, le=100, description="산모 나이")
+
+
+class ProfileUpdates(BaseModel):
+    baby: Optional[BabyUpdate] = None
+    mother: Optional[MotherUpdate] = None
+
+
+class TurnInsights(BaseModel):
+    summary: str = Field(default="", description="오늘 대화 요약(2-3문장)")
+    key_traits: List[str] = Field(default_factory=list, description="주요 특성")
+    events: List[str] = Field(default_factory=list, description="주요 사건")
+    persona: PersonaPart = Field(default_factory=PersonaPart)
+    profile_updates: ProfileUpdates = Field(default_factory=ProfileUpdates)
+
+
+def _derive_tags(traits: List[Any]) -> List[str]:
+    """traits에서 짧은 정규화 태그(소문자, 최대 3단어)를 순서를 유지하며 중복 없이 만듭니다."""
+    tags: List[str] = []
+    for t in traits:
+        if not isinstance(t, str):
+            continue
+        tt = " ".join(t.strip().lower().split()[:3])
+        if tt and tt not in tags:
+            tags.append(tt)
+    return tags
+
+
+def extract_turn_insights(
+    recent: List[Dict[str, Any]],
+    weekly: List[Dict[str, Any]],
+    prev_summary: str = "",
+    profile_text: Optional[str] = None,
+) -> TurnInsights:
+    """요약/페르소나/프로필을 한 번의 LLM 호출로 추출합니다.
+
+    profile_text가 None이면 프로필 추출은 요청하지 않습니다(프리필터에서 이미 처리됨).
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import PydanticOutputParser
+    from app.core.tooling import get_llm
+
+    parser = PydanticOutputParser(pydantic_object=TurnInsights)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", TURN_INSIGHTS_SYSTEM),
+        ("user", TURN_INSIGHTS_USER),
+    ]).partial(data_format=parser.get_format_instructions())
+
+    chain = prompt | get_llm(temperature=0.0) | parser
+    return chain.invoke({
+        "recent_text": "\n".join([f"[{r.get('role')}] {r.get('text')}" for r in recent]) or "없음",
+        "weekly_text": "\n".join([f"- {ws.get('week_start')}: {ws.get('summary')}" for ws in weekly]) or "없음",
+        "prev_summary": prev_summary or "없음",
+        "profile_text": profile_text or "없음",
+    })
+
+
+def persist_turn_insights(
+    session_id: str,
+    target_date: str,
+    insights: TurnInsights,
+    recent: List[Dict[str, Any]],
+    weekly: List[Dict[str, Any]],
+    local_profile: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> None:
+    """추출 결과를 요약/페르소나/프로필 저장소에 각각 기록합니다. 한 부분의 실패가 다른 부분을 막지 않습니다."""
+    if insights.summary:
+        try:
+            call_write(
+                persona_repo.upsert_persona_summary,
+                session_id=session_id, week_start=target_date, week_end=target_date, summary=insights.summary[:800]
+            )
+        except Exception:
+            logger.exception("turn_insights: 요약 저장 실패 session=%s", session_id)
+
+    if insights.persona.summary or insights.persona.traits:
+        persona_obj = {
+            "summary": insights.persona.summary,
+            "traits": insights.persona.traits,
+            "recent": [r.get("text") for r in recent[-5:]],
+            "weekly": weekly,
+            "tags": _derive_tags(insights.persona.traits),
+        }
+        try:
+            call_write(persona_repo.insert_child_persona, session_id=session_id, persona_json=json.dumps(persona_obj, ensure_ascii=False))
+        except Exception:
+            logger.exception("turn_insights: 페르소나 저장 실패 session=%s", session_id)
+
+    # LLM 결과 위에 프리필터에서 확정한 값을 덮어씁니다
+    cands: Dict[str, Dict[str, Any]] = {}
+    for key in ("baby", "mother"):
+        part = getattr(insights.profile_updates, key)
+        fields = part.model_dump(exclude_none=True) if part else {}
+        fields.update((local_profile or {}).get(key) or {})
+        if fields:
+            cands[key] = fields
+    if cands:
+        try:
+            call_write(apply_profile_candidates, session_id, cands)
+        except Exception:
+            logger.exception("turn_insights: 프로필 반영 실패 session=%s", session_id)
+
+
+def run_turn_insights(session_id: str, target_date: str, text: str, history_block: Dict[str, Any]) -> None:
+    local_profile, need_llm_profile = prefilter_profile(text)
+    recent = (history_block.get("recent_chats") or [])[-20:]
+    weekly = history_block.get("weekly_summaries") or []
+    prev_summary = next((ws.get("summary") for ws in weekly if ws.get("week_start") == target_date and ws.get("summary")), "")
+
+    try:
+        insights = extract_turn_insights(recent, weekly, prev_summary, text if need_llm_profile else None)
+    except Exception:
+        logger.exception("turn_insights: 통합 추출 실패 session=%s", session_id)
+        insights = TurnInsights()
+
+    persist_turn_insights(session_id, target_date, insights, recent, weekly, local_profile=local_profile)
+    logger.info("turn_insights: 저장 완료 session=%s, date=%s", session_id, target_date)
+
+
+def turn_insights_node(state: AgentState) -> AgentState:
+    """history_block을 읽어 통합 분석을 백그라운드 작업으로 예약합니다."""
+    session_id = state.session_id
+    history_block = state.metadata.get("history_block")
+    if not history_block:
+        logger.warning("turn_insights_node: no history_block found for session=%s", session_id)
+        return state
+
+    text = ""
+    try:
+        text = state.input.payload.text or ""
+    except Exception:
+        text = ""
+    target_date = history_block.get("target_date")
+    if not target_date:
+        logger.warning("turn_insights_node: no target_date for session=%s", session_id)
+        return state
+
+    submit_background(run_turn_insights, session_id, target_date, text, history_block)
+    return state
+
+
+__all__ = ["turn_insights_node", "extract_turn_insights", "persist_turn_insights", "TurnInsights"]
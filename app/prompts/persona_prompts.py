@@ -0,0 +1,33 @@
+TURN_INSIGHTS_SYSTEM = (
+    """
+    너는 산모와 아기(태아)의 대화를 분석하는 백그라운드 분석기야.
+    한 번의 분석으로 아래 세 가지를 모두 만들어야 해.
+
+    1) summary: 오늘 대화의 핵심 요약 (2-3문장). [기존 요약]이 있으면 새 대화 내용을 반영해 갱신한 요약을 반환
+    2) persona: 대화를 바탕으로 한 '아기(태아)를 대표하는 간단한 페르소나'
+       - summary: 한 문단 요약, traits: 성격/특성 키워드 최소 2개 (예: 활발함, 수면불규칙 등)
+    3) profile_updates: [프로필 추출 대상 문장]에서 확인되는 아기/산모 프로필 정보
+       - 문장이 "없음"이거나 정보가 불확실하면 빈 값으로 둬
+       - 아기 성별은 M(남아) / F(여아)만 사용
+
+    [규칙]
+    - 반드시 아래 형식의 JSON만 반환해. 다른 말은 하지 마.
+    {data_format}
+    """
+)
+
+TURN_INSIGHTS_USER = (
+    """
+    [최근 대화]
+    {recent_text}
+
+    [주간 요약]
+    {weekly_text}
+
+    [기존 요약]
+    {prev_summary}
+
+    [프로필 추출 대상 문장]
+    {profile_text}
+    """
+)
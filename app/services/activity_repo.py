@@ -0,0 +1,94 @@
+"""세션·날짜별 활동 집계(daily_activity) 조회와 삭제 반영.
+
+삽입(대화, 일기)과 일기 삭제는 스키마 트리거가 반영하고(app.utils.schema v10), 대화 삭제는
+ChatRepository가 같은 트랜잭션에서 아래 함수로 반영합니다. 압축과 보존 정책 삭제는 반영하지 않으므로
+집계는 "그날 대화가 있었는지"를 계속 보여 줍니다.
+"""
+from __future__ import annotations
+import sqlite3
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from app.core.logger import get_logger
+from app.utils.db_utils import get_connection, map_shards, shard_path
+
+logger = get_logger(__name__)
+
+_COLS = "day, user_msgs, assistant_msgs, has_diary, last_at"
+
+
+class DayActivity(NamedTuple):
+    day: str
+    user_msgs: int
+    assistant_msgs: int
+    has_diary: bool
+    last_at: Optional[str]
+
+
+def chat_deleted(conn: sqlite3.Connection, session_id: str, day: Optional[str], role: Optional[str]) -> None:
+    """대화 한 건 삭제를 집계에 반영합니다(현재 트랜잭션). 비게 된 날짜 행은 지웁니다."""
+    if not day:
+        return
+    col = "user_msgs" if role == "user" else "assistant_msgs" if role in ("assistant", "expert") else None
+    if col:
+        conn.execute(
+            f"UPDATE daily_activity SET {col} = MAX({col} - 1, 0) WHERE session_id = ? AND day = ?",
+            (session_id, day),
+        )
+    conn.execute(
+        "DELETE FROM daily_activity WHERE session_id = ? AND day = ? AND user_msgs = 0 AND assistant_msgs = 0 AND has_diary = 0",
+        (session_id, day),
+    )
+
+
+def session_chats_deleted(conn: sqlite3.Connection, session_id: str) -> None:
+    """세션 대화 전체 삭제를 반영합니다. 일기가 있는 날짜는 남깁니다."""
+    conn.execute("DELETE FROM daily_activity WHERE session_id = ? AND has_diary = 0", (session_id,))
+    conn.execute(
+        "UPDATE daily_activity SET user_msgs = 0, assistant_msgs = 0, last_at = NULL WHERE session_id = ?",
+        (session_id,),
+    )
+
+
+class ActivityRepository:
+    def __init__(self, db_path: str = "storage/db/app.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            from app.utils.db_utils import ensure_db_initialized
+            ensure_db_initialized(str(self.db_path))
+        except Exception:
+            logger.exception("daily_activity 테이블 확인 실패")
+
+    def get_range(self, session_id: str, start_day: str, end_day: str) -> List[DayActivity]:
+        """[start_day, end_day] 구간에서 대화나 일기가 있는 날짜 (날짜순, 기본키 범위 조회)."""
+        with get_connection(str(self.db_path), session_id) as conn:
+            rows = conn.execute(
+                f"SELECT {_COLS} FROM daily_activity WHERE session_id = ? AND day BETWEEN ? AND ? ORDER BY day",
+                (session_id, start_day, end_day),
+            ).fetchall()
+        return [
+            DayActivity(r["day"], r["user_msgs"], r["assistant_msgs"], bool(r["has_diary"]), r["last_at"]) for r in rows
+        ]
+
+    def get_month(self, session_id: str, month: str) -> List[DayActivity]:
+        """month(YYYY-MM)의 활동 날짜."""
+        return self.get_range(session_id, f"{month}-01", f"{month}-31")
+
+    def rebuild(self, session_id: Optional[str] = None) -> int:
+        """원본 테이블로부터 집계를 다시 계산합니다(세션 하나 또는 전체 샤드)."""
+        from app.utils.schema import rebuild_daily_activity
+
+        def run(path: str) -> int:
+            with get_connection(path) as conn:
+                n = rebuild_daily_activity(conn, session_id)
+                conn.commit()
+            return n
+
+        if session_id:
+            return run(shard_path(str(self.db_path), session_id))
+        return sum(map_shards(str(self.db_path), run))
+
+
+__all__ = ["ActivityRepository", "DayActivity", "chat_deleted", "session_chats_deleted"]
@@ -0,0 +1,409 @@
+"""오래된 채팅 로그 콜드 스토리지 (세션·월별 압축 세그먼트).
+
+`compact_chat_logs`는 CHAT_ARCHIVE_AFTER_DAYS보다 오래된 chat_logs 행을 세션별·월(KST)별로 묶어
+`chat_archive_segments`에 zlib 압축 JSON 한 덩어리로 옮기고 원본 행을 지웁니다. hot 테이블을 작게
+유지해 인덱스와 페이지 캐시가 최근 대화 위주로 유지되게 합니다.
+
+- 세그먼트는 (session_id, month)마다 하나이며, 같은 달의 행이 나중에 다시 압축되면 기존 세그먼트에 합칩니다.
+- 행의 id는 그대로 보존되므로 키셋 페이지네이션, 메모리 인덱스(chat_embeddings)의 id 참조가 유지됩니다.
+- 읽기는 `ChatRepository`가 아래 조회 함수로 투명하게 합쳐서 반환합니다.
+- 압축된 행은 chat_logs_fts(원본 행 삭제 트리거)에서 빠지는 대신 같은 트랜잭션에서 `chat_archive_fts`
+  (schema v12, 본문을 함께 저장하는 FTS5 trigram)에 색인되어 검색(SearchRepository)에 계속 나옵니다.
+"""
+from __future__ import annotations
+import json
+import sqlite3
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import config
+from app.core.logger import get_logger
+from app.utils import meta_codec
+from app.utils.db_utils import get_connection, map_shards, shard_path
+
+logger = get_logger(__name__)
+
+CODEC = "zlib-json"
+# 세그먼트에는 session_id를 빼고 아래 순서의 리스트로 저장합니다
+ARCHIVE_FIELDS: Tuple[str, ...] = ("id", "role", "text", "meta_json", "created_at", "created_epoch", "day")
+_DAY_MS = 86_400_000
+
+
+def encode_rows(rows: Sequence[Dict[str, Any]], level: Optional[int] = None) -> Tuple[bytes, int]:
+    """행 목록을 (압축 payload, 원본 JSON 바이트 수)로 인코딩합니다."""
+    # BLOB으로 압축 저장된 meta_json은 세그먼트 JSON에 담을 수 있게 `m2:` TEXT 형식(이전 `m1z`는 `m1:`)으로 바꿉니다
+    raw = json.dumps(
+        [[meta_codec.to_text(r.get(f)) if f == "meta_json" else r.get(f) for f in ARCHIVE_FIELDS] for r in rows],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    return zlib.compress(raw, config.CHAT_ARCHIVE_ZLIB_LEVEL if level is None else level), len(raw)
+
+
+def decode_segment(session_id: str, payload: bytes, codec: str = CODEC) -> List[Dict[str, Any]]:
+    if codec != CODEC:
+        raise ValueError(f"unknown archive codec: {codec}")
+    items = json.loads(zlib.decompress(payload))
+    return [{"session_id": session_id, **dict(zip(ARCHIVE_FIELDS, it))} for it in items]
+
+
+def _sort_key(r: Dict[str, Any]) -> Tuple[int, int]:
+    return (r.get("created_epoch") or 0, r.get("id") or 0)
+
+
+def iter_segments(
+    conn: sqlite3.Connection, session_id: str, where: str = "", params: tuple = (), order: str = "first_id ASC"
+) -> Iterator[List[Dict[str, Any]]]:
+    """세션의 세그먼트를 조건/순서대로 하나씩 풀어 행 목록으로 돌려줍니다. 테이블이 없으면 빈 결과입니다."""
+    sql = "SELECT session_id, codec, payload FROM chat_archive_segments WHERE session_id = ?"
+    if where:
+        sql += f" AND {where}"
+    sql += f" ORDER BY {order}"
+    try:
+        segs = conn.execute(sql, (session_id, *params)).fetchall()
+    except sqlite3.OperationalError:
+        return
+    for seg in segs:
+        yield decode_segment(seg["session_id"], seg["payload"], seg["codec"])
+
+
+def archived_rows(
+    conn: sqlite3.Connection,
+    session_id: str,
+    *,
+    day: Optional[str] = None,
+    ids: Optional[Sequence[int]] = None,
+) -> List[Dict[str, Any]]:
+    """세션의 보관 행을 (created_epoch, id) 순으로 반환합니다. day나 ids로 범위를 좁힐 수 있습니다."""
+    where, params = "", ()
+    if day:
+        where, params = "month = ?", (day[:7],)
+    elif ids:
+        where, params = "last_id >= ? AND first_id <= ?", (min(ids), max(ids))
+    wanted = set(ids) if ids else None
+    out: List[Dict[str, Any]] = []
+    for rows in iter_segments(conn, session_id, where, params):
+        for r in rows:
+            if day and r.get("day") != day:
+                continue
+            if wanted is not None and r["id"] not in wanted:
+                continue
+            out.append(r)
+    out.sort(key=_sort_key)
+    return out
+
+
+def archived_rows_in_months(conn: sqlite3.Connection, session_id: str, start_month: str, end_month: str) -> List[Dict[str, Any]]:
+    """[start_month, end_month](YYYY-MM) 구간 세그먼트의 보관 행을 (created_epoch, id) 순으로 반환합니다."""
+    out: List[Dict[str, Any]] = []
+    for rows in iter_segments(conn, session_id, "month BETWEEN ? AND ?", (start_month, end_month)):
+        out.extend(rows)
+    out.sort(key=_sort_key)
+    return out
+
+
+def archived_recent(conn: sqlite3.Connection, session_id: str, n: int, before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """최근 세그먼트부터 풀어 가장 최근 n개(시간순)를 반환합니다."""
+    if n <= 0:
+        return []
+    where, params = ("first_id < ?", (before_id,)) if before_id is not None else ("", ())
+    out: List[Dict[str, Any]] = []
+    for rows in iter_segments(conn, session_id, where, params, order="last_id DESC"):
+        out.extend(r for r in rows if before_id is None or r["id"] < before_id)
+        if len(out) >= n:
+            break
+    out.sort(key=_sort_key)
+    return out[-n:]
+
+
+def archived_page(
+    conn: sqlite3.Connection,
+    session_id: str,
+    before_id: Optional[int],
+    after_id: Optional[int],
+    n: int,
+    forward: bool,
+    day: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """키셋 페이지용: (after_id, before_id) 구간에서 커서에 가장 가까운 보관 행 n개를 id 순으로 반환합니다.
+
+    day를 주면 그날(KST) 행만 봅니다.
+    """
+    conds, params = [], []
+    if day:
+        conds.append("month = ?")
+        params.append(day[:7])
+    if before_id is not None:
+        conds.append("first_id < ?")
+        params.append(before_id)
+    if after_id is not None:
+        conds.append("last_id > ?")
+        params.append(after_id)
+    order = "first_id ASC" if forward else "last_id DESC"
+    out: List[Dict[str, Any]] = []
+    for rows in iter_segments(conn, session_id, " AND ".join(conds), tuple(params), order=order):
+        out.extend(
+            r for r in rows
+            if (before_id is None or r["id"] < before_id) and (after_id is None or r["id"] > after_id)
+            and (not day or r.get("day") == day)
+        )
+        if len(out) >= n:
+            break
+    out.sort(key=lambda r: r["id"], reverse=not forward)
+    return out[:n]
+
+
+def archive_counts(conn: sqlite3.Connection, session_id: str) -> Dict[str, Any]:
+    try:
+        row = conn.execute(
+            "SELECT COALESCE(SUM(row_count), 0) AS count, MIN(first_id) AS first_id, MAX(last_id) AS last_id "
+            "FROM chat_archive_segments WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return {"count": 0, "first_id": None, "last_id": None}
+    return dict(row)
+
+
+def _ignore_missing_fts(e: sqlite3.OperationalError) -> None:
+    # FTS5 trigram을 지원하지 않는 빌드에는 chat_archive_fts가 없습니다 (검색은 세그먼트를 풀어 처리)
+    if "no such table" not in str(e):
+        raise e
+
+
+def index_archived(conn: sqlite3.Connection, session_id: str, rows: Sequence[Dict[str, Any]]) -> None:
+    """보관으로 옮긴 행을 보관 검색 인덱스에 넣습니다(현재 트랜잭션). rowid는 원래 chat id입니다."""
+    try:
+        conn.executemany(
+            "INSERT INTO chat_archive_fts (rowid, session_id, text, role, day, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(r["id"], session_id, r.get("text"), r.get("role"), r.get("day"), r.get("created_at")) for r in rows],
+        )
+    except sqlite3.OperationalError as e:
+        _ignore_missing_fts(e)
+
+
+def unindex_archived(conn: sqlite3.Connection, session_id: str, ranges: Sequence[Tuple[int, int]]) -> None:
+    """[first_id, last_id] 구간의 세션 보관 행을 검색 인덱스에서 뺍니다. id는 세션 사이에 섞이므로 세션으로 거릅니다."""
+    try:
+        conn.executemany(
+            "DELETE FROM chat_archive_fts WHERE rowid BETWEEN ? AND ? AND session_id = ?",
+            [(first, last, session_id) for first, last in ranges],
+        )
+    except sqlite3.OperationalError as e:
+        _ignore_missing_fts(e)
+
+
+def rebuild_archive_index(conn: sqlite3.Connection) -> int:
+    """모든 세그먼트를 풀어 chat_archive_fts를 다시 채웁니다. 색인한 행 수를 반환합니다."""
+    conn.execute("DELETE FROM chat_archive_fts")
+    total = 0
+    try:
+        segs = conn.execute("SELECT session_id, codec, payload FROM chat_archive_segments").fetchall()
+    except sqlite3.OperationalError:
+        return 0
+    for seg in segs:
+        rows = decode_segment(seg["session_id"], seg["payload"], seg["codec"])
+        index_archived(conn, seg["session_id"], rows)
+        total += len(rows)
+    return total
+
+
+def delete_archived(conn: sqlite3.Connection, session_id: str) -> None:
+    try:
+        ranges = [
+            (r["first_id"], r["last_id"])
+            for r in conn.execute(
+                "SELECT first_id, last_id FROM chat_archive_segments WHERE session_id = ?", (session_id,)
+            ).fetchall()
+        ]
+        unindex_archived(conn, session_id, ranges)
+        conn.execute("DELETE FROM chat_archive_segments WHERE session_id = ?", (session_id,))
+    except sqlite3.OperationalError:
+        pass
+
+
+def _write_segment(conn: sqlite3.Connection, session_id: str, month: str, rows: List[Dict[str, Any]]) -> Tuple[int, int]:
+    payload, raw_bytes = encode_rows(rows)
+    conn.execute(
+        """
+        INSERT INTO chat_archive_segments
+          (session_id, month, first_id, last_id, first_day, last_day, row_count, raw_bytes, codec, payload)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (session_id, month) DO UPDATE SET
+          first_id = excluded.first_id, last_id = excluded.last_id,
+          first_day = excluded.first_day, last_day = excluded.last_day,
+          row_count = excluded.row_count, raw_bytes = excluded.raw_bytes,
+          codec = excluded.codec, payload = excluded.payload, updated_at = CURRENT_TIMESTAMP
+        """,
+        (
+            session_id,
+            month,
+            min(r["id"] for r in rows),
+            max(r["id"] for r in rows),
+            min((r.get("day") or "") for r in rows) or None,
+            max((r.get("day") or "") for r in rows) or None,
+            len(rows),
+            raw_bytes,
+            CODEC,
+            payload,
+        ),
+    )
+    return raw_bytes, len(payload)
+
+
+def pop_last_archived(conn: sqlite3.Connection, session_id: str) -> Optional[Dict[str, Any]]:
+    """가장 최근 보관 행 하나를 지우고 그 행을 반환합니다. hot 테이블이 빈 세션의 '마지막 메시지 삭제'용."""
+    try:
+        seg = conn.execute(
+            "SELECT month, codec, payload FROM chat_archive_segments WHERE session_id = ? ORDER BY last_id DESC LIMIT 1",
+            (session_id,),
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    if seg is None:
+        return None
+    rows = sorted(decode_segment(session_id, seg["payload"], seg["codec"]), key=_sort_key)
+    last = rows.pop()
+    unindex_archived(conn, session_id, [(last["id"], last["id"])])
+    if rows:
+        _write_segment(conn, session_id, seg["month"], rows)
+    else:
+        conn.execute("DELETE FROM chat_archive_segments WHERE session_id = ? AND month = ?", (session_id, seg["month"]))
+    return last
+
+
+def _compact_session(conn: sqlite3.Connection, session_id: str, cutoff: int) -> Dict[str, int]:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(ARCHIVE_FIELDS)} FROM chat_logs "
+            "WHERE session_id = ? AND created_epoch < ? ORDER BY created_epoch, id",
+            (session_id, cutoff),
+        ).fetchall()
+        by_month: Dict[str, List[Dict[str, Any]]] = {}
+        for r in rows:
+            by_month.setdefault((r.get("day") or "")[:7] or "unknown", []).append(r)
+
+        raw_total = packed_total = 0
+        for month, items in by_month.items():
+            existing = conn.execute(
+                "SELECT codec, payload FROM chat_archive_segments WHERE session_id = ? AND month = ?",
+                (session_id, month),
+            ).fetchone()
+            if existing is not None:
+                merged = {r["id"]: r for r in decode_segment(session_id, existing["payload"], existing["codec"])}
+                merged.update((r["id"], r) for r in items)
+                items = sorted(merged.values(), key=_sort_key)
+            raw_bytes, packed = _write_segment(conn, session_id, month, items)
+            raw_total += raw_bytes
+            packed_total += packed
+
+        # chat_logs_fts에서 빠지는 행을 보관 검색 인덱스로 옮깁니다
+        index_archived(conn, session_id, rows)
+        conn.execute("DELETE FROM chat_logs WHERE session_id = ? AND created_epoch < ?", (session_id, cutoff))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {"rows": len(rows), "segments": len(by_month), "raw_bytes": raw_total, "packed_bytes": packed_total}
+
+
+_TOTAL_KEYS = ("sessions", "rows", "segments", "raw_bytes", "packed_bytes", "failed")
+
+
+def _compact_shard(path: str, session_id: Optional[str], cutoff: int, max_sessions: Optional[int]) -> Dict[str, int]:
+    conn = get_connection(path)
+    if session_id:
+        sessions = [session_id]
+    else:
+        sessions = [
+            r["session_id"]
+            for r in conn.execute("SELECT DISTINCT session_id FROM chat_logs WHERE created_epoch < ?", (cutoff,)).fetchall()
+        ]
+    if max_sessions:
+        sessions = sessions[: int(max_sessions)]
+
+    totals = dict.fromkeys(_TOTAL_KEYS, 0)
+    for sid in sessions:
+        try:
+            res = _compact_session(conn, sid, cutoff)
+        except Exception:
+            totals["failed"] += 1
+            logger.exception("채팅 로그 압축 실패: session=%s", sid)
+            continue
+        if res["rows"]:
+            totals["sessions"] += 1
+            for k in ("rows", "segments", "raw_bytes", "packed_bytes"):
+                totals[k] += res[k]
+    return totals
+
+
+def compact_chat_logs(
+    db_path: str,
+    older_than_days: Optional[int] = None,
+    session_id: Optional[str] = None,
+    max_sessions: Optional[int] = None,
+) -> Dict[str, Any]:
+    """오래된 대화를 세그먼트로 옮기는 압축 작업. 세션 단위 트랜잭션이므로 중간에 멈춰도 안전합니다.
+
+    샤딩 모드에서 session_id가 없으면 샤드마다 동시에 실행해 합칩니다(max_sessions는 샤드별 상한).
+    """
+    days = config.CHAT_ARCHIVE_AFTER_DAYS if older_than_days is None else int(older_than_days)
+    if days <= 0:
+        return {"ok": False, "reason": "disabled"}
+    started = time.perf_counter()
+    cutoff = int(time.time() * 1000) - days * _DAY_MS
+    if session_id:
+        results = [_compact_shard(shard_path(str(db_path), session_id), session_id, cutoff, None)]
+    else:
+        results = map_shards(str(db_path), lambda p: _compact_shard(p, None, cutoff, max_sessions))
+
+    totals = {k: sum(r[k] for r in results) for k in _TOTAL_KEYS}
+    totals["secs"] = round(time.perf_counter() - started, 3)
+    totals["older_than_days"] = days
+    logger.info("채팅 로그 압축 완료: %s", totals)
+    return {"ok": True, **totals}
+
+
+_STAT_KEYS = ("segments", "sessions", "rows", "raw_bytes", "packed_bytes")
+
+
+def _shard_archive_stats(path: str) -> Dict[str, int]:
+    with get_connection(path) as conn:
+        try:
+            row = conn.execute(
+                "SELECT COUNT(*) AS segments, COUNT(DISTINCT session_id) AS sessions, "
+                "COALESCE(SUM(row_count), 0) AS rows, COALESCE(SUM(raw_bytes), 0) AS raw_bytes, "
+                "COALESCE(SUM(LENGTH(payload)), 0) AS packed_bytes FROM chat_archive_segments"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return dict.fromkeys(_STAT_KEYS, 0)
+    return dict(row)
+
+
+def archive_stats(db_path: str) -> Dict[str, Any]:
+    """보관 세그먼트 전체 통계 (샤드별로 동시에 조회해 합산)."""
+    results = map_shards(str(db_path), _shard_archive_stats)
+    stats: Dict[str, Any] = {k: sum(r[k] for r in results) for k in _STAT_KEYS}
+    stats["ratio"] = round(stats["packed_bytes"] / stats["raw_bytes"], 4) if stats["raw_bytes"] else None
+    return stats
+
+
+__all__ = [
+    "compact_chat_logs",
+    "archive_stats",
+    "archived_rows",
+    "archived_recent",
+    "archived_rows_in_months",
+    "archived_page",
+    "archive_counts",
+    "delete_archived",
+    "index_archived",
+    "unindex_archived",
+    "rebuild_archive_index",
+    "pop_last_archived",
+    "iter_segments",
+    "decode_segment",
+    "encode_rows",
+]
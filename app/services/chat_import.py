@@ -0,0 +1,351 @@
+"""대화 기록 일괄 가져오기 (JSONL / CSV).
+
+예전 노트북 프로토타입이나 제휴사 내보내기 파일을 `save_message` 한 건씩이 아니라 스트리밍으로 읽어
+청크(IMPORT_CHUNK_ROWS) 단위로 검증하고, 샤드별 `executemany` 한 트랜잭션으로 넣습니다. 인덱스와
+FTS 트리거는 켠 채로 둡니다. 끝나면 영향받은 세션의 스냅샷을 비우고, 요약(turn_insights)과
+대화 메모리 인덱싱을 백그라운드에 예약합니다.
+
+레코드 필드 (JSONL은 객체 한 줄, CSV는 헤더 행):
+- session_id (없으면 default_session), role, text
+- created_at (ISO 문자열 또는 epoch 초/밀리초, 없으면 가져온 시각), meta_json (문자열 또는 객체, 선택)
+  오프셋 없는 시각은 내보낸 쪽의 현지 시각으로 보고 tz(기본 KST)를 붙이며, 앱과 같은 KST ISO(+09:00)로 저장합니다.
+별칭: content/message -> text, timestamp/time -> created_at, meta -> meta_json, human -> user, ai/bot -> assistant
+
+가져온 행은 기존 행 뒤의 id를 받습니다. 시간순 조회는 created_epoch 기준이라 영향이 없지만, id 기반
+키셋 페이지에서는 기존 대화 뒤에 나옵니다. 새 세션을 옮겨 올 때 쓰는 것을 전제로 합니다.
+"""
+from __future__ import annotations
+import codecs
+import csv
+import json
+import time
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import config
+from app.core.logger import get_logger
+from app.services.chat_repo import KST, _INSERT_SQL, chat_time_columns
+from app.services.snapshot_repo import drop_snapshot
+from app.utils import meta_codec
+from app.utils.db_utils import get_connection, shard_path
+
+logger = get_logger(__name__)
+
+ROLES = frozenset({"user", "assistant", "expert", "system"})
+_ROLE_ALIASES = {"human": "user", "ai": "assistant", "bot": "assistant"}
+_ALIASES = {
+    "content": "text",
+    "message": "text",
+    "timestamp": "created_at",
+    "time": "created_at",
+    "meta": "meta_json",
+    "session": "session_id",
+}
+_MAX_ERRORS = 20
+
+# (줄 번호, dict) 또는 해석에 실패한 줄이면 (줄 번호, ImportFormatError)
+Record = Tuple[int, Any]
+Row = Tuple[str, str, str, Any, str, int, str]
+
+
+class ImportFormatError(ValueError):
+    """레코드를 해석할 수 없을 때(형식 오류)."""
+
+
+# ---------------------------------------------------------------------------
+# 스트리밍 파서: 바이트/문자열 조각을 받아 (줄 번호, dict) 레코드를 내보냅니다
+# ---------------------------------------------------------------------------
+class RecordParser:
+    """조각 단위로 들어오는 JSONL/CSV를 레코드로 바꿉니다. 줄이 조각 경계에 걸쳐도 됩니다."""
+
+    def __init__(self, fmt: str):
+        fmt = (fmt or "").lower().lstrip(".")
+        if fmt not in ("jsonl", "csv"):
+            raise ValueError(f"unsupported import format: {fmt}")
+        self.fmt = fmt
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._tail = ""
+        self._lineno = 0
+        self._header: Optional[List[str]] = None
+        # CSV: 따옴표 안 줄바꿈으로 이어지는 논리 행
+        self._pending: List[str] = []
+        self._pending_start = 0
+
+    def feed(self, data: Any, final: bool = False) -> List[Record]:
+        text = self._decoder.decode(data, final) if isinstance(data, (bytes, bytearray)) else data
+        text = self._tail + text
+        lines = text.split("\n")
+        self._tail = "" if final else lines.pop()
+        if final and lines and lines[-1] == "":
+            lines.pop()
+        return self._parse_jsonl(lines) if self.fmt == "jsonl" else self._parse_csv(lines, final)
+
+    def _parse_jsonl(self, lines: List[str]) -> List[Record]:
+        out: List[Record] = []
+        for line in lines:
+            self._lineno += 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError as e:
+                out.append((self._lineno, ImportFormatError(f"invalid json: {e.msg}")))
+                continue
+            out.append((self._lineno, obj if isinstance(obj, dict) else ImportFormatError("not an object")))
+        return out
+
+    def _parse_csv(self, lines: List[str], final: bool) -> List[Record]:
+        logical: List[Tuple[int, str]] = []
+        for line in lines:
+            self._lineno += 1
+            if not self._pending:
+                self._pending_start = self._lineno
+            self._pending.append(line.rstrip("\r"))
+            # 따옴표 개수가 짝수면 한 행이 끝난 것입니다 (RFC 4180의 "" 이스케이프도 짝을 유지)
+            if sum(p.count('"') for p in self._pending) % 2 == 0:
+                logical.append((self._pending_start, "\n".join(self._pending)))
+                self._pending = []
+        if final and self._pending:
+            logical.append((self._pending_start, "\n".join(self._pending)))
+            self._pending = []
+
+        out: List[Record] = []
+        rows = csv.reader([text for _, text in logical])
+        for (lineno, text), values in zip(logical, rows):
+            if not text.strip():
+                continue
+            if self._header is None:
+                self._header = [h.strip() for h in values]
+                continue
+            if len(values) != len(self._header):
+                out.append((lineno, ImportFormatError(f"expected {len(self._header)} columns, got {len(values)}")))
+                continue
+            out.append((lineno, dict(zip(self._header, values))))
+        return out
+
+
+def iter_file_records(path: str, fmt: Optional[str] = None, block_size: int = 1 << 20) -> Iterator[Record]:
+    """파일을 블록 단위로 읽어 레코드를 내보냅니다. fmt가 없으면 확장자로 정합니다."""
+    parser = RecordParser(fmt or path.rsplit(".", 1)[-1])
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            yield from parser.feed(block)
+    yield from parser.feed(b"", final=True)
+
+
+# ---------------------------------------------------------------------------
+# 검증
+# ---------------------------------------------------------------------------
+def parse_tz(name: Optional[str]) -> tzinfo:
+    """가져오기 시간대: None/빈 값은 KST, 'UTC', '+09:00' 같은 오프셋, 또는 IANA 이름(Asia/Seoul)."""
+    name = (name or "").strip()
+    if not name:
+        return KST
+    if name.upper() in ("UTC", "Z"):
+        return timezone.utc
+    if name[0] in "+-" and ":" in name:
+        hours, minutes = name[1:].split(":", 1)
+        sign = -1 if name[0] == "-" else 1
+        return timezone(sign * timedelta(hours=int(hours), minutes=int(minutes)))
+    try:
+        from zoneinfo import ZoneInfo
+
+        return ZoneInfo(name)
+    except Exception:
+        raise ValueError(f"unknown timezone: {name!r}")
+
+
+def _created_at(value: Any, now_iso: str, tz: tzinfo = KST) -> str:
+    """created_at을 앱 형식(KST ISO, +09:00)으로 정규화합니다. 오프셋이 없으면 tz의 현지 시각으로 봅니다."""
+    if value in (None, ""):
+        return now_iso
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.strip().lstrip("-").isdigit()):
+        ts = float(value)
+        # 10^11보다 크면 밀리초로 봅니다 (초 단위로는 5138년)
+        if abs(ts) > 1e11:
+            ts /= 1000
+        return datetime.fromtimestamp(ts, KST).isoformat()
+    try:
+        dt = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError(f"invalid created_at: {value!r}")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=tz)
+    return dt.astimezone(KST).isoformat()
+
+
+def validate_record(rec: Dict[str, Any], default_session: Optional[str], now_iso: str, tz: tzinfo = KST) -> Row:
+    """레코드 하나를 chat_logs INSERT 행으로 바꿉니다. 잘못되면 ValueError."""
+    r = {_ALIASES.get(k.strip().lower(), k.strip().lower()): v for k, v in rec.items() if isinstance(k, str)}
+    session_id = str(r.get("session_id") or default_session or "").strip()
+    if not session_id:
+        raise ValueError("missing session_id")
+    role = str(r.get("role") or "").strip().lower()
+    role = _ROLE_ALIASES.get(role, role)
+    if role not in ROLES:
+        raise ValueError(f"invalid role: {r.get('role')!r}")
+    text = r.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("missing text")
+    created_at = _created_at(r.get("created_at"), now_iso, tz)
+    epoch, day = chat_time_columns(created_at)
+    if epoch is None:
+        raise ValueError(f"invalid created_at: {r.get('created_at')!r}")
+    meta = r.get("meta_json")
+    if meta in ("", None):
+        meta = None
+    elif not isinstance(meta, str):
+        meta = json.dumps(meta, ensure_ascii=False)
+    return (session_id, role, text, meta_codec.encode_meta(meta, text), created_at, epoch, day)
+
+
+# ---------------------------------------------------------------------------
+# 가져오기
+# ---------------------------------------------------------------------------
+class ChatImporter:
+    """검증한 청크를 샤드별 executemany 트랜잭션으로 기록하고 진행 상황을 모읍니다.
+
+    feed()는 청크마다 커밋하고 반환하므로, 요청 본문을 기다리는 동안 쓰기 잠금을 잡고 있지 않습니다.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, default_session: Optional[str] = None, tz: Optional[str] = None):
+        self.db_path = str(db_path or config.DB_PATH)
+        self.default_session = default_session
+        self.tz = parse_tz(tz)
+        self.started = time.perf_counter()
+        self.stats: Dict[str, Any] = {"read": 0, "imported": 0, "invalid": 0, "chunks": 0, "errors": []}
+        # 세션 -> 가져온 마지막 날짜 (후속 작업 예약용)
+        self.sessions: Dict[str, str] = {}
+
+    def _error(self, lineno: int, message: str) -> None:
+        self.stats["invalid"] += 1
+        if len(self.stats["errors"]) < _MAX_ERRORS:
+            self.stats["errors"].append({"line": lineno, "error": message})
+
+    def feed(self, records: Iterable[Record]) -> int:
+        """레코드 청크를 검증해 기록하고, 기록한 행 수를 반환합니다."""
+        now_iso = datetime.now(KST).isoformat()
+        groups: Dict[str, List[Row]] = {}
+        for lineno, rec in records:
+            self.stats["read"] += 1
+            if isinstance(rec, Exception):
+                self._error(lineno, str(rec))
+                continue
+            try:
+                row = validate_record(rec, self.default_session, now_iso, self.tz)
+            except (TypeError, ValueError, OverflowError, OSError) as e:
+                self._error(lineno, str(e))
+                continue
+            groups.setdefault(shard_path(self.db_path, row[0]), []).append(row)
+
+        written = 0
+        for path, rows in groups.items():
+            conn = get_connection(path)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(_INSERT_SQL, rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            written += len(rows)
+            for row in rows:
+                if row[6] > self.sessions.get(row[0], ""):
+                    self.sessions[row[0]] = row[6]
+        self.stats["imported"] += written
+        self.stats["chunks"] += 1
+        return written
+
+    def finish(self, summarize: bool = True, index: bool = True) -> Dict[str, Any]:
+        """세션 스냅샷을 비우고 후속 작업을 예약한 뒤 결과를 반환합니다."""
+        for sid in self.sessions:
+            with get_connection(self.db_path, sid) as conn:
+                drop_snapshot(conn, sid)
+        queue_followups(self.sessions, summarize=summarize, index=index)
+        elapsed = time.perf_counter() - self.started
+        result = {
+            "ok": True,
+            **self.stats,
+            "sessions": len(self.sessions),
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_min": int(self.stats["imported"] / elapsed * 60) if elapsed else None,
+            "summarize_queued": summarize,
+            "index_queued": index,
+        }
+        logger.info(
+            "대화 가져오기 완료: imported=%d, invalid=%d, sessions=%d, %.2fs",
+            result["imported"], result["invalid"], result["sessions"], elapsed,
+        )
+        return result
+
+
+def _chunks(records: Iterable[Record], size: int) -> Iterator[List[Record]]:
+    chunk: List[Record] = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_chat_records(
+    records: Iterable[Record],
+    db_path: Optional[str] = None,
+    *,
+    default_session: Optional[str] = None,
+    tz: Optional[str] = None,
+    chunk_rows: Optional[int] = None,
+    summarize: bool = True,
+    index: bool = True,
+) -> Dict[str, Any]:
+    """레코드 스트림을 청크 단위로 가져옵니다 (스크립트/동기 경로)."""
+    importer = ChatImporter(db_path, default_session, tz)
+    for chunk in _chunks(records, max(1, chunk_rows or config.IMPORT_CHUNK_ROWS)):
+        importer.feed(chunk)
+    return importer.finish(summarize=summarize, index=index)
+
+
+# ---------------------------------------------------------------------------
+# 후속 작업
+# ---------------------------------------------------------------------------
+def summarize_imported_day(session_id: str, day: str) -> None:
+    """가져온 마지막 날짜의 대화로 일간 요약/페르소나를 만듭니다 (turn_insights와 같은 경로)."""
+    from app.core.dependencies import get_chat_repo
+    from app.nodes.turn_insights_node import run_turn_insights
+
+    rows = get_chat_repo().get_rows_by_day_range(session_id, day, day)
+    recent = [{"role": r.role, "text": r.text} for r in rows[-20:]]
+    if recent:
+        run_turn_insights(session_id, day, "", {"recent_chats": recent, "weekly_summaries": []})
+
+
+def queue_followups(sessions: Dict[str, str], summarize: bool = True, index: bool = True) -> None:
+    """세션별 요약과 대화 메모리 인덱싱을 백그라운드에 예약합니다."""
+    if not sessions or not (summarize or index):
+        return
+    from app.core.background import submit_background
+    from app.core.dependencies import get_memory_index
+
+    for sid, day in sessions.items():
+        if index:
+            get_memory_index().schedule(sid)
+        if summarize:
+            submit_background(summarize_imported_day, sid, day)
+
+
+__all__ = [
+    "ChatImporter",
+    "RecordParser",
+    "ImportFormatError",
+    "import_chat_records",
+    "iter_file_records",
+    "validate_record",
+    "parse_tz",
+    "queue_followups",
+]
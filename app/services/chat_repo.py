@@ -1,12 +1,73 @@
+import atexit
+import threading
+import time
+import weakref
 from pathlib import Path
-from typing import Optional, List
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, List, Tuple
 from datetime import datetime, timezone, timedelta
-from pydantic import BaseModel, Field
-from app.utils.db_utils import get_connection
+from pydantic import BaseModel, Field, PrivateAttr
+from app.core.config import config
+from app.utils import meta_codec
+from app.utils.db_utils import get_connection, map_shards, shard_path
+from app.services.snapshot_repo import push_recent_turns, drop_snapshot
+from app.services.persona_repo import invalidate_persona_cache
+from app.services import activity_repo, chat_archive
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
 
+# KST는 UTC+9입니다
+KST = timezone(timedelta(hours=9))
+
+
+def chat_time_columns(created_at: str) -> Tuple[Optional[int], Optional[str]]:
+    """created_at 문자열을 (UTC epoch 밀리초, KST 날짜)로 정규화합니다.
+
+    오프셋이 없는 값은 UTC(CURRENT_TIMESTAMP 기본값)로 봅니다. 해석할 수 없으면 (None, None)을
+    반환하며, 이때는 DB 트리거가 같은 규칙으로 채웁니다.
+    """
+    try:
+        dt = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError):
+        return None, None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(round(dt.timestamp() * 1000)), dt.astimezone(KST).date().isoformat()
+
+
+_INSERT_SQL = """
+    INSERT INTO chat_logs (session_id, role, text, meta_json, created_at, created_epoch, day)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# write-behind 모드로 동작 중인 저장소 (종료 시 일괄 flush)
+_write_behind_repos: "weakref.WeakSet[ChatRepository]" = weakref.WeakSet()
+
+
+def flush_all_chat_buffers() -> None:
+    """write-behind 버퍼를 모두 DB에 기록하고 writer 스레드를 멈춥니다. 종료 시 호출합니다."""
+    for repo in list(_write_behind_repos):
+        try:
+            repo.close()
+        except Exception:
+            logger.exception("채팅 버퍼 flush 실패: %s", repo.db_path)
+
+
+atexit.register(flush_all_chat_buffers)
+
+
+def _forget_memory(session_id: str) -> None:
+    # 순환 import를 피하려고 지연 import합니다 (dependencies -> chat_repo)
+    from app.core.dependencies import get_memory_index
+
+    get_memory_index().forget_session(session_id)
+
+
+def _evict_memory(session_id: str) -> None:
+    from app.core.dependencies import get_memory_index
+
+    get_memory_index().evict(session_id)
+
 
 class ChatLog(BaseModel):
     id: Optional[int] = None
@@ -15,10 +76,85 @@ class ChatLog(BaseModel):
     text: str
     meta_json: Optional[str] = None
     created_at: Optional[str] = None
+    created_epoch: Optional[int] = Field(default=None, description="UTC epoch(ms), 정렬 기준")
+    day: Optional[str] = Field(default=None, description="KST 기준 날짜(YYYY-MM-DD)")
+
+    # DB에서 읽은 인코딩된 meta_json 원본(meta_codec). 리치 결과가 필요할 때만 meta_text()로 풉니다
+    _meta_raw: Any = PrivateAttr(default=None)
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "ChatLog":
+        stored = row.get("meta_json")
+        if stored is None or not meta_codec.is_encoded(stored):
+            return cls(**row)
+        m = cls(**{**row, "meta_json": None})
+        m._meta_raw = stored
+        return m
+
+    def meta_text(self) -> Optional[str]:
+        """meta_json을 평문 JSON 문자열로 반환합니다. 인코딩된 값은 이때 처음 풉니다."""
+        if self._meta_raw is not None:
+            return meta_codec.meta_to_json(self._meta_raw, self.text)
+        return self.meta_json
+
+    def has_meta(self) -> bool:
+        return self._meta_raw is not None or self.meta_json is not None
+
+    def decoded_meta(self) -> Any:
+        """meta_json을 풀어 객체로 반환합니다(없거나 JSON이 아니면 None)."""
+        stored = self._meta_raw if self._meta_raw is not None else self.meta_json
+        return meta_codec.decode_meta(stored, self.text)
+
+
+# 대량 조회용 경량 행. DB 행을 검증 없이 그대로 담는 slotted 튜플입니다.
+CHAT_FIELDS: Tuple[str, ...] = ("id", "session_id", "role", "text", "meta_json", "created_at", "created_epoch", "day")
+_CHAT_SELECT = ", ".join(CHAT_FIELDS)
+
+
+class ChatRow(NamedTuple):
+    id: Optional[int]
+    session_id: str
+    role: str
+    text: str
+    meta_json: meta_codec.StoredMeta  # 저장 형식 그대로 (rows_to_dicts에서 필요할 때만 풂)
+    created_at: Optional[str]
+    created_epoch: Optional[int]
+    day: Optional[str]
+
+
+def _as_row(item: Any) -> ChatRow:
+    if isinstance(item, dict):
+        return ChatRow(*(item.get(f) for f in CHAT_FIELDS))
+    return ChatRow(*(getattr(item, f) for f in CHAT_FIELDS))
+
+
+def rows_to_dicts(rows: Iterable[ChatRow], include_meta: bool = False) -> List[Dict[str, Any]]:
+    """ChatRow 목록을 응답용 dict 목록으로 변환합니다.
+
+    meta_json은 include_meta=True일 때만 평문 JSON으로 풀어 담고, 아니면 None입니다.
+    has_meta는 리치 결과가 있는지 알려 주므로 클라이언트가 필요한 메시지만 따로 조회할 수 있습니다.
+    """
+    out = []
+    for r in rows:
+        d = dict(zip(CHAT_FIELDS, r))
+        d["meta_json"] = meta_codec.meta_to_json(r.meta_json, r.text) if include_meta else None
+        d["has_meta"] = r.meta_json is not None
+        out.append(d)
+    return out
 
 
 class ChatRepository:
-    def __init__(self, db_path: str = "storage/db/app.db"):
+    """chat_logs 저장소.
+
+    write_behind=True면 save_message는 메시지를 메모리 큐에 넣고 바로 반환하며, 백그라운드
+    writer가 CHAT_FLUSH_INTERVAL_MS마다 또는 CHAT_FLUSH_BATCH개가 모이면 한 트랜잭션으로 기록합니다
+    (그룹 커밋). 아직 기록되지 않은 메시지는 조회 시 같은 세션 결과에 겹쳐(overlay) 보여 주므로
+    자기 쓰기는 바로 읽힙니다. 대기 중인 메시지의 id는 기록 후에 채워집니다.
+
+    압축 보관된(chat_archive) 오래된 대화도 조회 결과에 투명하게 합쳐 반환합니다.
+    """
+
+    def __init__(self, db_path: str = "storage/db/app.db", write_behind: Optional[bool] = None):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         
@@ -28,87 +164,448 @@ class ChatRepository:
         except Exception:
             pass
 
-    def save_message(self, message: ChatLog):
-        """한 턴의 채팅을 저장합니다."""
-        with get_connection(str(self.db_path)) as conn:
-            query = """
-                INSERT INTO chat_logs (session_id, role, text, meta_json, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            """
-            # KST는 UTC+9입니다
-            kst = timezone(timedelta(hours=9))
-            conn.execute(
-                query,
+        self.write_behind = config.CHAT_WRITE_BEHIND if write_behind is None else write_behind
+        self._queue: List[ChatLog] = []  # 아직 트랜잭션에 들어가지 않은 메시지 (저장 순서)
+        self._inflight: List[ChatLog] = []  # 기록 중인 배치 (커밋 전까지 overlay에 포함)
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # 배치 기록 직렬화 + overlay 조회와의 경계
+        self._closing = False
+        self._writer: Optional[threading.Thread] = None
+        self._flush_listeners: List[Callable[[List[str]], None]] = []
+        self.buffer_stats: Dict[str, int] = {"enqueued": 0, "flushed": 0, "batches": 0, "failed": 0}
+        if self.write_behind:
+            self._writer = threading.Thread(target=self._writer_loop, name="chat-writer", daemon=True)
+            self._writer.start()
+            _write_behind_repos.add(self)
+
+    # ------------------------------------------------------------------
+    # 쓰기
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _prepare(message: ChatLog) -> ChatLog:
+        message.created_at = message.created_at or datetime.now(KST).isoformat()
+        if message.created_epoch is None or message.day is None:
+            message.created_epoch, message.day = chat_time_columns(message.created_at)
+        return message
+
+    @staticmethod
+    def _insert(conn, messages: List[ChatLog]) -> None:
+        """메시지를 현재 트랜잭션에 INSERT하고 세션 스냅샷의 최근 대화도 함께 갱신합니다."""
+        turns: Dict[str, List[dict]] = {}
+        for m in messages:
+            cur = conn.execute(
+                _INSERT_SQL,
                 (
-                    message.session_id,
-                    message.role,
-                    message.text,
-                    message.meta_json,
-                    message.created_at or datetime.now(kst).isoformat(),
+                    m.session_id,
+                    m.role,
+                    m.text,
+                    meta_codec.encode_meta(m.meta_json, m.text),
+                    m.created_at,
+                    m.created_epoch,
+                    m.day,
                 ),
             )
+            m.id = cur.lastrowid
+            turns.setdefault(m.session_id, []).append(
+                {"id": m.id, "role": m.role, "text": m.text, "created_at": m.created_at}
+            )
+        for session_id, items in turns.items():
+            push_recent_turns(conn, session_id, items)
+
+    def save_message(self, message: ChatLog):
+        """한 턴의 채팅을 저장합니다. write-behind 모드에서는 큐에 넣고 바로 반환합니다."""
+        self._prepare(message)
+        if self.write_behind and not self._closing:
+            with self._cond:
+                self._queue.append(message)
+                self.buffer_stats["enqueued"] += 1
+                if len(self._queue) >= config.CHAT_FLUSH_BATCH:
+                    self._cond.notify()
+                elif len(self._queue) == 1:
+                    self._cond.notify()
+            return
+        with get_connection(str(self.db_path), message.session_id) as conn:
+            self._insert(conn, [message])
             conn.commit()
         logger.debug("채팅 저장 완료: session=%s, role=%s", message.session_id, message.role)
 
+    def add_flush_listener(self, fn: Callable[[List[str]], None]) -> None:
+        """배치가 커밋될 때마다 기록된 session_id 목록으로 호출할 콜백을 등록합니다."""
+        self._flush_listeners.append(fn)
+
+    def _writer_loop(self) -> None:
+        interval = max(config.CHAT_FLUSH_INTERVAL_MS, 1) / 1000
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if self._closing:
+                    return
+                # 첫 메시지 이후 interval 동안 배치가 차기를 기다립니다
+                deadline = time.monotonic() + interval
+                while len(self._queue) < config.CHAT_FLUSH_BATCH and not self._closing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            try:
+                self._flush_batch()
+            except Exception:
+                logger.exception("채팅 배치 기록 실패")
+
+    def _flush_batch(self) -> int:
+        with self._flush_lock:
+            with self._cond:
+                batch = self._queue[: config.CHAT_FLUSH_BATCH]
+                del self._queue[: len(batch)]
+                self._inflight = batch
+            if not batch:
+                return 0
+            written = batch
+            try:
+                failed = self._write_groups(batch)
+                if failed:
+                    # 실패한 샤드의 트랜잭션만 롤백되었으므로 그 메시지만 한 건씩 다시 기록하고, 실패한 건만 버립니다
+                    logger.error("채팅 배치 기록 실패, 개별 기록으로 재시도: size=%d", len(failed))
+                    failed_ids = {id(m) for m in failed}
+                    written = [m for m in batch if id(m) not in failed_ids]
+                    for m in failed:
+                        try:
+                            with get_connection(str(self.db_path), m.session_id) as conn:
+                                self._insert(conn, [m])
+                                conn.commit()
+                            written.append(m)
+                        except Exception:
+                            self.buffer_stats["failed"] += 1
+                            logger.exception("채팅 메시지 기록 실패(버림): session=%s", m.session_id)
+            finally:
+                with self._cond:
+                    self._inflight = []
+            self.buffer_stats["flushed"] += len(written)
+            self.buffer_stats["batches"] += 1
+        logger.debug("채팅 배치 기록: rows=%d", len(written))
+        sessions = list(dict.fromkeys(m.session_id for m in written))
+        for fn in self._flush_listeners:
+            try:
+                fn(sessions)
+            except Exception:
+                logger.exception("채팅 flush 리스너 실패")
+        return len(written)
+
+    def _write_groups(self, batch: List[ChatLog]) -> List[ChatLog]:
+        """배치를 샤드별로 나눠 샤드마다 한 트랜잭션으로 기록하고, 롤백된 샤드의 메시지를 반환합니다.
+
+        샤드가 여럿이면 샤드별 트랜잭션을 동시에 커밋합니다.
+        """
+        groups: Dict[str, List[ChatLog]] = {}
+        for m in batch:
+            groups.setdefault(shard_path(str(self.db_path), m.session_id), []).append(m)
+
+        def write(path: str) -> List[ChatLog]:
+            msgs = groups.get(path)
+            if not msgs:
+                return []
+            try:
+                with get_connection(path) as conn:
+                    self._insert(conn, msgs)
+                    conn.commit()
+            except Exception:
+                logger.exception("채팅 배치 기록 실패: shard=%s, size=%d", path, len(msgs))
+                return msgs
+            return []
+
+        if len(groups) == 1:
+            return write(next(iter(groups)))
+        return [m for failed in map_shards(str(self.db_path), write) for m in failed]
+
+    def flush(self) -> int:
+        """대기 중인 메시지를 모두 즉시 기록하고 기록한 건수를 반환합니다."""
+        total = 0
+        while True:
+            with self._cond:
+                if not self._queue:
+                    return total
+            total += self._flush_batch()
+
+    def close(self) -> None:
+        """writer 스레드를 멈추고 남은 메시지를 기록합니다. 이후 저장은 동기로 처리합니다."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+        self.flush()
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._queue) + len(self._inflight)
+
+    # ------------------------------------------------------------------
+    # 읽기 (대기 중 메시지 overlay)
+    # ------------------------------------------------------------------
+    def _pending_for(self, session_id: str) -> List[ChatLog]:
+        if not self.write_behind:
+            return []
+        with self._cond:
+            return [m for m in (*self._inflight, *self._queue) if m.session_id == session_id]
+
+    def _read(self, session_id: str, fetch: Callable[[], List[ChatLog]]) -> Tuple[List[ChatLog], List[ChatLog]]:
+        """DB 조회 결과와 아직 기록되지 않은 같은 세션 메시지를 함께 반환합니다.
+
+        대기 중인 메시지가 있으면 배치 기록과 겹치지 않도록 flush 경계 안에서 읽어, 같은 메시지가
+        두 번 보이거나 빠지지 않게 합니다. 대기 중인 메시지가 없으면 잠금 없이 읽습니다.
+        """
+        if not self._pending_for(session_id):
+            return fetch(), []
+        with self._flush_lock:
+            pending = [m.model_copy() for m in self._pending_for(session_id)]
+            return fetch(), pending
+
+    @staticmethod
+    def _merge(rows: List[ChatLog], pending: List[ChatLog]) -> List[ChatLog]:
+        if not pending:
+            return rows
+        return sorted(rows + pending, key=lambda m: (m.created_epoch or 0, m.id is None, m.id or 0))
+
     def get_recent_messages(self, session_id: str, limit: int = 10) -> List[ChatLog]:
         """최근 N개의 메시지 조회 (최신순 정렬)"""
-        with get_connection(str(self.db_path)) as conn:
-            query = """
-                SELECT * FROM chat_logs
-                WHERE session_id = ?
-                ORDER BY created_at DESC
-                LIMIT ?
-            """
-            rows = conn.execute(query, (session_id, limit)).fetchall()
-            return [ChatLog(**r) for r in reversed(rows)]  # 시간순으로 뒤집어서 반환
+        def fetch() -> List[ChatLog]:
+            with get_connection(str(self.db_path), session_id) as conn:
+                query = """
+                    SELECT * FROM chat_logs
+                    WHERE session_id = ?
+                    ORDER BY created_epoch DESC, id DESC
+                    LIMIT ?
+                """
+                rows = conn.execute(query, (session_id, limit)).fetchall()
+                rows.reverse()  # 시간순으로 뒤집어서 반환
+                if len(rows) < limit:
+                    # hot 테이블에 부족한 만큼 보관 세그먼트에서 채웁니다
+                    before = rows[0]["id"] if rows else None
+                    rows = chat_archive.archived_recent(conn, session_id, limit - len(rows), before) + rows
+                return [ChatLog.from_row(r) for r in rows]
+
+        rows, pending = self._read(session_id, fetch)
+        return self._merge(rows, pending)[-limit:] if limit > 0 else []
 
     def get_messages_by_date(self, session_id: str, target_date: str) -> List[ChatLog]:
         """특정 날짜(YYYY-MM-DD)의 메시지 조회"""
-        with get_connection(str(self.db_path)) as conn:
-            # created_at은 ISO 포맷(예: 2025-10-31T12:34:56+00:00)이라 앞 10글자가 날짜임
-            query = """
+        def fetch() -> List[ChatLog]:
+            with get_connection(str(self.db_path), session_id) as conn:
+                # day는 KST 기준 날짜라 (session_id, day, created_epoch) 인덱스 범위 조회가 됩니다
+                query = """
+                    SELECT * FROM chat_logs
+                    WHERE session_id = ?
+                      AND day = ?
+                    ORDER BY created_epoch ASC, id ASC
+                """
+                rows = conn.execute(query, (session_id, target_date)).fetchall()
+                archived = chat_archive.archived_rows(conn, session_id, day=target_date)
+                return [ChatLog.from_row(r) for r in archived + rows]
+
+        rows, pending = self._read(session_id, fetch)
+        return self._merge(rows, [m for m in pending if m.day == target_date])
+
+    def get_messages_by_ids(self, session_id: str, ids: List[int]) -> List[ChatLog]:
+        """주어진 id 목록의 메시지 조회 (id 오름차순)"""
+        if not ids:
+            return []
+        with get_connection(str(self.db_path), session_id) as conn:
+            qs = ", ".join(["?"] * len(ids))
+            query = f"""
                 SELECT * FROM chat_logs
                 WHERE session_id = ?
-                  AND SUBSTR(created_at, 1, 10) = ?
-                ORDER BY created_at ASC
+                  AND id IN ({qs})
+                ORDER BY id ASC
             """
-            rows = conn.execute(query, (session_id, target_date)).fetchall()
-            return [ChatLog(**r) for r in rows]
+            rows = conn.execute(query, (session_id, *ids)).fetchall()
+            missing = set(ids) - {r["id"] for r in rows}
+            if missing:
+                rows = sorted(rows + chat_archive.archived_rows(conn, session_id, ids=list(missing)), key=lambda r: r["id"])
+            return [ChatLog.from_row(r) for r in rows]
 
     def get_session_messages(self, session_id: str) -> List[ChatLog]:
         """세션 전체 대화 조회"""
-        with get_connection(str(self.db_path)) as conn:
-            query = """
-                SELECT * FROM chat_logs
-                WHERE session_id = ?
-                ORDER BY created_at ASC
-            """
-            rows = conn.execute(query, (session_id,)).fetchall()
-            return [ChatLog(**r) for r in rows]
+        def fetch() -> List[ChatLog]:
+            with get_connection(str(self.db_path), session_id) as conn:
+                query = """
+                    SELECT * FROM chat_logs
+                    WHERE session_id = ?
+                    ORDER BY created_epoch ASC, id ASC
+                """
+                rows = conn.execute(query, (session_id,)).fetchall()
+                return [ChatLog.from_row(r) for r in chat_archive.archived_rows(conn, session_id) + rows]
+
+        rows, pending = self._read(session_id, fetch)
+        return self._merge(rows, pending)
+
+    # ------------------------------------------------------------------
+    # 대량 조회 (경량 튜플 경로)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _select_rows(conn, query: str, params: tuple) -> List[ChatRow]:
+        # dict_factory를 거치지 않고 sqlite 튜플을 바로 ChatRow로 감쌉니다
+        cur = conn.cursor()
+        cur.row_factory = None
+        return list(map(ChatRow._make, cur.execute(query, params)))
+
+    @staticmethod
+    def _overlay_rows(rows: List[ChatRow], pending: List[ChatLog], keep: Callable[[Any], bool]) -> List[ChatRow]:
+        if not pending:
+            return rows
+        extra = [_as_row(m) for m in pending if keep(m)]
+        return sorted(rows + extra, key=lambda r: (r.created_epoch or 0, r.id is None, r.id or 0))
+
+    def get_session_rows(self, session_id: str) -> List[ChatRow]:
+        """get_session_messages의 경량 버전. 모델 생성 없이 ChatRow 튜플 목록(시간순)을 반환합니다."""
+        def fetch() -> List[ChatRow]:
+            with get_connection(str(self.db_path), session_id) as conn:
+                rows = self._select_rows(
+                    conn,
+                    f"SELECT {_CHAT_SELECT} FROM chat_logs WHERE session_id = ? ORDER BY created_epoch ASC, id ASC",
+                    (session_id,),
+                )
+                archived = chat_archive.archived_rows(conn, session_id)
+            return [_as_row(r) for r in archived] + rows if archived else rows
+
+        rows, pending = self._read(session_id, fetch)
+        return self._overlay_rows(rows, pending, lambda m: True)
+
+    def get_rows_by_day_range(
+        self, session_id: str, start_day: str, end_day: str, role: Optional[str] = None
+    ) -> List[ChatRow]:
+        """KST 날짜 구간 [start_day, end_day]의 메시지를 ChatRow 튜플로 반환합니다(role로 거를 수 있음).
+
+        (session_id, day, created_epoch) 인덱스 범위 조회이며, 보관 세그먼트는 해당 월만 풉니다.
+        """
+        def in_range(m: Any) -> bool:
+            day = m.get("day") if isinstance(m, dict) else m.day
+            r = m.get("role") if isinstance(m, dict) else m.role
+            return bool(day) and start_day <= day <= end_day and (role is None or r == role)
+
+        def fetch() -> List[ChatRow]:
+            query = f"SELECT {_CHAT_SELECT} FROM chat_logs WHERE session_id = ? AND day BETWEEN ? AND ?"
+            params: tuple = (session_id, start_day, end_day)
+            if role is not None:
+                query += " AND role = ?"
+                params += (role,)
+            query += " ORDER BY day ASC, created_epoch ASC, id ASC"
+            with get_connection(str(self.db_path), session_id) as conn:
+                rows = self._select_rows(conn, query, params)
+                months = chat_archive.archived_rows_in_months(conn, session_id, start_day[:7], end_day[:7])
+            archived = [_as_row(r) for r in months if in_range(r)]
+            if not archived:
+                return rows
+            return sorted(archived + rows, key=lambda r: (r.created_epoch or 0, r.id or 0))
+
+        rows, pending = self._read(session_id, fetch)
+        return self._overlay_rows(rows, pending, in_range)
+
+    def get_messages_page(
+        self,
+        session_id: str,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: int = 50,
+        day: Optional[str] = None,
+    ) -> Tuple[List[ChatLog], bool]:
+        """id(기본 키) 기준 키셋 페이지 조회. (id 오름차순 메시지, 더 있는지 여부)를 반환합니다.
+
+        - after_id만 주면 그 이후의 가장 오래된 limit개(앞으로 넘기기)
+        - 그 외(before_id만 또는 둘 다 없음)는 before_id 이전의 가장 최근 limit개(뒤로 넘기기)
+        - 둘 다 주면 그 사이 구간에서 before_id 쪽(최근)부터 limit개
+        - day(YYYY-MM-DD, KST)를 주면 그날 메시지 안에서만 넘깁니다
+        """
+        # 대기 중인 메시지는 아직 id가 없으므로 먼저 기록합니다
+        if self._pending_for(session_id):
+            self.flush()
+        limit = max(1, int(limit))
+        where = ["session_id = ?"]
+        params: list = [session_id]
+        if before_id is not None:
+            where.append("id < ?")
+            params.append(before_id)
+        if after_id is not None:
+            where.append("id > ?")
+            params.append(after_id)
+        if day:
+            where.append("day = ?")
+            params.append(day)
+        forward = after_id is not None and before_id is None
+        query = f"""
+            SELECT * FROM chat_logs
+            WHERE {' AND '.join(where)}
+            ORDER BY id {'ASC' if forward else 'DESC'}
+            LIMIT ?
+        """
+        with get_connection(str(self.db_path), session_id) as conn:
+            rows = conn.execute(query, (*params, limit + 1)).fetchall()
+            if len(rows) <= limit or forward:
+                # 보관 행은 id가 보존되므로 같은 키셋 조건으로 합친 뒤 다시 자릅니다
+                archived = chat_archive.archived_page(conn, session_id, before_id, after_id, limit + 1, forward, day)
+                if archived:
+                    rows = sorted(rows + archived, key=lambda r: r["id"], reverse=not forward)[: limit + 1]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not forward:
+            rows.reverse()
+        return [ChatLog.from_row(r) for r in rows], has_more
+
+    def count_messages(self, session_id: str) -> dict:
+        """세션 메시지 수와 첫/마지막 id (idx_chat_logs_session 인덱스만 사용)"""
+        if self._pending_for(session_id):
+            self.flush()
+        with get_connection(str(self.db_path), session_id) as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS count, MIN(id) AS first_id, MAX(id) AS last_id FROM chat_logs WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            archived = chat_archive.archive_counts(conn, session_id)
+        result = dict(row)
+        if archived["count"]:
+            result["count"] += archived["count"]
+            result["first_id"] = min(i for i in (result["first_id"], archived["first_id"]) if i is not None)
+            result["last_id"] = max(i for i in (result["last_id"], archived["last_id"]) if i is not None)
+        return result
 
     def delete_session(self, session_id: str):
         """특정 세션 전체 대화 삭제"""
-        with get_connection(str(self.db_path)) as conn:
+        self.flush()
+        with get_connection(str(self.db_path), session_id) as conn:
             conn.execute("DELETE FROM chat_logs WHERE session_id = ?", (session_id,))
+            chat_archive.delete_archived(conn, session_id)
+            conn.execute("DELETE FROM chat_embeddings WHERE session_id = ?", (session_id,))
+            activity_repo.session_chats_deleted(conn, session_id)
+            drop_snapshot(conn, session_id)
             conn.commit()
+        _forget_memory(session_id)
+        invalidate_persona_cache(session_id)
         logger.info("세션 전체 메시지 삭제: session=%s", session_id)
 
     def delete_last_message(self, session_id: str) -> bool:
         """가장 최근 채팅 메시지 1개 삭제"""
-        with get_connection(str(self.db_path)) as conn:
+        self.flush()
+        with get_connection(str(self.db_path), session_id) as conn:
             # 가장 최근 메시지 ID 조회
             query = """
-                SELECT id FROM chat_logs
+                SELECT id, role, day FROM chat_logs
                 WHERE session_id = ?
-                ORDER BY created_at DESC
+                ORDER BY created_epoch DESC, id DESC
                 LIMIT 1
             """
             row = conn.execute(query, (session_id,)).fetchone()
             if not row:
-                return False
-            
-            # 해당 메시지 삭제
-            conn.execute("DELETE FROM chat_logs WHERE id = ?", (row["id"],))
+                # hot 테이블이 비어 있으면 보관 세그먼트의 마지막 메시지를 지웁니다
+                row = chat_archive.pop_last_archived(conn, session_id)
+                if row is None:
+                    return False
+            else:
+                # 해당 메시지 삭제
+                conn.execute("DELETE FROM chat_logs WHERE id = ?", (row["id"],))
+            activity_repo.chat_deleted(conn, session_id, row.get("day"), row.get("role"))
+            conn.execute("DELETE FROM chat_embeddings WHERE chat_id = ?", (row["id"],))
+            drop_snapshot(conn, session_id)
             conn.commit()
+            _evict_memory(session_id)
             logger.info("가장 최근 메시지 삭제 완료: id=%s, session=%s", row["id"], session_id)
             return True
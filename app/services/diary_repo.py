@@ -1,12 +1,13 @@
 from pathlib import Path
-from typing import Optional, List
+from typing import NamedTuple, Optional, List, Tuple
 from datetime import date
 from datetime import datetime as _dt
 import re
 import json
 from pydantic import BaseModel, Field
-from app.utils.db_utils import get_connection, upsert_from_model, fetch_one, fetch_all, prepare_model_sql_parts
+from app.utils.db_utils import get_connection, upsert_from_model, fetch_one, fetch_all, shard_path_for_id
 from app.core.logger import get_logger
+from app.services.snapshot_repo import touch_snapshot, drop_snapshot
 
 logger = get_logger(__name__)
 
@@ -22,6 +23,20 @@ class DiaryEntry(BaseModel):
     created_at: Optional[str] = Field(description="생성 일시", default=None)
 
 
+# 대량 조회용 경량 행 (검증 없는 slotted 튜플)
+DIARY_FIELDS: Tuple[str, ...] = ("id", "session_id", "date", "title", "content", "used_chats_json", "created_at")
+
+
+class DiaryRow(NamedTuple):
+    id: int
+    session_id: str
+    date: str
+    title: Optional[str]
+    content: str
+    used_chats_json: Optional[str]
+    created_at: Optional[str]
+
+
 class DiaryRepository:
     def __init__(self, db_path: str = "storage/db/app.db"):
         self.db_path = Path(db_path)
@@ -59,47 +74,33 @@ class DiaryRepository:
     def save_diary(self, diary: DiaryEntry):
         """일기 저장 (upsert)"""
         logger.debug("save_diary 호출: session=%s, date=%s", getattr(diary, 'session_id', None), getattr(diary, 'date', None))
-        with get_connection(str(self.db_path)) as conn:
+        with get_connection(str(self.db_path), diary.session_id) as conn:
             # 날짜를 'YYYY-MM-DD'로 정규화
             try:
                 diary.date = self._normalize_date_str(diary.date)  # type: ignore
             except Exception:
                 pass
-            # 중복 체크
-            cur = conn.execute(
-                "SELECT id FROM diaries WHERE session_id = ? AND date = ?",
+            try:
+                if getattr(diary, "used_chats", None):
+                    diary.used_chats_json = json.dumps(diary.used_chats, ensure_ascii=False)
+                    diary.used_chats = None
+            except Exception:
+                pass
+            # (session_id, date) UNIQUE 키 기준 한 문장 upsert. 주어지지 않은(None) 필드는 기존 값을 유지합니다
+            upsert_from_model(conn, "diaries", diary, pk_field="id", conflict_cols=("session_id", "date"), commit=False)
+            status = conn.execute(
+                "SELECT id, date, title, created_at FROM diaries WHERE session_id = ? AND date = ?",
                 (diary.session_id, diary.date),
-            )
-            row = cur.fetchone()
-            if row:
-                diary_id = row["id"]
-                diary.id = diary_id
-                try:
-                    if getattr(diary, "used_chats", None):
-                        diary.used_chats_json = json.dumps(diary.used_chats, ensure_ascii=False)
-                        diary.used_chats = None
-                except Exception:
-                    pass
-                _, set_clause, values, _ = prepare_model_sql_parts(diary, pk_field="id")
-                if set_clause:
-                    query = f"UPDATE diaries SET {set_clause} WHERE id = ?"
-                    conn.execute(query, (*values, diary_id))
-                    logger.info("일기 업데이트: id=%s, session=%s", diary_id, diary.session_id)
-                conn.commit()
-            else:
-                try:
-                    if getattr(diary, "used_chats", None):
-                        diary.used_chats_json = json.dumps(diary.used_chats, ensure_ascii=False)
-                        diary.used_chats = None
-                except Exception:
-                    pass
-                from app.utils.db_utils import upsert_from_model
-                upsert_from_model(conn, "diaries", diary, pk_field="id")
-                logger.info("일기 신규 저장: session=%s, date=%s", diary.session_id, diary.date)
+            ).fetchone()
+            if status:
+                diary.id = status["id"]
+                touch_snapshot(conn, diary.session_id, guard="diary_date", diary_date=status["date"], diary_json=status)
+            conn.commit()
+        logger.info("일기 저장: id=%s, session=%s, date=%s", diary.id, diary.session_id, diary.date)
 
     def get_diary_by_date(self, session_id: str, target_date: str) -> Optional[DiaryEntry]:
         """특정 날짜 일기 1개 조회"""
-        with get_connection(str(self.db_path)) as conn:
+        with get_connection(str(self.db_path), session_id) as conn:
             target_date = self._normalize_date_str(target_date) or target_date
             cur = conn.execute(
                 "SELECT * FROM diaries WHERE session_id = ? AND date = ?",
@@ -117,9 +118,24 @@ class DiaryRepository:
             return d
         logger.debug("get_diary_by_date 조회: session=%s, date=%s, result_id=%s", session_id, target_date, d.id if d else None)
 
+    def list_diary_rows(self, session_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[DiaryRow]:
+        """전체 또는 기간별 일기 목록을 DiaryRow 튜플로 조회 (최신 날짜순, 모델 생성 없음)"""
+        query = f"SELECT {', '.join(DIARY_FIELDS)} FROM diaries WHERE session_id = ?"
+        params: tuple = (session_id,)
+        if start_date and end_date:
+            query += " AND date BETWEEN ? AND ?"
+            params += (start_date, end_date)
+        query += " ORDER BY date DESC"
+        with get_connection(str(self.db_path), session_id) as conn:
+            cur = conn.cursor()
+            cur.row_factory = None
+            rows = list(map(DiaryRow._make, cur.execute(query, params)))
+        logger.debug("list_diary_rows 조회: session=%s, start=%s, end=%s, count=%d", session_id, start_date, end_date, len(rows))
+        return rows
+
     def list_diaries(self, session_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[DiaryEntry]:
         """전체 또는 기간별 일기 목록 조회"""
-        with get_connection(str(self.db_path)) as conn:
+        with get_connection(str(self.db_path), session_id) as conn:
             if start_date and end_date:
                 query = """
                     SELECT * FROM diaries
@@ -136,8 +152,11 @@ class DiaryRepository:
         logger.debug("list_diaries 조회: session=%s, start=%s, end=%s, count=%d", session_id, start_date, end_date, len(rows))
 
     def delete_diary(self, diary_id: int):
-        """특정 일기 삭제"""
-        with get_connection(str(self.db_path)) as conn:
+        """특정 일기 삭제 (샤딩 모드에서는 id 구간으로 샤드를 찾습니다)"""
+        with get_connection(shard_path_for_id(str(self.db_path), diary_id)) as conn:
+            row = conn.execute("SELECT session_id FROM diaries WHERE id = ?", (diary_id,)).fetchone()
             conn.execute("DELETE FROM diaries WHERE id = ?", (diary_id,))
+            if row:
+                drop_snapshot(conn, row["session_id"])
             conn.commit()
         logger.info("일기 삭제 완료: id=%s", diary_id)
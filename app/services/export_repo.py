@@ -0,0 +1,150 @@
+"""세션 데이터 스트리밍 내보내기 (NDJSON).
+
+세션의 프로필, 대화, 일기, 요약, 페르소나를 한 줄에 한 레코드씩 NDJSON으로 내보냅니다.
+각 테이블은 커서를 그대로 순회하며 한 행씩 직렬화하므로, 이력 크기와 무관하게 메모리 사용량이 일정합니다.
+
+- 첫 줄은 `{"type": "meta", ...}`, 마지막 줄은 테이블별 건수를 담은 `{"type": "end", ...}`입니다.
+- 전체를 하나의 읽기 트랜잭션에서 조회하므로(WAL) 내보내는 동안 들어온 쓰기와 섞이지 않습니다.
+- 압축 보관된 대화(chat_archive_segments)는 세그먼트 하나씩만 풀어 hot 행보다 먼저 내보냅니다.
+- 대화의 meta_json은 저장 인코딩(meta_codec)을 풀어 평문 JSON 문자열로 내보냅니다.
+"""
+from __future__ import annotations
+import json
+import sqlite3
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from app.core.config import config
+from app.core.logger import get_logger
+from app.utils.db_utils import shard_path
+from app.utils.meta_codec import meta_to_json
+
+logger = get_logger(__name__)
+
+# (레코드 type, 테이블, 정렬). 세션별 인덱스를 타도록 session_id 조건과 PK/키 순서로 읽습니다.
+EXPORT_TABLES: Tuple[Tuple[str, str, str], ...] = (
+    ("baby_profile", "baby_profile", "session_id"),
+    ("mother_profile", "mother_profile", "session_id"),
+    ("chat", "chat_logs", "id"),
+    ("diary", "diaries", "date"),
+    ("persona_summary", "persona_summaries", "week_start"),
+    ("persona_version", "child_persona_versions", "version"),
+    ("persona", "child_personas", "id"),
+)
+
+_CURSOR_ARRAYSIZE = 500
+
+
+def _open(db_path: str) -> sqlite3.Connection:
+    # StreamingResponse는 동기 제너레이터를 스레드풀에서 한 청크씩 진행하므로, 청크마다 실행 스레드가
+    # 달라질 수 있습니다. 스레드 로컬 풀 대신 내보내기 전용 커넥션을 열어 끝나면 닫습니다.
+    conn = sqlite3.connect(
+        db_path,
+        timeout=config.DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+    )
+    conn.execute(f"PRAGMA busy_timeout = {int(config.DB_BUSY_TIMEOUT_MS)}")
+    return conn
+
+
+def _iter_archive(conn: sqlite3.Connection, session_id: str) -> Iterator[list]:
+    from app.services.chat_archive import decode_segment
+
+    try:
+        cur = conn.execute(
+            "SELECT codec, payload FROM chat_archive_segments WHERE session_id = ? ORDER BY first_id", (session_id,)
+        )
+    except sqlite3.OperationalError:
+        return
+    for codec, payload in cur:
+        yield decode_segment(session_id, payload, codec)
+
+
+def _line(record: Dict) -> str:
+    return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+def iter_session_export(
+    db_path: str, session_id: str, tables: Optional[Sequence[str]] = None
+) -> Iterator[str]:
+    """세션 데이터를 NDJSON 줄 단위로 생성합니다. tables로 내보낼 레코드 type을 제한할 수 있습니다."""
+    wanted = set(tables) if tables else None
+    conn = _open(shard_path(str(db_path), session_id))
+    counts: Dict[str, int] = {}
+    try:
+        conn.execute("BEGIN")
+        yield _line({
+            "type": "meta",
+            "session_id": session_id,
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+            "schema_version": conn.execute("PRAGMA user_version").fetchone()[0],
+        })
+        for kind, table, order in EXPORT_TABLES:
+            if wanted is not None and kind not in wanted:
+                continue
+            n = 0
+            if kind == "chat":
+                # 압축 보관된 오래된 대화를 세그먼트(세션·월) 단위로 하나씩 풀어 먼저 내보냅니다
+                for rows in _iter_archive(conn, session_id):
+                    for r in rows:
+                        r["meta_json"] = meta_to_json(r.get("meta_json"), r.get("text"))
+                        yield _line({"type": kind, **r})
+                        n += 1
+            try:
+                cur = conn.execute(f"SELECT * FROM {table} WHERE session_id = ? ORDER BY {order}", (session_id,))
+            except sqlite3.OperationalError as e:
+                # 아직 만들어지지 않은 테이블은 건너뜁니다
+                logger.debug("내보내기 테이블 생략: %s (%s)", table, e)
+                continue
+            cur.arraysize = _CURSOR_ARRAYSIZE
+            cols = [d[0] for d in cur.description]
+            decode = kind == "chat" and "meta_json" in cols
+            for row in cur:
+                record = {"type": kind}
+                record.update(zip(cols, row))
+                if decode:
+                    record["meta_json"] = meta_to_json(record["meta_json"], record.get("text"))
+                yield _line(record)
+                n += 1
+            counts[kind] = n
+        yield _line({"type": "end", "session_id": session_id, "counts": counts})
+    finally:
+        try:
+            conn.rollback()
+        finally:
+            conn.close()
+        logger.info("세션 내보내기 종료: session=%s, counts=%s", session_id, counts)
+
+
+def gzip_stream(lines: Iterable[str], chunk_size: int = 64 * 1024, level: int = 6) -> Iterator[bytes]:
+    """문자열 줄 스트림을 gzip 바이트 청크 스트림으로 변환합니다. 버퍼는 chunk_size 정도로 유지됩니다."""
+    comp = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip 헤더/트레일러
+    buf = bytearray()
+    for line in lines:
+        buf += comp.compress(line.encode("utf-8"))
+        if len(buf) >= chunk_size:
+            yield bytes(buf)
+            buf.clear()
+    buf += comp.flush()
+    if buf:
+        yield bytes(buf)
+
+
+def batch_lines(lines: Iterable[str], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """줄 단위 yield는 청크 수가 너무 많아지므로, 일정 크기로 모아 바이트로 내보냅니다."""
+    buf: list = []
+    size = 0
+    for line in lines:
+        b = line.encode("utf-8")
+        buf.append(b)
+        size += len(b)
+        if size >= chunk_size:
+            yield b"".join(buf)
+            buf.clear()
+            size = 0
+    if buf:
+        yield b"".join(buf)
+
+
+__all__ = ["iter_session_export", "gzip_stream", "batch_lines", "EXPORT_TABLES"]
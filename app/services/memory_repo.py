@@ -0,0 +1,250 @@
+"""세션별 의미 기반 대화 메모리 인덱스.
+
+chat_logs의 각 메시지를 임베딩하여 `chat_embeddings` 테이블(app.utils.schema)에 float16 BLOB으로 저장하고,
+세션 단위로 정규화된 행렬을 메모리에 올려 유사도 top-k 검색을 수행합니다.
+
+- 임베딩은 요청 경로가 아닌 백그라운드 배치로 계산합니다 (`schedule`).
+- 검색 시에는 세션 행렬에서 아직 로드하지 않은 행만 증분으로 읽어 옵니다.
+- 검색어 임베딩도 요청 경로에서 기다리지 않습니다. 사용자 메시지를 저장할 때 `prefetch_query`로 미리 계산해 두고,
+  아직 준비되지 않았으면 세션의 최근 임베딩으로 대신 찾습니다. 미리 계산한 벡터는 인덱싱 때 다시 씁니다.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import config
+from app.core.logger import get_logger
+from app.utils.db_utils import get_connection
+
+logger = get_logger(__name__)
+
+# 검색어 임베딩 LRU 크기와, 검색어 벡터가 없을 때 대신 쓸 최근 메시지 수
+_QUERY_CACHE_SIZE = 512
+_CONTEXT_ROWS = 2
+
+def _normalize(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+class _SessionMatrix:
+    """한 세션의 (chat_id 배열, float16 정규화 행렬) 캐시."""
+
+    __slots__ = ("ids", "mat", "max_id")
+
+    def __init__(self, dim: int):
+        self.ids = np.empty((0,), dtype=np.int64)
+        self.mat = np.empty((0, dim), dtype=np.float16)
+        self.max_id = 0
+
+    def extend(self, ids: Sequence[int], vecs: np.ndarray) -> None:
+        if not len(ids):
+            return
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.mat = np.vstack([self.mat, vecs.astype(np.float16)])
+        self.max_id = int(self.ids[-1])
+
+
+class ChatMemoryIndex:
+    def __init__(self, db_path: str = "storage/db/app.db", model: Optional[str] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.model = model or config.DEFAULT_EMBED_MODEL
+        self._sessions: "OrderedDict[str, _SessionMatrix]" = OrderedDict()
+        self._lock = Lock()
+        self._scheduled: set[str] = set()
+        self._query_vecs: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._prefetching: set[str] = set()
+
+        try:
+            from app.utils.db_utils import ensure_db_initialized
+            ensure_db_initialized(str(self.db_path))
+        except Exception:
+            logger.exception("chat_embeddings 테이블 확인 실패")
+
+    # ------------------------------------------------------------------
+    # 임베딩 (백그라운드)
+    # ------------------------------------------------------------------
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        from app.core.dependencies import get_openai
+
+        vecs = get_openai().embed_texts(texts, model=self.model)
+        return _normalize(np.asarray(vecs, dtype=np.float32))
+
+    def _embed_cached(self, texts: List[str]) -> np.ndarray:
+        """이미 계산한 검색어 벡터는 재사용하고 나머지만 임베딩합니다. 새로 계산한 벡터도 캐시에 넣습니다."""
+        with self._lock:
+            cached = [self._query_vecs.get(t) for t in texts]
+        missing = [i for i, v in enumerate(cached) if v is None]
+        if missing:
+            fresh = self._embed([texts[i] for i in missing])
+            with self._lock:
+                for j, i in enumerate(missing):
+                    cached[i] = fresh[j]
+                    self._remember(texts[i], fresh[j])
+        return np.vstack(cached)
+
+    def _remember(self, text: str, vec: np.ndarray) -> None:
+        self._query_vecs[text] = vec
+        self._query_vecs.move_to_end(text)
+        while len(self._query_vecs) > _QUERY_CACHE_SIZE:
+            self._query_vecs.popitem(last=False)
+
+    def _prefetch(self, text: str) -> None:
+        try:
+            self._embed_cached([text])
+        finally:
+            with self._lock:
+                self._prefetching.discard(text)
+
+    def prefetch_query(self, query: str) -> None:
+        """다음 검색에 쓸 검색어 임베딩을 백그라운드에서 미리 계산합니다."""
+        text = (query or "").strip()
+        if not text:
+            return
+        with self._lock:
+            if text in self._query_vecs or text in self._prefetching:
+                return
+            self._prefetching.add(text)
+        from app.core.background import submit_background
+
+        submit_background(self._prefetch, text)
+
+    def _pending_rows(self, conn, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        query = """
+            SELECT id, text FROM chat_logs
+            WHERE session_id = ?
+              AND id > (SELECT COALESCE(MAX(chat_id), 0) FROM chat_embeddings WHERE session_id = ?)
+            ORDER BY id ASC
+            LIMIT ?
+        """
+        return conn.execute(query, (session_id, session_id, limit)).fetchall()
+
+    def index_pending(self, session_id: str) -> int:
+        """아직 임베딩되지 않은 세션 메시지를 배치 단위로 임베딩해 저장합니다."""
+        batch = max(1, config.MEMORY_EMBED_BATCH)
+        total = 0
+        try:
+            while True:
+                with get_connection(str(self.db_path), session_id) as conn:
+                    rows = self._pending_rows(conn, session_id, batch)
+                if not rows:
+                    break
+                fetched = len(rows)
+                rows = [r for r in rows if (r["text"] or "").strip()] or rows
+                vecs = self._embed_cached([(r["text"] or " ") for r in rows])
+                with get_connection(str(self.db_path), session_id) as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO chat_embeddings (chat_id, session_id, model, dim, vec) VALUES (?, ?, ?, ?, ?)",
+                        [
+                            (r["id"], session_id, self.model, int(vecs.shape[1]), vecs[i].astype(np.float16).tobytes())
+                            for i, r in enumerate(rows)
+                        ],
+                    )
+                    conn.commit()
+                total += len(rows)
+                if fetched < batch:
+                    break
+        finally:
+            with self._lock:
+                self._scheduled.discard(session_id)
+        if total:
+            logger.info("대화 메모리 인덱싱 완료: session=%s, rows=%d", session_id, total)
+        return total
+
+    def schedule(self, session_id: str) -> None:
+        """세션 인덱싱을 백그라운드에 예약합니다. 이미 예약된 세션은 합쳐서 한 번만 실행합니다."""
+        with self._lock:
+            if session_id in self._scheduled:
+                return
+            self._scheduled.add(session_id)
+        from app.core.background import submit_background
+
+        submit_background(self.index_pending, session_id)
+
+    # ------------------------------------------------------------------
+    # 검색
+    # ------------------------------------------------------------------
+    def _load_session(self, session_id: str) -> Optional[_SessionMatrix]:
+        with self._lock:
+            sm = self._sessions.get(session_id)
+            if sm is not None:
+                self._sessions.move_to_end(session_id)
+        after = sm.max_id if sm is not None else 0
+
+        with get_connection(str(self.db_path), session_id) as conn:
+            rows = conn.execute(
+                "SELECT chat_id, dim, vec FROM chat_embeddings WHERE session_id = ? AND chat_id > ? ORDER BY chat_id ASC",
+                (session_id, after),
+            ).fetchall()
+
+        if rows:
+            dim = int(rows[0]["dim"])
+            ids = [r["chat_id"] for r in rows]
+            vecs = np.frombuffer(b"".join(r["vec"] for r in rows), dtype=np.float16).reshape(len(rows), dim)
+            with self._lock:
+                if sm is None or sm.mat.shape[1] != dim:
+                    sm = _SessionMatrix(dim)
+                # 동시에 로드한 다른 스레드가 이미 붙였을 수 있으므로 max_id 이후만 추가합니다
+                fresh = [i for i, cid in enumerate(ids) if cid > sm.max_id]
+                sm.extend([ids[i] for i in fresh], vecs[fresh])
+                self._sessions[session_id] = sm
+                self._sessions.move_to_end(session_id)
+                while len(self._sessions) > config.MEMORY_CACHE_SESSIONS:
+                    self._sessions.popitem(last=False)
+        return sm if sm is not None and len(sm.ids) else None
+
+    def has_vectors(self, session_id: str) -> bool:
+        return self._load_session(session_id) is not None
+
+    def search(
+        self,
+        session_id: str,
+        query: str,
+        top_k: int = 4,
+        exclude_ids: Sequence[int] = (),
+    ) -> List[Tuple[int, float]]:
+        """query와 가장 유사한 과거 메시지의 (chat_id, score) 목록을 반환합니다.
+
+        임베딩 API를 부르지 않습니다. query 벡터가 아직 없으면 미리 계산을 예약하고 세션의 최근 임베딩으로 찾습니다.
+        """
+        sm = self._load_session(session_id)
+        text = (query or "").strip()
+        if sm is None or not text or top_k <= 0:
+            return []
+
+        with self._lock:
+            q = self._query_vecs.get(text)
+        if q is None:
+            self.prefetch_query(text)
+            q = _normalize(sm.mat[-_CONTEXT_ROWS:].astype(np.float32).mean(axis=0))
+        scores = sm.mat.astype(np.float32) @ q
+        if exclude_ids:
+            scores[np.isin(sm.ids, np.asarray(list(exclude_ids), dtype=np.int64))] = -np.inf
+        k = min(top_k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx])]
+        return [(int(sm.ids[i]), float(scores[i])) for i in idx]
+
+    def evict(self, session_id: str) -> None:
+        """세션의 메모리 캐시만 비웁니다. 임베딩 일부가 지워졌을 때 다음 검색에서 다시 읽게 합니다."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def forget_session(self, session_id: str) -> None:
+        """세션 메시지 삭제 시 인덱스와 캐시를 함께 제거합니다."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        with get_connection(str(self.db_path), session_id) as conn:
+            conn.execute("DELETE FROM chat_embeddings WHERE session_id = ?", (session_id,))
+            conn.commit()
+
+
+__all__ = ["ChatMemoryIndex"]
@@ -1,104 +1,184 @@
 from __future__ import annotations
 import sqlite3
-from typing import Optional, Dict, Any, List
+import time
+from threading import Lock
+from typing import Optional, Dict, Any, List, Tuple
 from app.core.config import config
-from pathlib import Path
+from app.core.logger import get_logger
+from app.utils.db_utils import ensure_db_initialized, get_connection
+from app.services.snapshot_repo import touch_snapshot
 
 DB_PATH = str(config.DB_PATH)
 
+logger = get_logger(__name__)
 
-def _conn(db_path: Optional[str] = None):
-    return sqlite3.connect(db_path or DB_PATH)
+PERSONA_KEYS = ["id", "session_id", "persona_json", "version", "created_at", "updated_at"]
+# 버전 테이블에는 updated_at이 없으므로 created_at을 그대로 씁니다
+_PERSONA_COLS = "id, session_id, persona_json, version, created_at, created_at AS updated_at"
+_SUMMARY_COLS = "id, session_id, week_start, week_end, summary, created_at, updated_at, note"
+
+# 세션별 최신 페르소나의 프로세스 전역 write-through 캐시: session_id -> (레코드, 마지막 확인 시각).
+# 레코드가 None이면 "페르소나 없음"을 캐시한 것입니다. 다른 워커 프로세스가 쓴 버전을 놓치지 않도록
+# PERSONA_CACHE_REVALIDATE_S가 지난 항목은 읽을 때 DB의 MAX(version)과 비교합니다.
+_latest_cache: Dict[str, Tuple[Optional[Dict[str, Any]], float]] = {}
+_cache_lock = Lock()
+_MISSING = object()
+
+
+def _conn(session_id: Optional[str] = None, db_path: Optional[str] = None) -> sqlite3.Connection:
+    """스레드별 재사용 커넥션 (행은 dict로 반환됩니다). session_id가 있으면 그 세션의 샤드로 갑니다."""
+    return get_connection(db_path or DB_PATH, session_id)
 
 
 def ensure_persona_tables():
-    migrations_file = Path(config.ROOT_DIR) / "storage" / "db" / "migrations" / "0001_add_persona_tables.sql"
-    if migrations_file.exists():
-        sql = migrations_file.read_text(encoding="utf-8")
-        with _conn() as conn:
-            conn.executescript(sql)
+    """페르소나 테이블 스키마를 확인합니다. 프로세스당 한 번만 실제로 확인합니다."""
+    ensure_db_initialized(DB_PATH)
+
+
+def _cache_put(session_id: str, record: Dict[str, Any]) -> None:
+    """더 높은(또는 같은) 버전일 때만 캐시를 갱신합니다."""
+    with _cache_lock:
+        cur = _latest_cache.get(session_id, (None, 0.0))[0]
+        if cur is None or int(record["version"]) >= int(cur["version"]):
+            _latest_cache[session_id] = (record, time.monotonic())
+
+
+def _cache_replace(session_id: str, seen: Any, record: Optional[Dict[str, Any]]) -> None:
+    """읽는 동안 항목이 바뀌지 않았을 때만(없었거나 seen 그대로) 교체합니다.
+
+    DB를 읽는 사이 insert_child_persona가 캐시에 넣은 새 버전을 오래된 값이나 "없음"으로 덮지 않습니다.
+    """
+    with _cache_lock:
+        if _latest_cache.get(session_id, _MISSING) is seen:
+            _latest_cache[session_id] = (record, time.monotonic())
+
+
+def observe_child_persona(session_id: str, record: Optional[Dict[str, Any]]) -> None:
+    """다른 경로(세션 스냅샷 등)에서 읽은 최신 페르소나로 캐시를 맞춥니다. 더 새 버전일 때만 반영됩니다."""
+    if record and record.get("version") is not None:
+        _cache_put(session_id, record)
+
+
+def invalidate_persona_cache(session_id: Optional[str] = None) -> None:
+    with _cache_lock:
+        if session_id is None:
+            _latest_cache.clear()
+        else:
+            _latest_cache.pop(session_id, None)
+
+
+def _persona_row(conn: sqlite3.Connection, where: str, params: tuple) -> Optional[Dict[str, Any]]:
+    return conn.execute(
+        f"SELECT {_PERSONA_COLS} FROM child_persona_versions WHERE {where}",
+        params,
+    ).fetchone()
 
 
 def upsert_persona_summary(session_id: str, week_start: str, week_end: str, summary: str, note: Optional[str] = None) -> int:
     """주별 요약을 삽입 또는 업데이트
     """
     ensure_persona_tables()
-    with _conn() as conn:
+    with _conn(session_id) as conn:
         cur = conn.execute(
             "SELECT id FROM persona_summaries WHERE session_id=? AND week_start=?",
             (session_id, week_start),
         )
         row = cur.fetchone()
         if row:
-            pid = row[0]
+            pid = row["id"]
             conn.execute(
                 "UPDATE persona_summaries SET week_end=?, summary=?, note=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
                 (week_end, summary, note, pid),
             )
-            return pid
         else:
             cur = conn.execute(
                 "INSERT INTO persona_summaries (session_id, week_start, week_end, summary, note) VALUES (?, ?, ?, ?, ?)",
                 (session_id, week_start, week_end, summary, note),
             )
-            return cur.lastrowid
+            pid = cur.lastrowid
+        r = conn.execute(f"SELECT {_SUMMARY_COLS} FROM persona_summaries WHERE id=?", (pid,)).fetchone()
+        touch_snapshot(conn, session_id, guard="summary_date", summary_date=week_start, summary_json=r)
+        return pid
 
 
 def get_persona_summary(session_id: str, week_start: str) -> Optional[Dict[str, Any]]:
     ensure_persona_tables()
-    with _conn() as conn:
-        cur = conn.execute(
-            "SELECT id, session_id, week_start, week_end, summary, created_at, updated_at, note FROM persona_summaries WHERE session_id=? AND week_start=?",
+    with _conn(session_id) as conn:
+        return conn.execute(
+            f"SELECT {_SUMMARY_COLS} FROM persona_summaries WHERE session_id=? AND week_start=?",
             (session_id, week_start),
-        )
-        r = cur.fetchone()
-        if not r:
-            return None
-        keys = ["id", "session_id", "week_start", "week_end", "summary", "created_at", "updated_at", "note"]
-        return dict(zip(keys, r))
+        ).fetchone()
 
 
 def insert_child_persona(session_id: str, persona_json: str, version: int = 1) -> int:
+    """새 페르소나 버전을 추가합니다 (이전 버전은 보존).
+
+    세션의 첫 페르소나는 `version`으로, 이후에는 최신 버전 + 1로 기록합니다.
+    저장 후 캐시를 즉시 갱신(write-through)하고 새 행의 id를 반환합니다.
+    """
     ensure_persona_tables()
-    with _conn() as conn:
-        # find latest persona for session
+    with _conn(session_id) as conn:
+        # 버전 계산과 INSERT를 한 문장으로 처리해 동시 쓰기에서도 번호가 겹치지 않게 합니다
         cur = conn.execute(
-            "SELECT id, version FROM child_personas WHERE session_id=? ORDER BY id DESC LIMIT 1",
-            (session_id,),
+            """
+            INSERT INTO child_persona_versions (session_id, version, persona_json)
+            SELECT ?, COALESCE(MAX(version) + 1, ?), ? FROM child_persona_versions WHERE session_id = ?
+            """,
+            (session_id, version, persona_json, session_id),
         )
-        row = cur.fetchone()
-        if row:
-            pid = row[0]
-            try:
-                prev_ver = int(row[1] or 1)
-            except Exception:
-                prev_ver = 1
-            new_ver = prev_ver + 1
-            conn.execute(
-                "UPDATE child_personas SET persona_json=?, version=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-                (persona_json, new_ver, pid),
-            )
-            return pid
-        else:
-            cur = conn.execute(
-                "INSERT INTO child_personas (session_id, persona_json, version) VALUES (?, ?, ?)",
-                (session_id, persona_json, version),
-            )
-            return cur.lastrowid
+        pid = cur.lastrowid
+        record = _persona_row(conn, "id = ?", (pid,))
+        if record:
+            touch_snapshot(conn, session_id, guard="persona_version", persona_version=record["version"], persona_json=record)
+    if record:
+        _cache_put(session_id, record)
+    logger.debug("페르소나 버전 저장: session=%s, version=%s", session_id, record and record["version"])
+    return pid
 
 
-def get_latest_child_persona(session_id: str) -> Optional[Dict[str, Any]]:
+def get_latest_child_persona(session_id: str, validate: bool = False) -> Optional[Dict[str, Any]]:
+    """세션의 최신 페르소나를 반환합니다.
+
+    캐시에 있으면 DB를 조회하지 않습니다. validate=True이거나 마지막 확인 후 PERSONA_CACHE_REVALIDATE_S가
+    지났으면 DB의 최신 버전 번호와 비교해, 다른 프로세스가 더 새 버전을 쓴 경우 다시 읽어 옵니다.
+    """
+    with _cache_lock:
+        entry = _latest_cache.get(session_id, _MISSING)
+    if entry is not _MISSING:
+        cached, checked_at = entry
+        fresh = time.monotonic() - checked_at < config.PERSONA_CACHE_REVALIDATE_S
+        if fresh and not validate:
+            return dict(cached) if cached else None
+
     ensure_persona_tables()
-    with _conn() as conn:
-        cur = conn.execute(
-            "SELECT id, session_id, persona_json, version, created_at, updated_at FROM child_personas WHERE session_id=? ORDER BY version DESC, id DESC LIMIT 1",
-            (session_id,),
-        )
-        r = cur.fetchone()
-        if not r:
-            return None
-        keys = ["id", "session_id", "persona_json", "version", "created_at", "updated_at"]
-        return dict(zip(keys, r))
+    with _conn(session_id) as conn:
+        if entry is not _MISSING:
+            row = conn.execute(
+                "SELECT MAX(version) AS version FROM child_persona_versions WHERE session_id=?",
+                (session_id,),
+            ).fetchone()
+            latest_ver = row["version"] if row else None
+            cached_ver = cached["version"] if cached else None
+            if latest_ver == cached_ver:
+                # 같은 항목이면 확인 시각만 갱신합니다
+                _cache_replace(session_id, entry, cached)
+                return dict(cached) if cached else None
+        record = _persona_row(conn, "session_id = ? ORDER BY version DESC LIMIT 1", (session_id,))
+    _cache_replace(session_id, entry, record)
+    if record is not None:
+        # 그 사이 다른 값이 들어왔어도 더 새 버전이면 반영합니다
+        _cache_put(session_id, record)
+    return dict(record) if record else None
+
+
+def list_child_persona_versions(session_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """세션의 페르소나 버전 이력 (최신순)"""
+    ensure_persona_tables()
+    with _conn(session_id) as conn:
+        return conn.execute(
+            f"SELECT {_PERSONA_COLS} FROM child_persona_versions WHERE session_id=? ORDER BY version DESC LIMIT ?",
+            (session_id, limit),
+        ).fetchall()
 
 
 __all__ = [
@@ -106,4 +186,7 @@ __all__ = [
     "get_persona_summary",
     "insert_child_persona",
     "get_latest_child_persona",
+    "list_child_persona_versions",
+    "invalidate_persona_cache",
+    "observe_child_persona",
 ]
@@ -1,9 +1,10 @@
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Union
 
 from pydantic import BaseModel, Field
-from app.utils.db_utils import get_connection, upsert_from_model, fetch_one
+from app.utils.db_utils import bulk_upsert_models, get_connection, upsert_from_model, fetch_one, shard_path
 from app.core.logger import get_logger
+from app.services.snapshot_repo import touch_snapshot
 
 logger = get_logger(__name__)
 
@@ -41,23 +42,66 @@ class ProfileRepository:
             pass
 
     def get_baby(self, session_id: str) -> Optional[BabyProfile]:
-        with get_connection(str(self.db_path)) as conn:
+        with get_connection(str(self.db_path), session_id) as conn:
             row = fetch_one(conn, "baby_profile", "session_id", session_id)
         logger.debug("get_baby 호출: session=%s, found=%s", session_id, bool(row))
         return BabyProfile(**row) if row else None
 
     def get_mother(self, session_id: str) -> Optional[MotherProfile]:
-        with get_connection(str(self.db_path)) as conn:
+        with get_connection(str(self.db_path), session_id) as conn:
             row = fetch_one(conn, "mother_profile", "session_id", session_id)
         logger.debug("get_mother 호출: session=%s, found=%s", session_id, bool(row))
         return MotherProfile(**row) if row else None
 
     def upsert_baby(self, model: BabyProfile):
-        with get_connection(str(self.db_path)) as conn:
-            upsert_from_model(conn, "baby_profile", model)
+        with get_connection(str(self.db_path), model.session_id) as conn:
+            upsert_from_model(conn, "baby_profile", model, commit=False)
+            touch_snapshot(conn, model.session_id, baby_json=fetch_one(conn, "baby_profile", "session_id", model.session_id))
+            conn.commit()
         logger.info("아기 프로필 upsert: session=%s, name=%s, week=%s", model.session_id, model.name, model.week)
 
     def upsert_mother(self, model: MotherProfile):
-        with get_connection(str(self.db_path)) as conn:
-            upsert_from_model(conn, "mother_profile", model)
+        with get_connection(str(self.db_path), model.session_id) as conn:
+            upsert_from_model(conn, "mother_profile", model, commit=False)
+            touch_snapshot(conn, model.session_id, mother_json=fetch_one(conn, "mother_profile", "session_id", model.session_id))
+            conn.commit()
         logger.info("산모 프로필 upsert: session=%s, name=%s", model.session_id, model.name)
+
+    def bulk_upsert(self, models: Iterable[Union[BabyProfile, MotherProfile]]) -> int:
+        """프로필 여러 개를 샤드별로 한 트랜잭션씩 executemany로 upsert합니다(가져오기/이관용).
+
+        같은 트랜잭션에서 쓴 세션들의 스냅샷 프로필 컬럼도 갱신합니다. 처리한 행 수를 반환합니다.
+        """
+        groups: Dict[tuple, List[BaseModel]] = {}
+        for m in models:
+            table = "baby_profile" if isinstance(m, BabyProfile) else "mother_profile"
+            groups.setdefault((shard_path(str(self.db_path), m.session_id), table), []).append(m)
+        total = 0
+        for (path, table), items in groups.items():
+            column = "baby_json" if table == "baby_profile" else "mother_json"
+
+            def touch(conn, written, table=table, column=column):
+                for sid in dict.fromkeys(m.session_id for m in written):
+                    touch_snapshot(conn, sid, **{column: fetch_one(conn, table, "session_id", sid)})
+
+            with get_connection(path) as conn:
+                total += bulk_upsert_models(conn, table, items, on_written=touch)
+        logger.info("프로필 일괄 upsert: %d행", total)
+        return total
+
+    def ensure_profiles(self, session_id: str) -> dict:
+        """세션의 아기/산모 프로필 행이 없으면 빈 프로필로 만듭니다. 생성 여부를 반환합니다."""
+        created = {"baby": False, "mother": False}
+        try:
+            if self.get_baby(session_id) is None:
+                self.upsert_baby(BabyProfile(session_id=session_id))
+                created["baby"] = True
+        except Exception:
+            logger.exception("아기 프로필 초기화 실패: session=%s", session_id)
+        try:
+            if self.get_mother(session_id) is None:
+                self.upsert_mother(MotherProfile(session_id=session_id))
+                created["mother"] = True
+        except Exception:
+            logger.exception("산모 프로필 초기화 실패: session=%s", session_id)
+        return created
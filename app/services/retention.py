@@ -0,0 +1,402 @@
+"""테이블별 보존 정책과 증분 VACUUM.
+
+행을 지워도(`delete_session`, `delete_last_message`, 압축, 아래 보존 정책) 빈 페이지는 파일 안 freelist에
+남을 뿐 DB 파일은 줄지 않습니다. `enforce_retention`은 정책별로 지울 행을 작은 배치(RETENTION_BATCH_SIZE)로
+나눠 배치마다 짧은 쓰기 트랜잭션으로 지우고, 이어서 `PRAGMA incremental_vacuum(N)`을 조금씩 돌려 빈 페이지를
+파일 끝에서 잘라 냅니다. 전체 VACUUM처럼 DB를 오래 독점하지 않습니다.
+
+정책 (0이면 끔):
+- chat_logs: RETENTION_CHAT_DAYS보다 오래됐고, 그 날짜 자체에 일기가 있거나 주간 요약 범위에 드는 원본 대화.
+  정리되지 않은 날의 대화는 오래돼도 남깁니다. 보관 세그먼트는 안의 모든 날짜가 정리된 경우에만 지웁니다.
+  hot 행과 보관 세그먼트, 해당 임베딩을 함께 지우고 세션 스냅샷은 다시 만들게 합니다.
+- child_persona_versions: 세션별 최근 RETENTION_PERSONA_VERSIONS_KEEP개 버전만 남깁니다.
+
+새 DB 파일은 auto_vacuum=INCREMENTAL로 만들어집니다(db_utils._pragmas). 그 전에 만든 DB는
+`convert_to_incremental`(전체 VACUUM, 한 번)을 해야 파일이 줄며, 그 전에는 지운 페이지를 재사용만 합니다.
+서버에서는 RETENTION_INTERVAL_MIN마다 백그라운드 주기 작업으로 실행됩니다(app.main).
+"""
+from __future__ import annotations
+import sqlite3
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Set
+
+from app.core.config import config
+from app.core.logger import get_logger
+from app.services.chat_archive import decode_segment, unindex_archived
+from app.services.chat_repo import KST
+from app.services.persona_repo import invalidate_persona_cache
+from app.services.snapshot_repo import drop_snapshot
+from app.utils.db_utils import get_connection, map_shards
+
+logger = get_logger(__name__)
+
+_DAY_MS = 86_400_000
+_HISTORY_SIZE = 20
+_history: Deque[Dict[str, Any]] = deque(maxlen=_HISTORY_SIZE)
+# 스케줄러와 수동 실행이 겹치지 않게 합니다
+_run_lock = Lock()
+
+# 주간 요약의 week_end가 비어 있으면 week_start부터 7일로 봅니다
+_WEEK_END_SQL = "COALESCE(s.week_end, date(s.week_start, '+6 days'))"
+
+# chat_logs 행 자신의 날짜가 일기나 주간 요약으로 정리됐는지
+_DAY_COVERED_SQL = f"""(
+  EXISTS (SELECT 1 FROM diaries d WHERE d.session_id = chat_logs.session_id AND d.date = chat_logs.day)
+  OR EXISTS (
+    SELECT 1 FROM persona_summaries s
+    WHERE s.session_id = chat_logs.session_id AND chat_logs.day BETWEEN s.week_start AND {_WEEK_END_SQL}
+  )
+)"""
+
+
+def _placeholders(n: int) -> str:
+    return ",".join("?" * n)
+
+
+def _delete_batches(
+    conn: sqlite3.Connection,
+    select: Callable[[int], List[Dict[str, Any]]],
+    delete: Callable[[List[Dict[str, Any]]], None],
+    batch: int,
+    sleep_s: float,
+) -> int:
+    """select(batch)로 고른 행을 delete로 지우는 짧은 트랜잭션을 고를 행이 없을 때까지 반복합니다."""
+    total = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = select(batch)
+            if rows:
+                delete(rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        total += len(rows)
+        if len(rows) < batch:
+            return total
+        if sleep_s:
+            time.sleep(sleep_s)
+
+
+# ---------------------------------------------------------------------------
+# 정책: 요약이 끝난 오래된 원본 대화
+# ---------------------------------------------------------------------------
+def _chat_sessions(conn: sqlite3.Connection, cutoff_ms: int, cutoff_day: str) -> List[str]:
+    sessions = [
+        r["session_id"]
+        for r in conn.execute("SELECT DISTINCT session_id FROM chat_logs WHERE created_epoch < ?", (cutoff_ms,)).fetchall()
+    ]
+    try:
+        sessions += [
+            r["session_id"]
+            for r in conn.execute(
+                "SELECT DISTINCT session_id FROM chat_archive_segments WHERE last_day < ?", (cutoff_day,)
+            ).fetchall()
+        ]
+    except sqlite3.OperationalError:
+        pass
+    return sorted(set(sessions))
+
+
+def _coverage(conn: sqlite3.Connection, session_id: str) -> Callable[[str], bool]:
+    """세션의 일기 날짜와 주간 요약 구간으로 "그 날짜가 정리됐는지" 판정 함수를 만듭니다."""
+    diary_days = {
+        r["date"] for r in conn.execute("SELECT date FROM diaries WHERE session_id = ?", (session_id,)).fetchall()
+    }
+    weeks = [
+        (r["start"], r["end"])
+        for r in conn.execute(
+            f"SELECT s.week_start AS start, {_WEEK_END_SQL} AS end FROM persona_summaries s WHERE s.session_id = ?",
+            (session_id,),
+        ).fetchall()
+    ]
+    return lambda day: day in diary_days or any(start <= day <= end for start, end in weeks if end)
+
+
+def _covered_segments(conn: sqlite3.Connection, session_id: str, cutoff_day: str) -> List[Dict[str, Any]]:
+    """기준일보다 오래됐고 안의 모든 날짜가 정리된 보관 세그먼트."""
+    try:
+        segs = conn.execute(
+            "SELECT id, first_id, last_id, codec, payload FROM chat_archive_segments "
+            "WHERE session_id = ? AND last_day < ? ORDER BY id",
+            (session_id, cutoff_day),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    if not segs:
+        return []
+    covered = _coverage(conn, session_id)
+    out = []
+    for seg in segs:
+        days = [r.get("day") for r in decode_segment(session_id, seg["payload"], seg["codec"])]
+        if days and all(day and covered(day) for day in days):
+            out.append({"id": seg["id"], "first_id": seg["first_id"], "last_id": seg["last_id"]})
+    return out
+
+
+def _prune_chat_session(
+    conn: sqlite3.Connection, session_id: str, cutoff_ms: int, cutoff_day: str, batch: int, sleep_s: float, dry_run: bool
+) -> Dict[str, int]:
+    hot_where = f"session_id = ? AND created_epoch < ? AND {_DAY_COVERED_SQL}"
+    hot_params = (session_id, cutoff_ms)
+    # 세그먼트는 월 단위라 마지막 날까지 기준을 넘고 모든 날짜가 정리된 것만 지웁니다
+    segments = _covered_segments(conn, session_id, cutoff_day)
+
+    if dry_run:
+        hot = conn.execute(f"SELECT COUNT(*) AS n FROM chat_logs WHERE {hot_where}", hot_params).fetchone()["n"]
+        return {"chat_logs": hot, "segments": len(segments)}
+
+    def select_hot(n: int) -> List[Dict[str, Any]]:
+        return conn.execute(f"SELECT id FROM chat_logs WHERE {hot_where} ORDER BY id LIMIT ?", (*hot_params, n)).fetchall()
+
+    def delete_hot(rows: List[Dict[str, Any]]) -> None:
+        ids = [r["id"] for r in rows]
+        marks = _placeholders(len(ids))
+        # FTS 인덱스는 chat_logs 삭제 트리거가 정리합니다
+        conn.execute(f"DELETE FROM chat_logs WHERE id IN ({marks})", ids)
+        conn.execute(f"DELETE FROM chat_embeddings WHERE chat_id IN ({marks})", ids)
+
+    pending = deque(segments)
+
+    def select_segs(n: int) -> List[Dict[str, Any]]:
+        return [pending.popleft() for _ in range(min(n, len(pending)))]
+
+    def delete_segs(rows: List[Dict[str, Any]]) -> None:
+        conn.execute(f"DELETE FROM chat_archive_segments WHERE id IN ({_placeholders(len(rows))})", [r["id"] for r in rows])
+        conn.executemany(
+            "DELETE FROM chat_embeddings WHERE session_id = ? AND chat_id BETWEEN ? AND ?",
+            [(session_id, r["first_id"], r["last_id"]) for r in rows],
+        )
+        unindex_archived(conn, session_id, [(r["first_id"], r["last_id"]) for r in rows])
+
+    hot = _delete_batches(conn, select_hot, delete_hot, batch, sleep_s)
+    # 세그먼트 하나가 한 달 치라 배치를 작게 잡습니다
+    segs = _delete_batches(conn, select_segs, delete_segs, max(1, batch // 100), sleep_s) if segments else 0
+    if hot or segs:
+        with conn:
+            drop_snapshot(conn, session_id)
+    return {"chat_logs": hot, "segments": segs}
+
+
+def _prune_chats(conn: sqlite3.Connection, days: int, batch: int, sleep_s: float, dry_run: bool, touched: Set[str]) -> Dict[str, int]:
+    cutoff_ms = int(time.time() * 1000) - days * _DAY_MS
+    cutoff_day = (datetime.now(KST) - timedelta(days=days)).date().isoformat()
+    totals = {"sessions": 0, "chat_logs": 0, "segments": 0, "failed": 0}
+    for sid in _chat_sessions(conn, cutoff_ms, cutoff_day):
+        try:
+            res = _prune_chat_session(conn, sid, cutoff_ms, cutoff_day, batch, sleep_s, dry_run)
+        except Exception:
+            totals["failed"] += 1
+            logger.exception("대화 보존 정책 실패: session=%s", sid)
+            continue
+        if res["chat_logs"] or res["segments"]:
+            totals["sessions"] += 1
+            totals["chat_logs"] += res["chat_logs"]
+            totals["segments"] += res["segments"]
+            touched.add(sid)
+    return totals
+
+
+# ---------------------------------------------------------------------------
+# 정책: 오래된 페르소나 버전
+# ---------------------------------------------------------------------------
+_OLD_VERSIONS_SQL = """
+SELECT id, session_id FROM (
+  SELECT id, session_id, ROW_NUMBER() OVER (PARTITION BY session_id ORDER BY version DESC) AS rn FROM child_persona_versions
+) WHERE rn > ? ORDER BY id LIMIT ?
+"""
+
+
+def _prune_persona_versions(conn: sqlite3.Connection, keep: int, batch: int, sleep_s: float, dry_run: bool) -> Dict[str, int]:
+    # 최신 버전은 항상 남깁니다
+    keep = max(1, keep)
+    if dry_run:
+        return {"rows": len(conn.execute(_OLD_VERSIONS_SQL, (keep, -1)).fetchall())}
+
+    def select(n: int) -> List[Dict[str, Any]]:
+        return conn.execute(_OLD_VERSIONS_SQL, (keep, n)).fetchall()
+
+    sessions: Set[str] = set()
+
+    def delete(rows: List[Dict[str, Any]]) -> None:
+        conn.execute(
+            f"DELETE FROM child_persona_versions WHERE id IN ({_placeholders(len(rows))})", [r["id"] for r in rows]
+        )
+        sessions.update(r["session_id"] for r in rows)
+
+    deleted = _delete_batches(conn, select, delete, batch, sleep_s)
+    # 최신 버전은 남지만, 캐시된 레코드가 지운 버전을 가리킬 수 있으므로 다음 읽기에서 다시 읽게 합니다
+    for sid in sessions:
+        invalidate_persona_cache(sid)
+    return {"rows": deleted}
+
+
+# ---------------------------------------------------------------------------
+# 증분 VACUUM
+# ---------------------------------------------------------------------------
+def _pragma(conn: sqlite3.Connection, name: str) -> int:
+    return int(conn.execute(f"PRAGMA {name}").fetchone()[name])
+
+
+def incremental_vacuum(
+    path: str, pages: Optional[int] = None, max_steps: Optional[int] = None, sleep_ms: Optional[int] = None
+) -> Dict[str, Any]:
+    """freelist 페이지를 pages개씩 파일 끝에서 잘라 냅니다. 단계마다 별도의 짧은 쓰기 트랜잭션입니다.
+
+    auto_vacuum=INCREMENTAL이 아닌 DB는 아무것도 하지 않고 needs_convert를 알려 줍니다.
+    """
+    pages = config.VACUUM_PAGES_PER_STEP if pages is None else pages
+    max_steps = config.VACUUM_MAX_STEPS if max_steps is None else max_steps
+    sleep_s = max(0, config.RETENTION_BATCH_SLEEP_MS if sleep_ms is None else sleep_ms) / 1000
+    conn = get_connection(path)
+    mode = _pragma(conn, "auto_vacuum")
+    page_size = _pragma(conn, "page_size")
+    free_before = _pragma(conn, "freelist_count")
+    result: Dict[str, Any] = {
+        "path": path,
+        "auto_vacuum": {0: "none", 1: "full", 2: "incremental"}.get(mode, mode),
+        "freelist_before": free_before,
+        "steps": 0,
+        "max_step_ms": 0.0,
+    }
+    if mode == 2:
+        free = free_before
+        while free and (not max_steps or result["steps"] < max_steps):
+            t = time.perf_counter()
+            # 한 번 step할 때마다 한 페이지씩 풀리는데 execute()는 결과 열이 없는 문장을 한 번만 step하므로,
+            # 끝까지 실행하는 executescript를 씁니다(열린 트랜잭션은 먼저 커밋됩니다)
+            conn.executescript(f"PRAGMA incremental_vacuum({max(1, int(pages))});")
+            result["steps"] += 1
+            result["max_step_ms"] = max(result["max_step_ms"], round((time.perf_counter() - t) * 1000, 2))
+            free = _pragma(conn, "freelist_count")
+            if free and sleep_s:
+                time.sleep(sleep_s)
+    free_after = _pragma(conn, "freelist_count")
+    result["freelist_after"] = free_after
+    result["reclaimed_bytes"] = (free_before - free_after) * page_size
+    result["needs_convert"] = mode != 2 and free_after > 0
+    result["bytes"] = _pragma(conn, "page_count") * page_size
+    return result
+
+
+def convert_to_incremental(path: str) -> Dict[str, Any]:
+    """기존 DB를 auto_vacuum=INCREMENTAL로 바꿉니다. 전체 VACUUM이라 끝날 때까지 쓰기가 막히므로 한가할 때 한 번 실행합니다."""
+    conn = get_connection(path)
+    before = _pragma(conn, "page_count") * _pragma(conn, "page_size")
+    if _pragma(conn, "auto_vacuum") == 2:
+        return {"path": path, "converted": False, "bytes": before}
+    started = time.perf_counter()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    after = _pragma(conn, "page_count") * _pragma(conn, "page_size")
+    logger.info("auto_vacuum=INCREMENTAL 전환: %s (%d -> %d bytes)", path, before, after)
+    return {
+        "path": path,
+        "converted": _pragma(conn, "auto_vacuum") == 2,
+        "bytes_before": before,
+        "bytes": after,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+
+
+# ---------------------------------------------------------------------------
+# 실행
+# ---------------------------------------------------------------------------
+def policies() -> Dict[str, Any]:
+    """현재 설정된 보존 정책."""
+    return {
+        "chat_logs": {"days": config.RETENTION_CHAT_DAYS, "enabled": config.RETENTION_CHAT_DAYS > 0},
+        "child_persona_versions": {
+            "keep": config.RETENTION_PERSONA_VERSIONS_KEEP,
+            "enabled": config.RETENTION_PERSONA_VERSIONS_KEEP > 0,
+        },
+        "batch_size": config.RETENTION_BATCH_SIZE,
+        "interval_min": config.RETENTION_INTERVAL_MIN,
+        "vacuum_pages_per_step": config.VACUUM_PAGES_PER_STEP,
+    }
+
+
+def _enforce_shard(path: str, dry_run: bool, vacuum: bool, touched: Set[str]) -> Dict[str, Any]:
+    conn = get_connection(path)
+    batch = max(1, config.RETENTION_BATCH_SIZE)
+    sleep_s = max(0, config.RETENTION_BATCH_SLEEP_MS) / 1000
+    out: Dict[str, Any] = {"path": path}
+    if config.RETENTION_CHAT_DAYS > 0:
+        out["chat_logs"] = _prune_chats(conn, config.RETENTION_CHAT_DAYS, batch, sleep_s, dry_run, touched)
+    if config.RETENTION_PERSONA_VERSIONS_KEEP > 0:
+        out["child_persona_versions"] = _prune_persona_versions(
+            conn, config.RETENTION_PERSONA_VERSIONS_KEEP, batch, sleep_s, dry_run
+        )
+    if vacuum and not dry_run:
+        out["vacuum"] = incremental_vacuum(path)
+    return out
+
+
+def _evict_memory(sessions: Sequence[str]) -> None:
+    if not sessions:
+        return
+    from app.core.dependencies import get_memory_index
+
+    index = get_memory_index()
+    for sid in sessions:
+        index.evict(sid)
+
+
+def enforce_retention(db_path: Optional[str] = None, *, dry_run: bool = False, vacuum: bool = True) -> Dict[str, Any]:
+    """보존 정책을 적용하고 증분 VACUUM을 실행합니다(샤드별로 차례로). dry_run이면 지울 행 수만 셉니다."""
+    if not _run_lock.acquire(blocking=False):
+        return {"ok": False, "reason": "running"}
+    try:
+        started = time.perf_counter()
+        touched: Set[str] = set()
+        shards = map_shards(
+            str(db_path or config.DB_PATH),
+            lambda p: _enforce_shard(p, dry_run, vacuum, touched),
+            # 디스크 I/O를 몰아 쓰지 않도록 샤드를 하나씩 처리합니다
+            parallel=False,
+        )
+        if not dry_run:
+            _evict_memory(sorted(touched))
+        result = {
+            "ok": True,
+            "dry_run": dry_run,
+            "shards": shards,
+            "reclaimed_bytes": sum(s.get("vacuum", {}).get("reclaimed_bytes", 0) for s in shards),
+            "elapsed_s": round(time.perf_counter() - started, 3),
+            "finished_at": datetime.now(KST).isoformat(),
+        }
+    finally:
+        _run_lock.release()
+    if not dry_run:
+        _history.append(result)
+    logger.info("보존 정책 적용 완료: dry_run=%s, reclaimed=%d bytes, %.2fs", dry_run, result["reclaimed_bytes"], result["elapsed_s"])
+    return result
+
+
+def _space_stat(path: str) -> Dict[str, Any]:
+    conn = get_connection(path)
+    page_size = _pragma(conn, "page_size")
+    return {
+        "path": path,
+        "auto_vacuum": {0: "none", 1: "full", 2: "incremental"}.get(_pragma(conn, "auto_vacuum")),
+        "bytes": _pragma(conn, "page_count") * page_size,
+        "free_bytes": _pragma(conn, "freelist_count") * page_size,
+    }
+
+
+def retention_stats(db_path: Optional[str] = None) -> Dict[str, Any]:
+    """정책 설정, 샤드별 파일/빈 공간 크기, 이 프로세스의 최근 실행 결과."""
+    history = list(_history)
+    return {
+        "policies": policies(),
+        "space": map_shards(str(db_path or config.DB_PATH), _space_stat),
+        "last": history[-1] if history else None,
+        "runs": len(history),
+    }
+
+
+__all__ = ["enforce_retention", "incremental_vacuum", "convert_to_incremental", "retention_stats", "policies"]
@@ -0,0 +1,314 @@
+"""대화/일기 전문 검색.
+
+schema v7의 FTS5 trigram 인덱스(`chat_logs_fts`, `diaries_fts`)로 검색하고 bm25 순으로 정렬해
+하이라이트된 스니펫과 함께 반환합니다.
+
+- trigram은 3글자 미만 검색어를 색인으로 찾을 수 없으므로, 짧은 검색어(예: "태동")는 원본 테이블의
+  LIKE 조건으로 처리합니다. 긴 검색어가 함께 있으면 FTS로 먼저 좁힌 뒤 LIKE로 거릅니다.
+- FTS5를 지원하지 않는 SQLite에서는 전체를 LIKE로 처리합니다(세션 범위 지정 권장).
+- 보관 세그먼트로 압축된 오래된 대화는 `chat_archive_fts`(schema v12)에서 같은 방식으로 찾아 합칩니다.
+  인덱스가 없는 빌드에서는 세그먼트를 풀어 원문에서 찾습니다. 보관 결과에는 archived=True가 붙습니다.
+"""
+from __future__ import annotations
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.logger import get_logger
+from app.services import chat_archive
+from app.utils.db_utils import get_connection, map_shards, shard_path
+
+logger = get_logger(__name__)
+
+MAX_TERMS = 8
+_MIN_FTS_LEN = 3
+_SNIPPET_TOKENS = 24
+# MATCH 안에서 세션을 좁힐 때 쓰는 세션 id 앞부분 길이. 전체 id보다 trigram 교집합 비용이 훨씬 작습니다
+_SESSION_PREFIX = 12
+
+
+def _split_terms(query: str) -> List[str]:
+    terms: List[str] = []
+    for t in (query or "").split():
+        t = t.strip()
+        if t and t not in terms:
+            terms.append(t)
+    return terms[:MAX_TERMS]
+
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like_pattern(term: str) -> str:
+    return "%" + re.sub(r"([\\%_])", r"\\\1", term) + "%"
+
+
+def _like_snippet(text: Optional[str], terms: Sequence[str], hl: Tuple[str, str], width: int = 40) -> str:
+    """LIKE 경로용 스니펫: 첫 일치 위치 앞뒤로 잘라 검색어를 감쌉니다."""
+    text = text or ""
+    pos = min((i for i in (text.find(t) for t in terms) if i >= 0), default=0)
+    start = max(0, pos - width)
+    end = min(len(text), pos + width * 2)
+    out = text[start:end]
+    for t in sorted(terms, key=len, reverse=True):
+        out = out.replace(t, f"{hl[0]}{t}{hl[1]}")
+    return ("…" if start > 0 else "") + out + ("…" if end < len(text) else "")
+
+
+class SearchRepository:
+    def __init__(self, db_path: str = "storage/db/app.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._fts: Optional[bool] = None
+        self._archive_fts: Optional[bool] = None
+
+        try:
+            from app.utils.db_utils import ensure_db_initialized
+            ensure_db_initialized(str(self.db_path))
+        except Exception:
+            logger.exception("검색 인덱스 테이블 확인 실패")
+
+    def fts_enabled(self) -> bool:
+        if self._fts is None:
+            with get_connection(str(self.db_path)) as conn:
+                row = conn.execute(
+                    "SELECT COUNT(*) AS n FROM sqlite_master WHERE name IN ('chat_logs_fts', 'diaries_fts')"
+                ).fetchone()
+            self._fts = int(row["n"]) == 2
+        return self._fts
+
+    def archive_fts_enabled(self) -> bool:
+        if self._archive_fts is None:
+            with get_connection(str(self.db_path)) as conn:
+                row = conn.execute("SELECT COUNT(*) AS n FROM sqlite_master WHERE name = 'chat_archive_fts'").fetchone()
+            self._archive_fts = int(row["n"]) == 1
+        return self._archive_fts
+
+    def rebuild_index(self) -> bool:
+        """FTS 인덱스를 (없으면 만들고) 원본 테이블로부터 다시 채웁니다. 지원하지 않으면 False."""
+        from app.utils.schema import _fts_tables, archive_fts_table, fts5_trigram_available
+
+        def rebuild(path: str) -> bool:
+            with get_connection(path) as conn:
+                if not fts5_trigram_available(conn):
+                    return False
+                _fts_tables(conn)
+                archive_fts_table(conn)
+                conn.commit()
+            return True
+
+        if not all(map_shards(str(self.db_path), rebuild)):
+            return False
+        self._fts = self._archive_fts = None
+        return self.fts_enabled()
+
+    # ------------------------------------------------------------------
+    # 검색
+    # ------------------------------------------------------------------
+    def _match_expr(self, column: Sequence[str], long_terms: List[str], session_id: Optional[str]) -> str:
+        cols = " ".join(column)
+        expr = f"{{{cols}}} : ({' AND '.join(_phrase(t) for t in long_terms)})"
+        if session_id and len(session_id) >= _MIN_FTS_LEN:
+            # 세션 id 앞부분의 trigram으로 후보를 MATCH 안에서 좁히고, 정확한 일치는 원본 조건으로 확인합니다
+            expr = f"session_id : {_phrase(session_id[:_SESSION_PREFIX])} AND {expr}"
+        return expr
+
+    def _search_chats(
+        self,
+        conn: sqlite3.Connection,
+        terms: List[str],
+        session_id: Optional[str],
+        limit: int,
+        hl: Tuple[str, str],
+        use_fts: bool,
+    ) -> List[Dict[str, Any]]:
+        long_terms = [t for t in terms if len(t) >= _MIN_FTS_LEN] if use_fts else []
+        short_terms = [t for t in terms if t not in long_terms]
+        where: List[str] = []
+        params: List[Any] = []
+        if long_terms:
+            sql = (
+                "SELECT c.id, c.session_id, c.role, c.day, c.created_at, "
+                "snippet(chat_logs_fts, 1, ?, ?, '…', ?) AS snippet, bm25(chat_logs_fts, 0.0, 1.0) AS score "
+                "FROM chat_logs_fts JOIN chat_logs c ON c.id = chat_logs_fts.rowid "
+            )
+            params += [hl[0], hl[1], _SNIPPET_TOKENS]
+            where.append("chat_logs_fts MATCH ?")
+            params.append(self._match_expr(["text"], long_terms, session_id))
+            order = "score, c.id DESC"
+        else:
+            sql = "SELECT c.id, c.session_id, c.role, c.day, c.created_at, c.text AS snippet, 0.0 AS score FROM chat_logs c "
+            order = "c.id DESC"
+        if session_id:
+            where.append("c.session_id = ?")
+            params.append(session_id)
+        for t in short_terms:
+            where.append("c.text LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(t))
+        sql += f"WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ?"
+        params.append(limit)
+
+        rows = conn.execute(sql, tuple(params)).fetchall()
+        if not long_terms:
+            for r in rows:
+                r["snippet"] = _like_snippet(r["snippet"], terms, hl)
+        rows += self._search_archived(conn, terms, session_id, limit, hl, use_fts)
+        for r in rows:
+            r["type"] = "chat"
+            r.setdefault("archived", False)
+        # 보관 결과와 합쳐 관련도(LIKE 경로는 최신) 순으로 자릅니다
+        return sorted(rows, key=lambda r: (r["score"], -r["id"]))[:limit]
+
+    def _search_archived(
+        self,
+        conn: sqlite3.Connection,
+        terms: List[str],
+        session_id: Optional[str],
+        limit: int,
+        hl: Tuple[str, str],
+        use_fts: bool,
+    ) -> List[Dict[str, Any]]:
+        """보관 세그먼트로 옮겨진 대화 검색. chat_archive_fts가 있으면 색인으로, 없으면 세그먼트를 풀어 찾습니다."""
+        if not self.archive_fts_enabled():
+            return self._scan_archived(conn, terms, session_id, limit, hl)
+        long_terms = [t for t in terms if len(t) >= _MIN_FTS_LEN] if use_fts else []
+        short_terms = [t for t in terms if t not in long_terms]
+        cols = "rowid AS id, session_id, role, day, created_at"
+        where: List[str] = []
+        params: List[Any] = []
+        if long_terms:
+            sql = (
+                f"SELECT {cols}, snippet(chat_archive_fts, 1, ?, ?, '…', ?) AS snippet, "
+                "bm25(chat_archive_fts, 0.0, 1.0, 0.0, 0.0, 0.0) AS score FROM chat_archive_fts "
+            )
+            params += [hl[0], hl[1], _SNIPPET_TOKENS]
+            where.append("chat_archive_fts MATCH ?")
+            params.append(self._match_expr(["text"], long_terms, session_id))
+            order = "score, rowid DESC"
+        else:
+            sql = f"SELECT {cols}, text AS snippet, 0.0 AS score FROM chat_archive_fts "
+            order = "rowid DESC"
+        if session_id:
+            where.append("session_id = ?")
+            params.append(session_id)
+        for t in short_terms:
+            where.append("text LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(t))
+        sql += f"WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ?"
+        params.append(limit)
+
+        rows = conn.execute(sql, tuple(params)).fetchall()
+        for r in rows:
+            if not long_terms:
+                r["snippet"] = _like_snippet(r["snippet"], terms, hl)
+            r["archived"] = True
+        return rows
+
+    def _scan_archived(
+        self, conn: sqlite3.Connection, terms: List[str], session_id: Optional[str], limit: int, hl: Tuple[str, str]
+    ) -> List[Dict[str, Any]]:
+        # 색인이 없는 빌드의 폴백: 세션(없으면 샤드 전체)의 세그먼트를 풀어 모든 검색어를 포함한 행을 최신순으로 고릅니다
+        try:
+            sql = "SELECT DISTINCT session_id FROM chat_archive_segments"
+            sessions = [session_id] if session_id else [r["session_id"] for r in conn.execute(sql).fetchall()]
+        except sqlite3.OperationalError:
+            return []
+        out: List[Dict[str, Any]] = []
+        for sid in sessions:
+            for rows in chat_archive.iter_segments(conn, sid):
+                out.extend(r for r in rows if all(t in (r.get("text") or "") for t in terms))
+        out.sort(key=lambda r: r["id"], reverse=True)
+        return [
+            {
+                "id": r["id"], "session_id": r["session_id"], "role": r["role"], "day": r.get("day"),
+                "created_at": r.get("created_at"), "snippet": _like_snippet(r.get("text"), terms, hl),
+                "score": 0.0, "archived": True,
+            }
+            for r in out[:limit]
+        ]
+
+    def _search_diaries(
+        self,
+        conn: sqlite3.Connection,
+        terms: List[str],
+        session_id: Optional[str],
+        limit: int,
+        hl: Tuple[str, str],
+        use_fts: bool,
+    ) -> List[Dict[str, Any]]:
+        long_terms = [t for t in terms if len(t) >= _MIN_FTS_LEN] if use_fts else []
+        short_terms = [t for t in terms if t not in long_terms]
+        where: List[str] = []
+        params: List[Any] = []
+        if long_terms:
+            sql = (
+                "SELECT d.id, d.session_id, d.date, d.title, "
+                "snippet(diaries_fts, 2, ?, ?, '…', ?) AS snippet, bm25(diaries_fts, 0.0, 2.0, 1.0) AS score "
+                "FROM diaries_fts JOIN diaries d ON d.id = diaries_fts.rowid "
+            )
+            params += [hl[0], hl[1], _SNIPPET_TOKENS]
+            where.append("diaries_fts MATCH ?")
+            params.append(self._match_expr(["title", "content"], long_terms, session_id))
+            order = "score, d.date DESC"
+        else:
+            sql = "SELECT d.id, d.session_id, d.date, d.title, d.content AS snippet, 0.0 AS score FROM diaries d "
+            order = "d.date DESC"
+        if session_id:
+            where.append("d.session_id = ?")
+            params.append(session_id)
+        for t in short_terms:
+            where.append("(COALESCE(d.title, '') || ' ' || d.content) LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(t))
+        sql += f"WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ?"
+        params.append(limit)
+
+        rows = conn.execute(sql, tuple(params)).fetchall()
+        if not long_terms:
+            for r in rows:
+                r["snippet"] = _like_snippet(r["snippet"], terms, hl)
+        for r in rows:
+            r["type"] = "diary"
+        return rows
+
+    def search(
+        self,
+        query: str,
+        session_id: Optional[str] = None,
+        types: Sequence[str] = ("chat", "diary"),
+        limit: int = 20,
+        highlight: Tuple[str, str] = ("**", "**"),
+    ) -> Dict[str, Any]:
+        """검색어(공백 구분, 모두 포함)로 대화와 일기를 찾습니다. 결과는 유형별로 관련도 순입니다.
+
+        score는 bm25 값으로 작을수록 관련도가 높습니다(LIKE 경로는 0, 최신순).
+        """
+        terms = _split_terms(query)
+        result: Dict[str, Any] = {"query": query, "terms": terms, "chats": [], "diaries": []}
+        if not terms:
+            result["mode"] = "empty"
+            return result
+
+        use_fts = self.fts_enabled()
+        result["mode"] = "fts" if use_fts and any(len(t) >= _MIN_FTS_LEN for t in terms) else "like"
+
+        def run(path: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+            with get_connection(path) as conn:
+                chats = self._search_chats(conn, terms, session_id, limit, highlight, use_fts) if "chat" in types else []
+                diaries = self._search_diaries(conn, terms, session_id, limit, highlight, use_fts) if "diary" in types else []
+            return chats, diaries
+
+        if session_id:
+            result["chats"], result["diaries"] = run(shard_path(str(self.db_path), session_id))
+            return result
+        # 세션을 지정하지 않으면 샤드마다 동시에 검색해 관련도 순으로 합칩니다
+        parts = map_shards(str(self.db_path), run)
+        chats = [r for c, _ in parts for r in c]
+        diaries = sorted((r for _, d in parts for r in d), key=lambda r: r["date"] or "", reverse=True)
+        result["chats"] = sorted(chats, key=lambda r: (r["score"], -r["id"]))[:limit]
+        result["diaries"] = sorted(diaries, key=lambda r: r["score"])[:limit]
+        return result
+
+
+__all__ = ["SearchRepository"]
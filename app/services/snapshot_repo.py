@@ -0,0 +1,270 @@
+"""세션 부트스트랩용 비정규화 스냅샷.
+
+화면 첫 로드에 필요한 프로필, 최신 페르소나, 최신 요약, 최신 일기 상태, 최근 대화를
+세션당 한 행(`session_snapshots`)에 모아 두고 한 번의 조회로 반환합니다.
+
+- 각 저장소의 쓰기 경로는 같은 커넥션에서 `touch_snapshot` / `push_recent_turn`으로 해당 컬럼만 갱신합니다.
+- 스냅샷 행은 "완전하거나 없거나" 둘 중 하나입니다. 쓰기 경로는 기존 행만 갱신하고,
+  행이 없으면 다음 부트스트랩 조회에서 원본 테이블로부터 다시 만듭니다.
+- 삭제 경로는 `drop_snapshot`으로 행을 지워 다음 조회에서 재구성되게 합니다.
+"""
+from __future__ import annotations
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import config
+from app.core.logger import get_logger
+from app.utils.db_utils import get_connection
+
+logger = get_logger(__name__)
+
+SNAPSHOT_COLUMNS = (
+    "baby_json",
+    "mother_json",
+    "persona_version",
+    "persona_json",
+    "summary_date",
+    "summary_json",
+    "diary_date",
+    "diary_json",
+    "recent_json",
+)
+
+_DIARY_STATUS_COLS = "id, date, title, created_at"
+_RECENT_COLS = "id, role, text, created_at"
+
+
+def _dumps(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _loads(value: Optional[str]) -> Any:
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except Exception:
+        return None
+
+
+def _as_dict(cur: sqlite3.Cursor, row: Any) -> Optional[Dict[str, Any]]:
+    """row_factory 설정과 무관하게 행을 dict로 변환합니다."""
+    if row is None:
+        return None
+    if isinstance(row, dict):
+        return row
+    return {d[0]: row[i] for i, d in enumerate(cur.description)}
+
+
+def _update(conn: sqlite3.Connection, sql: str, params: tuple) -> None:
+    try:
+        conn.execute(sql, params)
+    except sqlite3.OperationalError as e:
+        # 스냅샷 테이블이 아직 없으면 갱신할 행도 없습니다
+        if "no such table" not in str(e):
+            raise
+
+
+def touch_snapshot(conn: sqlite3.Connection, session_id: str, guard: Optional[str] = None, **cols: Any) -> None:
+    """기존 스냅샷 행의 지정 컬럼만 갱신합니다.
+
+    guard 컬럼을 주면 새 값이 기존 값 이상일 때만 갱신합니다(날짜/버전이 되돌아가지 않도록).
+    스냅샷 갱신 실패는 원래 쓰기를 막지 않도록 로깅만 합니다.
+    """
+    unknown = set(cols) - set(SNAPSHOT_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown snapshot columns: {sorted(unknown)}")
+    if not cols:
+        return
+    names = list(cols)
+    sql = (
+        f"UPDATE session_snapshots SET {', '.join(f'{c} = ?' for c in names)}, updated_at = CURRENT_TIMESTAMP "
+        "WHERE session_id = ?"
+    )
+    params: List[Any] = [_dumps(cols[c]) for c in names] + [session_id]
+    if guard:
+        sql += f" AND ({guard} IS NULL OR {guard} <= ?)"
+        params.append(_dumps(cols[guard]))
+    try:
+        _update(conn, sql, tuple(params))
+    except Exception:
+        logger.exception("스냅샷 갱신 실패: session=%s, cols=%s", session_id, names)
+
+
+def push_recent_turn(conn: sqlite3.Connection, session_id: str, turn: Dict[str, Any], keep: Optional[int] = None) -> None:
+    """최근 대화 목록 끝에 한 턴을 붙이고 마지막 keep개만 남깁니다.
+
+    chat_logs INSERT와 같은 트랜잭션 안에서 호출해야 동시 저장 시 순서가 꼬이지 않습니다.
+    """
+    push_recent_turns(conn, session_id, [turn], keep)
+
+
+def push_recent_turns(conn: sqlite3.Connection, session_id: str, turns: List[Dict[str, Any]], keep: Optional[int] = None) -> None:
+    """push_recent_turn의 배치 버전. 여러 턴을 한 번의 UPDATE로 붙입니다."""
+    if not turns:
+        return
+    keep = keep or config.SNAPSHOT_RECENT_TURNS
+    try:
+        cur = conn.execute("SELECT recent_json FROM session_snapshots WHERE session_id = ?", (session_id,))
+        row = _as_dict(cur, cur.fetchone())
+    except sqlite3.OperationalError:
+        return
+    except Exception:
+        logger.exception("스냅샷 최근 대화 조회 실패: session=%s", session_id)
+        return
+    if row is None:
+        return
+    recent = _loads(row.get("recent_json")) or []
+    recent.extend(turns)
+    touch_snapshot(conn, session_id, recent_json=recent[-keep:])
+
+
+def drop_snapshot(conn: sqlite3.Connection, session_id: str) -> None:
+    """스냅샷 행을 지워 다음 부트스트랩에서 원본 테이블로부터 재구성되게 합니다."""
+    try:
+        _update(conn, "DELETE FROM session_snapshots WHERE session_id = ?", (session_id,))
+    except Exception:
+        logger.exception("스냅샷 삭제 실패: session=%s", session_id)
+
+
+class SnapshotRepository:
+    def __init__(self, db_path: str = "storage/db/app.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            from app.utils.db_utils import ensure_db_initialized
+            ensure_db_initialized(str(self.db_path))
+        except Exception:
+            logger.exception("session_snapshots 테이블 확인 실패")
+
+    @staticmethod
+    def _fetch(conn: sqlite3.Connection, sql: str, params: tuple, many: bool = False) -> Any:
+        """원본 테이블이 아직 없을 수 있으므로 OperationalError는 빈 결과로 처리합니다."""
+        try:
+            cur = conn.execute(sql, params)
+            if many:
+                return [_as_dict(cur, r) for r in cur.fetchall()]
+            return _as_dict(cur, cur.fetchone())
+        except sqlite3.OperationalError as e:
+            logger.debug("스냅샷 재구성 중 조회 생략: %s", e)
+            return [] if many else None
+
+    def _rebuild(self, conn: sqlite3.Connection, session_id: str) -> Dict[str, Any]:
+        f = self._fetch
+        persona = f(
+            conn,
+            "SELECT id, session_id, persona_json, version, created_at, created_at AS updated_at "
+            "FROM child_persona_versions WHERE session_id = ? ORDER BY version DESC LIMIT 1",
+            (session_id,),
+        )
+        summary = f(
+            conn,
+            "SELECT id, session_id, week_start, week_end, summary, created_at, updated_at, note "
+            "FROM persona_summaries WHERE session_id = ? ORDER BY week_start DESC LIMIT 1",
+            (session_id,),
+        )
+        diary = f(
+            conn,
+            f"SELECT {_DIARY_STATUS_COLS} FROM diaries WHERE session_id = ? ORDER BY date DESC LIMIT 1",
+            (session_id,),
+        )
+        recent = f(
+            conn,
+            f"SELECT {_RECENT_COLS} FROM chat_logs WHERE session_id = ? ORDER BY created_epoch DESC, id DESC LIMIT ?",
+            (session_id, config.SNAPSHOT_RECENT_TURNS),
+            many=True,
+        )
+        return {
+            "baby_json": f(conn, "SELECT * FROM baby_profile WHERE session_id = ?", (session_id,)),
+            "mother_json": f(conn, "SELECT * FROM mother_profile WHERE session_id = ?", (session_id,)),
+            "persona_version": persona["version"] if persona else None,
+            "persona_json": persona,
+            "summary_date": summary["week_start"] if summary else None,
+            "summary_json": summary,
+            "diary_date": diary["date"] if diary else None,
+            "diary_json": diary,
+            "recent_json": list(reversed(recent)),
+        }
+
+    def get_or_build(self, session_id: str) -> Dict[str, Any]:
+        """세션 스냅샷을 반환합니다. 없으면 원본 테이블에서 만들어 저장합니다.
+
+        재구성은 쓰기 잠금(BEGIN IMMEDIATE) 안에서 읽고 저장하므로, 동시에 커밋된 쓰기가
+        재구성 결과에 덮여 사라지지 않습니다.
+        """
+        with get_connection(str(self.db_path), session_id) as conn:
+            row = self._fetch(conn, "SELECT * FROM session_snapshots WHERE session_id = ?", (session_id,))
+            if row is not None:
+                row["_hit"] = True
+                return row
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._fetch(conn, "SELECT * FROM session_snapshots WHERE session_id = ?", (session_id,))
+                if row is None:
+                    snap = self._rebuild(conn, session_id)
+                    names = list(snap)
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO session_snapshots (session_id, {', '.join(names)}) "
+                        f"VALUES (?, {', '.join('?' * len(names))})",
+                        (session_id, *[_dumps(snap[c]) for c in names]),
+                    )
+                    row = {"session_id": session_id, **{c: _dumps(snap[c]) for c in names}}
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        logger.debug("세션 스냅샷 재구성: session=%s", session_id)
+        row["_hit"] = False
+        return row
+
+    def bootstrap(self, session_id: str, target_date: str) -> Dict[str, Any]:
+        """화면 초기화에 필요한 세션 데이터를 한 번에 반환합니다.
+
+        스냅샷은 세션의 최신 요약/일기만 들고 있으므로, target_date가 그와 다르면
+        해당 날짜의 요약/일기 상태만 원본 테이블에서 따로 조회합니다.
+        """
+        row = self.get_or_build(session_id)
+
+        summary = _loads(row.get("summary_json"))
+        diary = _loads(row.get("diary_json"))
+        if row.get("summary_date") != target_date or row.get("diary_date") != target_date:
+            with get_connection(str(self.db_path), session_id) as conn:
+                if row.get("summary_date") != target_date:
+                    summary = self._fetch(
+                        conn,
+                        "SELECT id, session_id, week_start, week_end, summary, created_at, updated_at, note "
+                        "FROM persona_summaries WHERE session_id = ? AND week_start = ?",
+                        (session_id, target_date),
+                    )
+                if row.get("diary_date") != target_date:
+                    diary = self._fetch(
+                        conn,
+                        f"SELECT {_DIARY_STATUS_COLS} FROM diaries WHERE session_id = ? AND date = ?",
+                        (session_id, target_date),
+                    )
+
+        return {
+            "baby": _loads(row.get("baby_json")),
+            "mother": _loads(row.get("mother_json")),
+            "persona": _loads(row.get("persona_json")),
+            "summary": summary,
+            "diary": {"date": target_date, "exists": bool(diary), **(diary or {})},
+            "recent": _loads(row.get("recent_json")) or [],
+            "snapshot": "hit" if row.get("_hit") else "rebuilt",
+        }
+
+
+__all__ = [
+    "SnapshotRepository",
+    "touch_snapshot",
+    "push_recent_turn",
+    "push_recent_turns",
+    "drop_snapshot",
+    "SNAPSHOT_COLUMNS",
+]
@@ -1,4 +1,5 @@
 from langchain.agents import tool
+from app.core.db_executor import call_write
 from app.core.dependencies import get_chat_repo, get_diary_repo, get_profile_repo
 from app.services.chat_repo import ChatLog
 from app.services.diary_repo import DiaryEntry
@@ -18,7 +19,7 @@ profile_repo = get_profile_repo()
 def save_chat_tool(session_id: str, role: str, text: str, meta_json: str | None = None):
     """채팅 로그를 DB에 저장합니다."""
     logger.info("툴(save_chat) 호출: session=%s, role=%s, text_len=%d", session_id, role, len(text or ""))
-    chat_repo.save_message(ChatLog(session_id=session_id, role=role, text=text, meta_json=meta_json))
+    call_write(chat_repo.save_message, ChatLog(session_id=session_id, role=role, text=text, meta_json=meta_json))
     logger.debug("툴(save_chat) 완료: session=%s", session_id)
     return {"ok": True}
 
@@ -45,7 +46,7 @@ def get_chats_by_date_tool(session_id: str, target_date: str):
 def save_diary_tool(session_id: str, content: str, date: str):
     """일기를 저장합니다."""
     logger.info("툴(save_diary) 호출: session=%s, date=%s, content_len=%d", session_id, date, len(content or ""))
-    diary_repo.save_diary(DiaryEntry(session_id=session_id, date=date, content=content))
+    call_write(diary_repo.save_diary, DiaryEntry(session_id=session_id, date=date, content=content))
     logger.debug("툴(save_diary) 완료: session=%s, date=%s", session_id, date)
     return {"ok": True}
 
@@ -54,9 +55,9 @@ def save_diary_tool(session_id: str, content: str, date: str):
 def get_diary_list_tool(session_id: str):
     """저장된 일기 목록을 반환합니다."""
     logger.info("툴(get_diary_list) 호출: session=%s", session_id)
-    diaries = diary_repo.list_diaries(session_id)
+    diaries = diary_repo.list_diary_rows(session_id)
     logger.debug("툴(get_diary_list) 결과 수: %d", len(diaries))
-    return [safe_model_dump(d) for d in diaries]
+    return [d._asdict() for d in diaries]
 
 
 @tool("get_profile", return_direct=False)
@@ -73,7 +74,7 @@ def get_profile_tool(session_id: str):
 def update_baby_profile_tool(session_id: str, name: str | None = None, week: int | None = None):
     """아기 프로필을 업데이트합니다."""
     logger.info("툴(update_baby_profile) 호출: session=%s, name=%s, week=%s", session_id, name, week)
-    profile_repo.upsert_baby(BabyProfile(session_id=session_id, name=name, week=week))
+    call_write(profile_repo.upsert_baby, BabyProfile(session_id=session_id, name=name, week=week))
     logger.debug("툴(update_baby_profile) 완료: session=%s", session_id)
     return {"ok": True}
 
@@ -81,6 +82,6 @@ def update_baby_profile_tool(session_id: str, name: str | None = None, week: int
 def update_mother_profile_tool(session_id: str, name: str | None = None, week: int | None = None):
     """산모 프로필을 업데이트합니다."""
     logger.info("툴(update_mother_profile) 호출: session=%s, name=%s", session_id, name)
-    profile_repo.upsert_mother(MotherProfile(session_id=session_id, name=name))
+    call_write(profile_repo.upsert_mother, MotherProfile(session_id=session_id, name=name))
     logger.debug("툴(update_mother_profile) 완료: session=%s", session_id)
     return {"ok": True}
\ No newline at end of file
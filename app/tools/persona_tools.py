@@ -7,7 +7,7 @@
 
 기능(초기):
 - summarize_week_tool: 주어진 채팅 목록으로 간단 요약(룰 기반, LLM 호출은 추후 확장)
-- get_or_build_history_block: 캐시 우선으로 weekly summaries를 조립
+- get_or_build_history_block: 최근 대화/저장된 요약/최신 페르소나를 조립
 
 주의: 실제 채팅 저장소 조회 함수는 프로젝트의 chat_repo 등에서 제공되므로
 현재는 호출 지점만 만들어 두고, 실제 통합은 나중에 연결합니다.
@@ -16,15 +16,16 @@ from __future__ import annotations
 import functools
 from typing import List, Dict, Any, Optional
 from app.services import persona_repo
-from app.core.dependencies import get_chat_repo
-
-# 간단화: 표준 라이브러리의 lru_cache를 사용해 캐시 처리합니다.
-# TTL이 필요하면 추후 확장할 수 있지만, 우선은 lru_cache(maxsize=128)를 사용합니다.
-from functools import lru_cache
+from app.core.config import config
+from app.core.dependencies import get_chat_repo, get_memory_index
+from app.core.db_executor import call_write
+from app.core.logger import get_logger
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from app.core.tooling import get_llm
 
+logger = get_logger(__name__)
+
 
 def summarize_week_tool(session_id: str, week_start: str, chats: List[Dict[str, Any]], max_chars: int = 800) -> Dict[str, Any]:
     """간단한 주간 요약 생성기(룰 기반).
@@ -74,28 +75,30 @@ def summarize_week_tool(session_id: str, week_start: str, chats: List[Dict[str,
 
     # DB에 저장(업서트)
     try:
-        persona_repo.upsert_persona_summary(session_id=session_id, week_start=week_start, week_end=week_start, summary=summary_text)
+        call_write(persona_repo.upsert_persona_summary, session_id=session_id, week_start=week_start, week_end=week_start, summary=summary_text)
     except Exception:
         # 실패해도 상위 로직이 처리
         pass
     return result
 
 
-@lru_cache(maxsize=128)
 def get_or_build_history_block(session_id: str, target_date: str, recent_days: int = 7) -> Dict[str, Any]:
-    """history_block을 반환: 캐시 기반으로 동작. 데코레이터로 TTL이 적용됩니다.
+    """history_block을 반환합니다.
+
+    - recent_chats: chat_repo에서 최근 20개 메시지
+    - weekly_summaries: persona_repo에 저장된 해당 날짜 요약 (없으면 빈 요약)
+    - persona: 최신 페르소나 (persona_repo의 프로세스 캐시에서 조회)
 
-    구현 주의사항은 기존과 동일합니다:
-    - recent_chats: 실제 데이터는 chat_repo에서 불러오도록 향후 연결 필요
-    - weekly_summaries: persona_repo에서 해당 주 요약을 조회하고, 없으면 summarize_week_tool 호출
+    요약/페르소나 생성은 요청 경로에서 하지 않고 turn_insights_node가 백그라운드에서 한 번에 처리합니다.
+    매 턴 최신 상태를 보도록 결과는 캐시하지 않습니다.
     """
-    # 실제 recent chats를 chat_repo에서 불러옵니다
+    # 실제 recent chats를 chat_repo에서 불러옵니다 (세션 전체가 아닌 최근 N개만)
     try:
         chat_repo = get_chat_repo()
-        msgs = chat_repo.get_session_messages(session_id)
+        msgs = chat_repo.get_recent_messages(session_id, limit=20)
         # ChatLog -> dict 형식으로 변환
         recent_chats = [
-            {"date": (m.created_at or "")[:10], "role": m.role, "text": m.text, "created_at": m.created_at}
+            {"date": m.day or (m.created_at or "")[:10], "role": m.role, "text": m.text, "created_at": m.created_at}
             for m in msgs
         ]
     except Exception:
@@ -104,16 +107,14 @@ def get_or_build_history_block(session_id: str, target_date: str, recent_days: i
 
     # 주간 요약 조회(예: target_date의 주를 week_start로 가정)
     week_start = target_date  # 간단 가정; 실제는 날짜->week_start 계산 필요
-    summary_row = persona_repo.get_persona_summary(session_id, week_start)
-    weekly_summaries = []
-    if summary_row:
-        weekly_summaries.append({"week_start": week_start, "summary": summary_row.get("summary")})
-    else:
-        # 빈 채팅이면 룰 기반 요약은 빈 문자열로 저장
-        summary = summarize_week_tool(session_id, week_start, recent_chats)
-        weekly_summaries.append({"week_start": week_start, "summary": summary.get("summary")})
+    try:
+        summary_row = persona_repo.get_persona_summary(session_id, week_start)
+    except Exception:
+        summary_row = None
+    weekly_summaries = [{"week_start": week_start, "summary": summary_row.get("summary") if summary_row else ""}]
 
     history_block = {
+        "target_date": target_date,
         "recent_chats": recent_chats,
         "weekly_summaries": weekly_summaries,
         "persona": persona_repo.get_latest_child_persona(session_id),
@@ -122,4 +123,55 @@ def get_or_build_history_block(session_id: str, target_date: str, recent_days: i
     return history_block
 
 
-__all__ = ["summarize_week_tool", "get_or_build_history_block"]
+def _chat_to_dict(m) -> Dict[str, Any]:
+    return {"id": m.id, "role": m.role, "text": m.text, "created_at": m.created_at}
+
+
+def recall_chats(
+    session_id: str,
+    query: str,
+    top_k: Optional[int] = None,
+    last_n: Optional[int] = None,
+    exclude_ids: Optional[List[int]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """프롬프트용 대화 기억을 조립합니다.
+
+    - recent: 가장 최근 last_n개의 메시지(시간순)
+    - relevant: 세션 벡터 인덱스에서 query와 유사한 과거 메시지 top_k개(recent 제외, 시간순)
+    - exclude_ids: 이미 프롬프트에 들어가는 메시지 id (relevant에서 제외)
+    인덱스가 비어 있거나 임베딩이 실패하면 relevant는 빈 리스트입니다.
+    """
+    top_k = config.MEMORY_TOP_K if top_k is None else top_k
+    last_n = config.MEMORY_RECENT_TURNS if last_n is None else last_n
+
+    chat_repo = get_chat_repo()
+    recent = chat_repo.get_recent_messages(session_id, limit=last_n) if last_n > 0 else []
+
+    relevant = []
+    try:
+        index = get_memory_index()
+        hits = index.search(session_id, query, top_k=top_k, exclude_ids=[m.id for m in recent if m.id] + list(exclude_ids or []))
+        if hits:
+            relevant = chat_repo.get_messages_by_ids(session_id, [cid for cid, _ in hits])
+    except Exception:
+        logger.exception("대화 메모리 검색 실패: session=%s", session_id)
+
+    return {
+        "relevant": [_chat_to_dict(m) for m in relevant],
+        "recent": [_chat_to_dict(m) for m in recent],
+    }
+
+
+def format_memory_section(memory: Dict[str, List[Dict[str, Any]]]) -> str:
+    """recall_chats 결과를 프롬프트의 history_section 문자열로 변환합니다."""
+    parts = []
+    relevant = memory.get("relevant") or []
+    recent = memory.get("recent") or []
+    if relevant:
+        parts.append("[관련 과거 대화]\n" + "\n".join([f"[{r.get('role')}] {r.get('text')}" for r in relevant]))
+    if recent:
+        parts.append("[최근대화]\n" + "\n".join([f"[{r.get('role')}] {r.get('text')}" for r in recent]))
+    return "\n".join(parts)
+
+
+__all__ = ["summarize_week_tool", "get_or_build_history_block", "recall_chats", "format_memory_section"]
@@ -1,19 +1,38 @@
 from langchain.agents import tool
-from app.core.dependencies import get_chroma_retriever
+from app.core.dependencies import CHROMA_DIR, DEFAULT_EMBED_MODEL, get_chroma_adapter, get_chroma_vectorstore, get_retrieval_cache
+from app.adapters.rag.chroma_cache import get_handle_cache
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
 
+MEDICAL_COLLECTION = "pregnancy_2025"
+
+
 # @tool("search_medical_sources", return_direct=False)
 def search_medical_sources(query: str, top_k: int = 5):
     """
     의료 관련 질문에 대해 RAG 기반으로 근거 문서를 검색합니다.
+    정규화한 질문과 인덱스 버전으로 결과(문서 id, 점수)와 질문 임베딩을 캐시합니다 (retrieval_cache).
     """
     logger.info("툴(search_medical_sources) 호출: query_len=%d, top_k=%d", len(query or ""), top_k)
-    retriever = get_chroma_retriever(collection_name="pregnancy_2025")
-    docs = retriever.invoke(query)
-    logger.debug("툴(search_medical_sources) 결과 문서 수: %d", len(docs))
-    return [
-        {"content": d.page_content, "source": d.metadata.get("source"), "page": d.metadata.get("page")}
-        for d in docs[:top_k]
-    ]
+    vs = get_chroma_vectorstore(MEDICAL_COLLECTION)
+    # 문서 id가 필요해 검색과 본문 조회는 chromadb 어댑터의 공개 API로 합니다
+    adapter = get_chroma_adapter()
+    hits = get_retrieval_cache().search(
+        MEDICAL_COLLECTION,
+        query,
+        top_k,
+        version=get_handle_cache(str(CHROMA_DIR)).current_version(),
+        embed_model=DEFAULT_EMBED_MODEL,
+        embed_fn=vs.embeddings.embed_query,
+        search_fn=lambda emb, k: adapter.query_by_vector(MEDICAL_COLLECTION, emb, k),
+    )
+    docs = adapter.get_docs(MEDICAL_COLLECTION, [doc_id for doc_id, _ in hits])
+    logger.debug("툴(search_medical_sources) 결과 문서 수: %d", len(hits))
+    out = []
+    for doc_id, score in hits[:top_k]:
+        doc = docs.get(doc_id)
+        if doc is None:
+            continue
+        out.append({"id": doc_id, "content": doc.content, "score": score, "source": doc.source, "page": doc.page})
+    return out
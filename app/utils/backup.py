@@ -0,0 +1,257 @@
+"""app/utils/backup.py
+
+SQLite 온라인 백업/복원.
+
+`sqlite3.Connection.backup`으로 DB를 페이지 단위(BACKUP_PAGES_PER_STEP)로 조금씩 복사하고, 단계 사이에
+BACKUP_STEP_SLEEP_MS만큼 쉬어 요청 쓰기와 I/O를 나눠 씁니다. 파일 복사와 달리 찢어진 파일이 생기지 않습니다.
+
+- 원본 커넥션에서 읽기 트랜잭션을 잡아 스냅샷을 고정합니다. WAL 모드에서는 쓰기를 막지 않으며, 다른
+  커넥션의 쓰기 때문에 백업이 처음부터 다시 시작되는 일(쓰기가 계속되면 끝나지 않음)이 없습니다.
+- `<이름>.partial`에 쓴 뒤 quick_check를 통과하면 이름을 바꾸고, 오래된 스냅샷은 BACKUP_KEEP개만 남깁니다.
+- 결과에는 소요 시간, 처리량, 단계별 최대 복사 시간 등 영향 지표가 담기며 `backup_stats()`로 최근 이력을 봅니다.
+- 샤딩 모드에서는 `backup_all`이 샤드 파일마다 스냅샷을 만들고, 복원은 샤드 파일 단위로 합니다.
+"""
+from __future__ import annotations
+import os
+import sqlite3
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import config
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+_HISTORY_SIZE = 20
+_history: Deque[Dict[str, Any]] = deque(maxlen=_HISTORY_SIZE)
+# 한 프로세스에서 같은 DB를 동시에 백업하지 않도록 직렬화합니다
+_backup_lock = Lock()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=config.DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout = {int(config.DB_BUSY_TIMEOUT_MS)}")
+    return conn
+
+
+def _quick_check(path: str) -> str:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _stamp() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+def list_backups(db_path: Optional[str] = None, dest_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """DB의 백업 스냅샷 목록(최신순)."""
+    db = Path(str(db_path or config.DB_PATH))
+    root = Path(str(dest_dir or config.BACKUP_DIR))
+    if not root.is_dir():
+        return []
+    out = []
+    for p in root.glob(f"{db.stem}-*.db"):
+        st = p.stat()
+        out.append({
+            "name": p.name,
+            "path": str(p),
+            "bytes": st.st_size,
+            "created_at": datetime.fromtimestamp(st.st_mtime, timezone.utc).isoformat(),
+        })
+    out.sort(key=lambda b: b["name"], reverse=True)
+    return out
+
+
+def _rotate(db_path: str, dest_dir: str, keep: int) -> List[str]:
+    removed = []
+    if keep <= 0:
+        return removed
+    for b in list_backups(db_path, dest_dir)[keep:]:
+        try:
+            os.remove(b["path"])
+            removed.append(b["name"])
+            for suffix in ("-wal", "-shm"):
+                Path(b["path"] + suffix).unlink(missing_ok=True)
+        except OSError:
+            logger.exception("오래된 백업 삭제 실패: %s", b["path"])
+    return removed
+
+
+def backup_database(
+    db_path: Optional[str] = None,
+    dest_dir: Optional[str] = None,
+    *,
+    pages: Optional[int] = None,
+    sleep_ms: Optional[int] = None,
+    keep: Optional[int] = None,
+    label: str = "",
+) -> Dict[str, Any]:
+    """DB를 온라인으로 백업하고 결과 지표를 반환합니다.
+
+    pages는 한 단계에 복사할 페이지 수(-1이면 한 번에), sleep_ms는 단계 사이 쉬는 시간입니다.
+    keep개를 넘는 오래된 스냅샷은 지웁니다(0이면 지우지 않음).
+    """
+    src_path = str(db_path or config.DB_PATH)
+    root = Path(str(dest_dir or config.BACKUP_DIR))
+    pages = config.BACKUP_PAGES_PER_STEP if pages is None else pages
+    sleep_s = max(0, config.BACKUP_STEP_SLEEP_MS if sleep_ms is None else sleep_ms) / 1000
+    keep = config.BACKUP_KEEP if keep is None else keep
+    root.mkdir(parents=True, exist_ok=True)
+    name = f"{Path(src_path).stem}-{_stamp()}{'-' + label if label else ''}.db"
+    final = root / name
+    partial = root / f"{name}.partial"
+
+    stats: Dict[str, Any] = {"steps": 0, "busy": 0, "restarts": 0, "max_step_ms": 0.0, "copy_s": 0.0, "sleep_s": 0.0}
+    state = {"last": None, "remaining": None}
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        now = time.perf_counter()
+        step = now - state["last"]
+        stats["steps"] += 1
+        stats["copy_s"] += step
+        stats["max_step_ms"] = max(stats["max_step_ms"], step * 1000)
+        stats["pages"] = total
+        if status in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED):
+            stats["busy"] += 1
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            stats["restarts"] += 1
+        state["remaining"] = remaining
+        if remaining and sleep_s:
+            # backup()은 BUSY일 때만 쉬므로, 단계 사이 양보는 여기서 합니다
+            time.sleep(sleep_s)
+            stats["sleep_s"] += sleep_s
+        state["last"] = time.perf_counter()
+
+    with _backup_lock:
+        started = time.perf_counter()
+        src = _connect(src_path)
+        dst = sqlite3.connect(str(partial))
+        try:
+            # 읽기 트랜잭션으로 스냅샷을 고정합니다 (WAL에서는 쓰기를 막지 않음)
+            src.execute("BEGIN")
+            src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            page_size = src.execute("PRAGMA page_size").fetchone()[0]
+            state["last"] = time.perf_counter()
+            src.backup(dst, pages=pages, progress=progress)
+            # 스냅샷은 단일 파일로 두도록 WAL 표시를 지웁니다 (열어 봐도 -wal/-shm이 남지 않음)
+            dst.execute("PRAGMA journal_mode = DELETE")
+        except Exception:
+            dst.close()
+            partial.unlink(missing_ok=True)
+            raise
+        finally:
+            src.rollback()
+            src.close()
+        dst.close()
+
+        check = _quick_check(str(partial))
+        if check != "ok":
+            partial.unlink(missing_ok=True)
+            raise sqlite3.DatabaseError(f"backup quick_check failed: {check}")
+        os.replace(partial, final)
+        elapsed = time.perf_counter() - started
+        removed = _rotate(src_path, str(root), keep)
+
+    size = final.stat().st_size
+    result = {
+        "ok": True,
+        "db_path": src_path,
+        "backup": str(final),
+        "bytes": size,
+        "page_size": page_size,
+        "pages": stats.get("pages", 0),
+        "steps": stats["steps"],
+        "busy_retries": stats["busy"],
+        "restarts": stats["restarts"],
+        "elapsed_s": round(elapsed, 3),
+        "copy_s": round(stats["copy_s"], 3),
+        "sleep_s": round(stats["sleep_s"], 3),
+        "max_step_ms": round(stats["max_step_ms"], 2),
+        "mb_per_s": round(size / 1e6 / stats["copy_s"], 1) if stats["copy_s"] else None,
+        "removed": removed,
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+    }
+    _history.append(result)
+    logger.info(
+        "DB 백업 완료: %s (%d bytes, %.2fs, steps=%d, max_step=%.1fms)",
+        final, size, elapsed, result["steps"], result["max_step_ms"],
+    )
+    return result
+
+
+def backup_all(db_path: Optional[str] = None, dest_dir: Optional[str] = None, **kwargs: Any) -> Dict[str, Any]:
+    """모든 샤드를 차례로 백업합니다(샤딩을 쓰지 않으면 DB 하나). 동시에 돌리지 않아 I/O 부담을 나눕니다."""
+    from app.utils.db_utils import shard_paths
+
+    results = [backup_database(p, dest_dir, **kwargs) for p in shard_paths(str(db_path or config.DB_PATH))]
+    return {
+        "ok": all(r["ok"] for r in results),
+        "shards": results,
+        "bytes": sum(r["bytes"] for r in results),
+        "elapsed_s": round(sum(r["elapsed_s"] for r in results), 3),
+    }
+
+
+def list_all_backups(db_path: Optional[str] = None, dest_dir: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """샤드 파일별 백업 스냅샷 목록."""
+    from app.utils.db_utils import shard_paths
+
+    return {p: list_backups(p, dest_dir) for p in shard_paths(str(db_path or config.DB_PATH))}
+
+
+def restore_backup(
+    backup_path: str,
+    db_path: Optional[str] = None,
+    *,
+    keep_current: bool = True,
+    dest_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """백업 스냅샷으로 DB를 되돌립니다.
+
+    백업 API로 대상 DB에 한 번에(한 트랜잭션) 덮어쓰므로 열린 커넥션이 있어도 파일이 찢어지지 않습니다.
+    keep_current=True면 덮어쓰기 전에 현재 DB를 dest_dir에 `-pre-restore` 스냅샷으로 남깁니다.
+    복원한 DB가 이전 스키마 버전이면 다음 확인 때 마이그레이션됩니다.
+    """
+    from app.utils.schema import ensure_schema, reset_schema_registry
+
+    target = str(db_path or config.DB_PATH)
+    if not Path(backup_path).is_file():
+        raise FileNotFoundError(backup_path)
+    check = _quick_check(backup_path)
+    if check != "ok":
+        raise sqlite3.DatabaseError(f"backup quick_check failed: {check}")
+
+    pre = None
+    if keep_current and Path(target).exists():
+        pre = backup_database(target, dest_dir, keep=0, label="pre-restore")["backup"]
+
+    started = time.perf_counter()
+    src = sqlite3.connect(backup_path)
+    dst = _connect(target)
+    try:
+        src.backup(dst, pages=-1)
+    finally:
+        src.close()
+        dst.close()
+    reset_schema_registry(target)
+    version = ensure_schema(target)
+    elapsed = time.perf_counter() - started
+    logger.info("DB 복원 완료: %s <- %s (%.2fs)", target, backup_path, elapsed)
+    return {"ok": True, "db_path": target, "restored_from": backup_path, "pre_restore": pre,
+            "schema_version": version, "elapsed_s": round(elapsed, 3)}
+
+
+def backup_stats() -> Dict[str, Any]:
+    """이 프로세스에서 실행한 최근 백업 결과."""
+    history = list(_history)
+    return {"count": len(history), "last": history[-1] if history else None, "history": history}
+
+
+__all__ = ["backup_database", "backup_all", "restore_backup", "list_backups", "list_all_backups", "backup_stats"]
@@ -1,57 +1,118 @@
 import sqlite3
-from typing import Dict, Any, Tuple
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Any, Iterable, List, Optional, Sequence, Tuple, TypeVar
 from pydantic import BaseModel
+from app.core.config import config
 from app.core.pydantic_utils import safe_model_dump
+from app.core.logger import get_logger
 from pathlib import Path
 
+logger = get_logger(__name__)
+
 
 def ensure_db_initialized(db_path: str):
     """데이터베이스 파일에 필요한 테이블이 존재하는지 확인합니다.
 
-    DB 파일 옆에 `schema.sql`(storage/db/schema.sql)이 있으면 이를 실행합니다.
-    없으면 애플리케이션이 동작할 수 있도록 최소한의 `chat_logs`와 `diaries` 테이블을 생성합니다.
-    이 함수는 아이디엄포턴트(idempotent)합니다.
+    실제 스키마 정의와 버전 관리는 `app.utils.schema`에 있습니다. 프로세스마다 DB 경로별로
+    한 번만 확인하며(`PRAGMA user_version` 기준), 이후 호출은 즉시 반환합니다.
+    DB 파일 옆에 `schema.sql`(storage/db/schema.sql)이 있으면 이를 먼저 적용합니다.
+    샤딩 모드에서는 모든 샤드 파일을 확인합니다.
     """
-    p = Path(db_path)
-    p.parent.mkdir(parents=True, exist_ok=True)
-    schema_file = p.parent / "schema.sql"
+    for index, path in enumerate(shard_paths(db_path)):
+        init_shard(path, index)
+
+
+# ---------------------------------------------------------------------------
+# 세션 샤딩
+# ---------------------------------------------------------------------------
+# DB_SHARDS > 1이면 세션을 crc32(session_id) % N번 샤드 파일에 저장합니다. 샤드 0은 DB_PATH 자체라
+# N=1이면 기존 단일 파일과 같습니다. 샤드 i의 AUTOINCREMENT id는 i << SHARD_ID_BITS부터 시작하므로
+# id는 샤드 사이에서도 겹치지 않고, id만으로 샤드를 찾을 수 있습니다(shard_path_for_id).
+SHARD_ID_BITS = 40
+_seeded: set = set()
+_seed_lock = threading.Lock()
+
+
+def shard_paths(db_path: str) -> List[str]:
+    """기준 DB 경로의 모든 샤드 파일 경로 (샤드 순서)."""
+    base = Path(str(db_path))
+    n = config.DB_SHARDS
+    if n <= 1:
+        return [str(base)]
+    return [str(base)] + [str(base.with_name(f"{base.stem}_s{i:02d}{base.suffix}")) for i in range(1, n)]
+
+
+def shard_index(session_id: str, shards: Optional[int] = None) -> int:
+    n = config.DB_SHARDS if shards is None else shards
+    if n <= 1:
+        return 0
+    return zlib.crc32(str(session_id).encode("utf-8")) % n
+
+
+def shard_path(db_path: str, session_id: Optional[str]) -> str:
+    """세션이 저장되는 샤드 파일 경로. 샤딩을 쓰지 않거나 session_id가 없으면 db_path 그대로입니다."""
+    if session_id is None or config.DB_SHARDS <= 1:
+        return str(db_path)
+    return shard_paths(db_path)[shard_index(session_id)]
+
+
+def shard_path_for_id(db_path: str, row_id: int) -> str:
+    """AUTOINCREMENT id가 만들어진 샤드 파일 경로."""
+    paths = shard_paths(db_path)
+    return paths[min(int(row_id) >> SHARD_ID_BITS, len(paths) - 1)]
+
+
+def _seed_sequences(conn: sqlite3.Connection, index: int) -> None:
+    base = index << SHARD_ID_BITS
+    tables = [
+        r["name"] if isinstance(r, dict) else r[0]
+        for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%AUTOINCREMENT%'"
+        ).fetchall()
+    ]
+    for t in tables:
+        conn.execute(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)",
+            (t, base, t),
+        )
+        conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ? AND seq < ?", (base, t, base))
+    conn.commit()
 
-    conn = sqlite3.connect(str(p))
-    try:
-        if schema_file.exists():
-            with schema_file.open("r", encoding="utf-8") as fh:
-                sql = fh.read()
-            if sql.strip():
-                conn.executescript(sql)
-        else:
-            # 필요한 테이블이 존재하도록 최소한의 폴백 스키마를 적용합니다
-            conn.executescript(
-                """
-                CREATE TABLE IF NOT EXISTS chat_logs (
-                  id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  session_id TEXT NOT NULL,
-                  role TEXT NOT NULL,
-                  text TEXT NOT NULL,
-                  meta_json TEXT,
-                  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
-                );
-
-                CREATE TABLE IF NOT EXISTS diaries (
-                  id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  session_id TEXT NOT NULL,
-                  date TEXT NOT NULL,
-                  title TEXT,
-                  content TEXT NOT NULL,
-                  tags_json TEXT,
-                  week INTEGER,
-                  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                  UNIQUE (session_id, date)
-                );
-                """
-            )
-    finally:
-        conn.commit()
-        conn.close()
+
+def init_shard(path: str, index: int = 0) -> int:
+    """샤드 파일 하나의 스키마를 맞추고, 샤드 0이 아니면 id 시작 구간을 설정합니다."""
+    from app.utils.schema import ensure_schema
+
+    version = ensure_schema(path)
+    if index > 0 and path not in _seeded:
+        with _seed_lock:
+            if path not in _seeded:
+                _seed_sequences(get_connection(path), index)
+                _seeded.add(path)
+    return version
+
+
+_shard_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_T = TypeVar("_T")
+
+
+def map_shards(db_path: str, fn: Callable[[str], _T], parallel: bool = True) -> List[_T]:
+    """fn(샤드 경로)를 모든 샤드에 대해 실행하고 샤드 순서대로 결과를 반환합니다.
+
+    샤드가 여럿이면 전용 스레드 풀에서 동시에 실행합니다(스레드마다 자기 커넥션을 씁니다).
+    """
+    global _shard_pool
+    paths = shard_paths(db_path)
+    if len(paths) == 1 or not parallel:
+        return [fn(p) for p in paths]
+    with _pool_lock:
+        if _shard_pool is None:
+            _shard_pool = ThreadPoolExecutor(max_workers=len(paths), thread_name_prefix="shard")
+    return list(_shard_pool.map(fn, paths))
 
 
 def dict_factory(cursor, row):
@@ -59,11 +120,148 @@ def dict_factory(cursor, row):
     return {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
 
 
-def get_connection(db_path: str):
-    conn = sqlite3.connect(db_path)
+# ---------------------------------------------------------------------------
+# 커넥션 관리
+# ---------------------------------------------------------------------------
+# 스레드마다 DB 경로별 커넥션을 하나씩 열어 두고 재사용합니다. FastAPI의 동기 엔드포인트와
+# 백그라운드 풀은 모두 고정된 워커 스레드에서 실행되므로 스레드 로컬 캐시로 충분합니다.
+# 커넥션을 재사용하면 sqlite3의 prepared statement 캐시(cached_statements)도 함께 재사용됩니다.
+_local = threading.local()
+_registry: List[Tuple[threading.Thread, str, sqlite3.Connection]] = []
+_registry_lock = threading.Lock()
+_stats: Dict[str, int] = {"opened": 0, "reused": 0, "closed": 0}
+
+
+def _pragmas() -> List[str]:
+    return [
+        # 새 파일에서만 효과가 있습니다(첫 테이블 생성 전, WAL 전환보다 먼저). 기존 DB는 retention.convert_to_incremental
+        "PRAGMA auto_vacuum = INCREMENTAL",
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        f"PRAGMA busy_timeout = {int(config.DB_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA mmap_size = {int(config.DB_MMAP_SIZE)}",
+        # 음수는 KiB 단위입니다
+        f"PRAGMA cache_size = -{int(config.DB_CACHE_SIZE_KB)}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+
+
+def _open_connection(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        db_path,
+        timeout=config.DB_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=config.DB_STATEMENT_CACHE,
+        # 종료 시 다른 스레드에서 close()할 수 있도록 허용합니다. 사용은 소유 스레드에서만 합니다.
+        check_same_thread=False,
+    )
     conn.row_factory = dict_factory
+    for pragma in _pragmas():
+        conn.execute(pragma)
+    return conn
+
+
+def _prune_dead_threads() -> None:
+    """종료된 스레드가 남긴 커넥션을 닫습니다."""
+    with _registry_lock:
+        dead = [e for e in _registry if not e[0].is_alive()]
+        _registry[:] = [e for e in _registry if e[0].is_alive()]
+        _stats["closed"] += len(dead)
+    for _, _, conn in dead:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_connection(db_path: str, session_id: Optional[str] = None) -> sqlite3.Connection:
+    """현재 스레드의 (db_path별) 재사용 커넥션을 반환합니다.
+
+    기존처럼 `with get_connection(path) as conn:`으로 사용하면 블록 끝에서 commit/rollback 되며,
+    커넥션은 닫히지 않고 다음 호출에서 재사용됩니다. 호출자가 close()하지 않아야 합니다.
+    session_id를 주면 샤딩 모드에서 그 세션의 샤드 파일 커넥션을 반환합니다.
+    """
+    key = shard_path(db_path, session_id)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(key)
+    if conn is not None:
+        try:
+            conn.total_changes  # 닫힌 커넥션이면 ProgrammingError
+            with _registry_lock:
+                _stats["reused"] += 1
+            return conn
+        except sqlite3.ProgrammingError:
+            conns.pop(key, None)
+
+    _prune_dead_threads()
+    conn = _open_connection(key)
+    conns[key] = conn
+    with _registry_lock:
+        _registry.append((threading.current_thread(), key, conn))
+        _stats["opened"] += 1
+    logger.debug("SQLite 커넥션 생성: path=%s, thread=%s", key, threading.current_thread().name)
     return conn
 
+
+def close_all_connections() -> None:
+    """끝난 스레드와 호출한 스레드의 커넥션을 닫습니다. 애플리케이션 종료 시 호출합니다.
+
+    아직 살아 있는 다른 스레드의 커넥션은 그 스레드가 쓰는 중일 수 있어 닫지 않습니다 (스레드가 끝나면 함께 정리됨).
+    """
+    me = threading.current_thread()
+    with _registry_lock:
+        entries, busy = [], []
+        for e in _registry:
+            (entries if e[0] is me or not e[0].is_alive() else busy).append(e)
+        _registry[:] = busy
+        _stats["closed"] += len(entries)
+        kept = len(_registry)
+    if kept:
+        logger.info("다른 스레드가 쓰는 커넥션 %d개는 닫지 않았습니다", kept)
+    for _, _, conn in entries:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    _local.__dict__.pop("conns", None)
+
+
+def connection_stats() -> Dict[str, Any]:
+    """커넥션 재사용 통계와 적용된 PRAGMA 설정을 반환합니다."""
+    with _registry_lock:
+        stats: Dict[str, Any] = dict(_stats)
+        alive = [e for e in _registry if e[0].is_alive()]
+        stats["open"] = len(_registry)
+        stats["threads"] = len({id(e[0]) for e in alive})
+        by_path: Dict[str, int] = {}
+        for _, key, _ in _registry:
+            by_path[key] = by_path.get(key, 0) + 1
+    stats["by_path"] = by_path
+    total = stats["opened"] + stats["reused"]
+    stats["reuse_ratio"] = round(stats["reused"] / total, 4) if total else 0.0
+    stats["pragmas"] = _pragmas()
+    stats["cached_statements"] = config.DB_STATEMENT_CACHE
+    return stats
+
+
+def _shard_stat(path: str) -> Dict[str, Any]:
+    with get_connection(path) as conn:
+        page = conn.execute("SELECT page_count * page_size AS bytes FROM pragma_page_count(), pragma_page_size()").fetchone()
+        row = conn.execute(
+            "SELECT (SELECT COUNT(DISTINCT session_id) FROM chat_logs) AS sessions, "
+            "(SELECT COUNT(*) FROM chat_logs) AS chat_logs, (SELECT COUNT(*) FROM diaries) AS diaries"
+        ).fetchone()
+    return {"path": path, "bytes": page["bytes"], **row}
+
+
+def shard_stats(db_path: str) -> Dict[str, Any]:
+    """샤드별 파일 크기/세션 수/행 수를 동시에 조회해 합계와 함께 반환합니다."""
+    shards = map_shards(db_path, _shard_stat)
+    totals = {k: sum(s[k] for s in shards) for k in ("bytes", "sessions", "chat_logs", "diaries")}
+    return {"count": len(shards), "shards": shards, "totals": totals}
+
+
 def prepare_model_sql_parts(model: BaseModel, pk_field: str = "id") -> Tuple[Dict[str, Any], str, list, Any]:
     """모델에서 업데이트/삽입용 컬럼, 값, PK 추출
     - model.model_fields 기준으로 안전한 컬럼만 사용
@@ -86,44 +284,95 @@ def prepare_model_sql_parts(model: BaseModel, pk_field: str = "id") -> Tuple[Dic
     return filtered, set_clause, values, pk_value
 
 
-def upsert_from_model(conn: sqlite3.Connection, table: str, model: BaseModel, pk_field: str = "session_id"):
-    """
-    Pydantic 모델 기반 동적 UPSERT (INSERT or UPDATE)
+def _model_fields(cls: type) -> Tuple[str, ...]:
+    fields = getattr(cls, "model_fields", None) or getattr(cls, "__fields__", None) or {}
+    return tuple(fields.keys())
+
+
+@lru_cache(maxsize=512)
+def _upsert_sql(cls: type, table: str, cols: Tuple[str, ...], conflict: Tuple[str, ...], pk_field: str) -> str:
+    """(모델 클래스, 테이블, 컬럼 집합, 충돌 키)별 UPSERT SQL을 만들어 캐시합니다.
+
+    conflict가 비어 있으면(자동 증가 PK가 없는 신규 행) 단순 INSERT를 만듭니다.
+    모델에 updated_at 필드가 있고 값이 주어지지 않았으면 갱신 시 CURRENT_TIMESTAMP로 채웁니다.
     """
-    # model_dump를 우선 사용해 PK 존재 여부를 판단합니다.
+    insert = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+    if not conflict:
+        return insert
+    updates = [f"{c} = excluded.{c}" for c in cols if c not in conflict and c != pk_field]
+    if updates and "updated_at" in _model_fields(cls) and "updated_at" not in cols:
+        updates.append("updated_at = CURRENT_TIMESTAMP")
+    action = f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING"
+    return f"{insert} ON CONFLICT ({', '.join(conflict)}) {action}"
+
+
+def _upsert_parts(
+    table: str, model: BaseModel, pk_field: str, conflict_cols: Optional[Sequence[str]]
+) -> Tuple[str, tuple]:
     data = safe_model_dump(model, exclude_none=True)
-    pk_value = data.get(pk_field)
-
-    if pk_value is None:
-        # PK가 제공되지 않음: 사용 가능한 필드로 단순 INSERT 수행
-        cols = ", ".join(data.keys())
-        qs = ", ".join(["?"] * len(data))
-        query = f"INSERT INTO {table} ({cols}) VALUES ({qs})"
-        conn.execute(query, tuple(data.values()))
+    if conflict_cols:
+        conflict = tuple(conflict_cols)
     else:
-        # PK가 존재함: 행이 있으면 UPDATE 시도, 없으면 INSERT 수행
-        cur = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {pk_field} = ?", (pk_value,))
-        row = cur.fetchone()
-        exists = (row["COUNT(*)"] if isinstance(row, dict) else row[0]) > 0
-
-    # 업데이트에 필요한 부분 준비 (pk_field는 제외)
-        filtered, set_clause, values, _ = prepare_model_sql_parts(model, pk_field)
-
-        if exists and set_clause:
-            query = f"""
-                UPDATE {table}
-                SET {set_clause}, updated_at = CURRENT_TIMESTAMP
-                WHERE {pk_field} = ?
-            """
-            conn.execute(query, (*values, pk_value))
-        elif not exists:
-            # PK 필드를 포함한 전체 데이터를 INSERT
-            cols = ", ".join(data.keys())
-            qs = ", ".join(["?"] * len(data))
-            query = f"INSERT INTO {table} ({cols}) VALUES ({qs})"
-            conn.execute(query, tuple(data.values()))
+        # PK가 제공되지 않으면(자동 증가 id 등) 사용 가능한 필드로 단순 INSERT 합니다
+        conflict = (pk_field,) if data.get(pk_field) is not None else ()
+    return _upsert_sql(model.__class__, table, tuple(data.keys()), conflict, pk_field), tuple(data.values())
 
-    conn.commit()
+
+def upsert_from_model(
+    conn: sqlite3.Connection,
+    table: str,
+    model: BaseModel,
+    pk_field: str = "session_id",
+    conflict_cols: Optional[Sequence[str]] = None,
+    commit: bool = True,
+) -> None:
+    """
+    Pydantic 모델 기반 동적 UPSERT (INSERT ... ON CONFLICT DO UPDATE 한 문장)
+
+    - None이 아닌 필드만 쓰므로, 기존 행의 다른 컬럼은 그대로 유지됩니다.
+    - conflict_cols를 주면 PK 대신 해당 UNIQUE 키로 충돌을 판단합니다. (예: diaries의 (session_id, date))
+    - commit=False면 호출자의 트랜잭션에 포함됩니다.
+    """
+    sql, values = _upsert_parts(table, model, pk_field, conflict_cols)
+    conn.execute(sql, values)
+    if commit:
+        conn.commit()
+
+
+def bulk_upsert_models(
+    conn: sqlite3.Connection,
+    table: str,
+    models: Iterable[BaseModel],
+    pk_field: str = "session_id",
+    conflict_cols: Optional[Sequence[str]] = None,
+    commit: bool = True,
+    on_written: Optional[Callable[[sqlite3.Connection, List[BaseModel]], None]] = None,
+) -> int:
+    """여러 모델을 한 트랜잭션에서 executemany로 UPSERT하고 처리한 행 수를 반환합니다.
+
+    - None 필드 구성이 같은 모델끼리 묶어 같은 캐시된 SQL(`_upsert_sql`)로 실행합니다.
+    - 이 함수는 세션 스냅샷을 모릅니다. 스냅샷에 비춰지는 테이블(프로필 등)을 쓸 때는 on_written에서
+      `touch_snapshot`을 호출하세요. on_written(conn, models)는 같은 트랜잭션 안에서 커밋 전에 불립니다.
+    - 중간에 실패하면 전체를 롤백하고 예외를 다시 던집니다.
+    """
+    models = list(models)
+    groups: Dict[str, List[tuple]] = {}
+    for m in models:
+        sql, values = _upsert_parts(table, m, pk_field, conflict_cols)
+        groups.setdefault(sql, []).append(values)
+    total = 0
+    try:
+        for sql, rows in groups.items():
+            conn.executemany(sql, rows)
+            total += len(rows)
+        if on_written is not None and models:
+            on_written(conn, models)
+        if commit:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return total
 
 
 def fetch_one(conn: sqlite3.Connection, table: str, pk_field: str, pk_value: Any):
@@ -0,0 +1,130 @@
+"""chat_logs.meta_json 저장 인코딩.
+
+어시스턴트 행의 meta_json은 `{"text", "data", "meta"}` 결과 전체라 본문(text)이 두 번 저장되고,
+전문가 답변은 원문/인용까지 담아 큽니다. 저장 시 아래 형식으로 줄이고, 조회 시에는 원본 값을 그대로
+들고 있다가 리치 결과가 실제로 필요할 때만 풉니다(`decode_meta`, `meta_to_json`).
+
+- 레거시: 평문 JSON 문자열 (그대로 읽힘)
+- `m2:` + JSON (TEXT): `{"v": 값, "r": [경로, ...]}`. 행 text와 같은 문자열 값은 빈 문자열로 두고
+  그 위치(키/인덱스 경로)를 "r"에 적어 중복 제거. 값 자체는 건드리지 않으므로 어떤 문자열과도 충돌하지 않습니다
+- `m2z` + zlib(JSON) (BLOB): 위 JSON이 CHAT_META_COMPRESS_MIN_BYTES 이상일 때
+- `m1:`/`m1z`: 이전 형식(자리표시자 문자열 치환). 읽기만 합니다
+
+msgpack은 의존성에 없어 JSON을 씁니다. 형식 접두사로 버전을 구분하므로 다른 코덱을 추가해도 기존 행은 그대로 읽힙니다.
+"""
+from __future__ import annotations
+import json
+import zlib
+from typing import Any, List, Optional, Union
+
+from app.core.config import config
+
+TEXT_PREFIX = "m2:"
+BLOB_PREFIX = b"m2z"
+# 이전 형식: 행 text와 같은 값을 이 자리표시자로 바꿔 저장했습니다 (같은 문자열이 실제 값이면 구분 불가)
+_V1_TEXT_PREFIX = "m1:"
+_V1_BLOB_PREFIX = b"m1z"
+_V1_TEXT_REF = "\x7ft"
+# 이보다 짧은 text는 경로를 적는 비용이 더 커서 치환하지 않습니다
+_MIN_REF_LEN = 8
+
+StoredMeta = Union[str, bytes, None]
+RefPath = List[Union[str, int]]
+
+
+def _strip_text(obj: Any, text: str, path: RefPath, refs: List[RefPath]) -> Any:
+    if isinstance(obj, str):
+        if obj == text:
+            refs.append(list(path))
+            return ""
+        return obj
+    if isinstance(obj, dict):
+        return {k: _strip_text(v, text, path + [k], refs) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_strip_text(v, text, path + [i], refs) for i, v in enumerate(obj)]
+    return obj
+
+
+def _restore_refs(value: Any, refs: List[RefPath], text: str) -> Any:
+    for path in refs:
+        if not path:
+            return text
+        node = value
+        for key in path[:-1]:
+            node = node[key]
+        node[path[-1]] = text
+    return value
+
+
+def _restore_v1(obj: Any, text: str) -> Any:
+    if isinstance(obj, str):
+        return text if obj == _V1_TEXT_REF else obj
+    if isinstance(obj, dict):
+        return {k: _restore_v1(v, text) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_restore_v1(v, text) for v in obj]
+    return obj
+
+
+def is_encoded(stored: StoredMeta) -> bool:
+    if isinstance(stored, (bytes, memoryview)):
+        return True
+    return isinstance(stored, str) and stored.startswith((TEXT_PREFIX, _V1_TEXT_PREFIX))
+
+
+def encode_meta(meta_json: Optional[str], text: Optional[str], min_compress: Optional[int] = None) -> StoredMeta:
+    """평문 meta_json 문자열을 저장 형식으로 인코딩합니다. 이미 인코딩됐거나 JSON이 아니면 그대로 둡니다."""
+    if meta_json is None or is_encoded(meta_json):
+        return meta_json
+    try:
+        obj = json.loads(meta_json)
+    except (TypeError, ValueError):
+        return meta_json
+    refs: List[RefPath] = []
+    if text and len(text) >= _MIN_REF_LEN:
+        obj = _strip_text(obj, text, [], refs)
+    body = json.dumps({"v": obj, "r": refs}, ensure_ascii=False, separators=(",", ":"))
+    raw = body.encode("utf-8")
+    threshold = config.CHAT_META_COMPRESS_MIN_BYTES if min_compress is None else min_compress
+    if threshold > 0 and len(raw) >= threshold:
+        packed = zlib.compress(raw, config.CHAT_ARCHIVE_ZLIB_LEVEL)
+        if len(packed) + len(BLOB_PREFIX) < len(raw):
+            return BLOB_PREFIX + packed
+    return TEXT_PREFIX + body
+
+
+def to_text(stored: StoredMeta) -> Optional[str]:
+    """BLOB 형식을 같은 버전의 TEXT 형식(`m2z` -> `m2:`, 이전 `m1z` -> `m1:`)으로 바꿉니다(푸는 것은 아님). 보관 세그먼트처럼 JSON에 담을 때 씁니다."""
+    if isinstance(stored, (bytes, memoryview)):
+        raw = bytes(stored)
+        for blob, text in ((BLOB_PREFIX, TEXT_PREFIX), (_V1_BLOB_PREFIX, _V1_TEXT_PREFIX)):
+            if raw.startswith(blob):
+                return text + zlib.decompress(raw[len(blob):]).decode("utf-8")
+        raise ValueError("unknown meta_json encoding")
+    return stored
+
+
+def decode_meta(stored: StoredMeta, text: Optional[str]) -> Any:
+    """저장 값을 원래 객체로 복원합니다. 비어 있거나 JSON이 아니면 None."""
+    if stored is None:
+        return None
+    body = to_text(stored)
+    if body.startswith(TEXT_PREFIX):
+        packed = json.loads(body[len(TEXT_PREFIX):])
+        return _restore_refs(packed["v"], packed["r"], text or "")
+    if body.startswith(_V1_TEXT_PREFIX):
+        return _restore_v1(json.loads(body[len(_V1_TEXT_PREFIX):]), text or "")
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def meta_to_json(stored: StoredMeta, text: Optional[str]) -> Optional[str]:
+    """저장 값을 기존 API 형태의 평문 JSON 문자열로 돌려줍니다. 레거시 값은 파싱하지 않고 그대로 반환합니다."""
+    if stored is None or not is_encoded(stored):
+        return stored
+    return json.dumps(decode_meta(stored, text), ensure_ascii=False)
+
+
+__all__ = ["encode_meta", "decode_meta", "meta_to_json", "to_text", "is_encoded", "StoredMeta"]
@@ -1,90 +1,127 @@
 """app/utils/migrations.py
 
-간단한 DB 마이그레이션 실행기.
+DB 마이그레이션 실행기.
 
-이 모듈은 `storage/db/schema.sql`에 정의된 스키마를 적용하거나
-파일이 없을 때 최소한의 폴백 스키마를 만드는 보수적이고
-아이디엄포턴트(idempotent)한 마이그레이션 헬퍼를 제공합니다. 시작 시
-파괴적 변경을 피하도록 설계되었습니다.
+코드에 정의된 스키마(`app.utils.schema`)를 적용한 뒤 DB 파일 옆 `migrations/` 디렉토리의 SQL 파일을
+이름 순서대로 적용합니다. uvicorn 워커마다 시작 시 호출되므로 아래처럼 동작합니다.
+
+- 빠른 경로: `PRAGMA user_version`이 최신이고 적용할 SQL 파일이 없으면 잠금 없이 바로 반환합니다.
+- 느린 경로: DB 옆 잠금 파일(`schema.migration_lock`)을 잡고 상태를 다시 확인한 뒤 적용하므로,
+  여러 워커가 동시에 시작해도 한 번만 실행되고 나머지는 기다렸다가 그대로 지나갑니다.
+- 파일마다 SQL 전체와 `migrations` 기록(sha256 checksum)을 한 트랜잭션으로 커밋합니다. 실패하면 그 파일을
+  롤백하고 이후 파일은 적용하지 않습니다(건너뛰고 진행하지 않음). 적용 후 내용이 바뀐 파일은 경고만 남깁니다.
+
+같은 프로세스에서 다시 호출하면 DB 경로별 레지스트리를 보고 바로 반환합니다.
 """
+import hashlib
 from pathlib import Path
-from typing import Optional, List
+from threading import Lock
+from typing import Dict, List, Optional, Set
 from app.core.config import config
-from app.utils.db_utils import ensure_db_initialized, get_connection
+from app.utils.db_utils import get_connection, init_shard, map_shards, shard_paths
+from app.utils.schema import ensure_ledger, execute_script, migration_lock, record_migration
 from app.core.logger import get_logger
 import sqlite3
 
 logger = get_logger(__name__)
 
+# 이 프로세스에서 마이그레이션을 이미 확인한 DB 경로
+_migrated: Set[str] = set()
+_migrated_lock = Lock()
+
+
+def _sql_files(path: Path) -> List[Path]:
+    migrations_dir = path.parent / "migrations"
+    if not migrations_dir.is_dir():
+        return []
+    return sorted(p for p in migrations_dir.iterdir() if p.suffix.lower() == ".sql")
 
-def _applied_migrations(conn: sqlite3.Connection) -> List[str]:
-    cur = conn.execute("SELECT name FROM migrations ORDER BY applied_at ASC")
-    rows = cur.fetchall()
-    return [r[0] if isinstance(r, tuple) else r["name"] for r in rows]
+
+def _applied_migrations(conn: sqlite3.Connection) -> Set[str]:
+    try:
+        rows = conn.execute("SELECT name FROM migrations").fetchall()
+    except sqlite3.OperationalError:
+        return set()
+    return {r[0] if isinstance(r, tuple) else r["name"] for r in rows}
 
 
 def run_migrations(db_path: Optional[str] = None) -> None:
-    """Run migrations (idempotent).
+    """Run migrations (idempotent, safe to call from several workers at once).
 
     Behavior:
-    - Ensure base schema exists via `ensure_db_initialized` (idempotent).
-    - Create a lightweight `migrations` table if missing.
-    - Apply any .sql scripts found in the `migrations/` directory next to the DB file,
-      in lexical order. Each applied script is recorded in the `migrations` table.
+    - Ensure base schema exists via `ensure_db_initialized` (checked via PRAGMA user_version).
+    - Apply pending .sql scripts in the `migrations/` directory next to the DB file, in lexical
+      order, each in its own transaction together with its `migrations` record (name, checksum).
+    - Stop at the first failing script; it is rolled back and retried on the next start.
+    - With DB_SHARDS > 1 every shard file is migrated (in parallel, each under its own lock).
+    - Runs once per process per DB path; later calls return immediately.
     """
     path = Path(str(db_path)) if db_path else Path(config.DB_PATH)
     db_path_str = str(path)
-    logger.info("DB 마이그레이션 실행: %s", db_path_str)
+    with _migrated_lock:
+        if db_path_str in _migrated:
+            return
+        paths = shard_paths(db_path_str)
+        if all(map_shards(db_path_str, lambda p: _run_migrations(Path(p), paths.index(p)))):
+            _migrated.add(db_path_str)
 
-    try:
-    # 기본 스키마 적용 또는 폴백 스키마 적용
-        ensure_db_initialized(db_path_str)
-
-    # DB 연결을 열고 migrations 테이블이 존재하는지 확인
-        with get_connection(db_path_str) as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS migrations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
-                );
-                """
-            )
-            conn.commit()
 
-            # 동일 디렉토리의 'migrations' 폴더에서 SQL 파일을 찾습니다
-            migrations_dir = path.parent / "migrations"
-            if not migrations_dir.exists():
-                logger.debug("마이그레이션 디렉토리 없음: %s", str(migrations_dir))
-                logger.info("DB 초기화/업데이트 완료: %s", db_path_str)
-                return
-
-            sql_files = sorted([p for p in migrations_dir.iterdir() if p.suffix.lower() == ".sql"])
-            applied = _applied_migrations(conn)
-
-            for sql_file in sql_files:
-                name = sql_file.name
-                if name in applied:
-                    logger.debug("마이그레이션 이미 적용됨: %s", name)
-                    continue
-
-                logger.info("마이그레이션 적용 중: %s", name)
-                try:
-                    with sql_file.open("r", encoding="utf-8") as fh:
-                        sql = fh.read()
-                    if sql.strip():
-                        conn.executescript(sql)
-                        conn.execute("INSERT INTO migrations (name) VALUES (?)", (name,))
-                        conn.commit()
-                        logger.info("마이그레이션 적용 완료: %s", name)
-                except Exception:
-                    logger.exception("마이그레이션 적용 실패: %s", name)
-                    # 다음 스크립트로 계속 진행하되 아무것도 기록하지 않습니다
-
-        logger.info("DB 초기화/업데이트 완료: %s", db_path_str)
+def _run_migrations(path: Path, shard: int = 0) -> bool:
+    db_path_str = str(path)
+
+    try:
+        # 기본 스키마: 최신이면 user_version 확인 한 번으로 끝납니다
+        init_shard(db_path_str, shard)
+
+        files = _sql_files(path)
+        if not files:
+            return True
+        conn = get_connection(db_path_str)
+        if not ({f.name for f in files} - _applied_migrations(conn)):
+            return True
+
+        logger.info("DB 마이그레이션 실행: %s", db_path_str)
+        with migration_lock(db_path_str):
+            ok = _apply_files(conn, files)
+        if ok:
+            logger.info("DB 초기화/업데이트 완료: %s", db_path_str)
+        return ok
     except Exception:
         logger.exception("DB 마이그레이션 중 오류 발생: %s", db_path_str)
+        return False
+
+
+def _apply_files(conn: sqlite3.Connection, files: List[Path]) -> bool:
+    """잠금을 쥔 상태에서 호출합니다. 다른 프로세스가 이미 적용한 파일은 다시 읽은 기록으로 걸러집니다."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        applied: Dict[str, Optional[str]] = ensure_ledger(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    for sql_file in files:
+        name = sql_file.name
+        sql = sql_file.read_text(encoding="utf-8")
+        checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+        if name in applied:
+            if applied[name] and applied[name] != checksum:
+                logger.warning("적용된 마이그레이션 파일이 변경되었습니다(다시 적용하지 않음): %s", name)
+            continue
+
+        logger.info("마이그레이션 적용 중: %s", name)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            execute_script(conn, sql)
+            record_migration(conn, name, checksum)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception("마이그레이션 적용 실패(롤백, 이후 파일 중단): %s", name)
+            return False
+        logger.info("마이그레이션 적용 완료: %s", name)
+    return True
 
 
 def find_schema_file(db_path: Optional[str] = None) -> Optional[Path]:
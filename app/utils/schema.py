@@ -0,0 +1,786 @@
+"""app/utils/schema.py
+
+애플리케이션 테이블 스키마와 버전 관리.
+
+스키마는 코드 안의 순차 마이그레이션 목록(`SCHEMA_MIGRATIONS`)으로 정의하고, 적용된 버전은
+DB 파일의 `PRAGMA user_version`에 기록합니다. 프로세스마다 DB 경로별로 한 번만 확인하며
+(`_ready` 레지스트리), 이미 최신 버전인 DB에는 DDL을 다시 실행하지 않습니다.
+
+적용할 버전이 있을 때만 DB 옆 잠금 파일로 프로세스 간 직렬화하고, 버전마다 단계 전체와 user_version,
+`migrations` 기록(checksum 포함)을 한 트랜잭션으로 커밋합니다. 실패한 버전은 통째로 롤백됩니다.
+"""
+from __future__ import annotations
+import hashlib
+import inspect
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+
+
+def _add_column_if_missing(conn: sqlite3.Connection, table: str, column: str, decl: str) -> None:
+    cols = {r["name"] if isinstance(r, dict) else r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in cols:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+_BASE_DDL = """
+CREATE TABLE IF NOT EXISTS chat_logs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id TEXT NOT NULL,
+  role TEXT NOT NULL,
+  text TEXT NOT NULL,
+  meta_json TEXT,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS diaries (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id TEXT NOT NULL,
+  date TEXT NOT NULL,
+  title TEXT,
+  content TEXT NOT NULL,
+  used_chats_json TEXT,
+  tags_json TEXT,
+  week INTEGER,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE (session_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS baby_profile (
+  session_id TEXT PRIMARY KEY,
+  name TEXT,
+  week INTEGER,
+  gender TEXT DEFAULT 'U',
+  tags_json TEXT,
+  notes TEXT,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS mother_profile (
+  session_id TEXT PRIMARY KEY,
+  name TEXT,
+  age INTEGER,
+  medical_notes TEXT,
+  prefs_json TEXT,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS persona_summaries (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id TEXT NOT NULL,
+  week_start TEXT NOT NULL,
+  week_end TEXT,
+  summary TEXT,
+  note TEXT,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE (session_id, week_start)
+);
+
+CREATE TABLE IF NOT EXISTS child_personas (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id TEXT NOT NULL,
+  persona_json TEXT NOT NULL,
+  version INTEGER NOT NULL DEFAULT 1,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS migrations (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT NOT NULL UNIQUE,
+  applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+def _base_columns(conn: sqlite3.Connection) -> None:
+    # 예전 폴백 스키마로 만든 diaries에는 used_chats_json이 없습니다
+    _add_column_if_missing(conn, "diaries", "used_chats_json", "TEXT")
+
+
+# 페르소나는 버전별로 append-only 저장합니다. (child_personas는 구버전 단일 행 테이블)
+_PERSONA_VERSIONS_DDL = """
+CREATE TABLE IF NOT EXISTS child_persona_versions (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id TEXT NOT NULL,
+  version INTEGER NOT NULL,
+  persona_json TEXT NOT NULL,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE (session_id, version)
+);
+
+-- 구버전 child_personas의 마지막 상태를 버전 테이블로 옮겨 둡니다
+INSERT OR IGNORE INTO child_persona_versions (session_id, version, persona_json, created_at)
+SELECT session_id, COALESCE(version, 1), persona_json, COALESCE(updated_at, created_at, CURRENT_TIMESTAMP)
+FROM child_personas;
+"""
+
+_CHAT_EMBEDDINGS_DDL = """
+CREATE TABLE IF NOT EXISTS chat_embeddings (
+  chat_id INTEGER PRIMARY KEY,
+  session_id TEXT NOT NULL,
+  model TEXT NOT NULL,
+  dim INTEGER NOT NULL,
+  vec BLOB NOT NULL,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_chat_embeddings_session ON chat_embeddings (session_id, chat_id);
+"""
+
+_SESSION_SNAPSHOTS_DDL = """
+CREATE TABLE IF NOT EXISTS session_snapshots (
+  session_id TEXT PRIMARY KEY,
+  baby_json TEXT,
+  mother_json TEXT,
+  persona_version INTEGER,
+  persona_json TEXT,
+  summary_date TEXT,
+  summary_json TEXT,
+  diary_date TEXT,
+  diary_json TEXT,
+  recent_json TEXT,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# created_at에는 파이썬이 쓴 KST ISO 문자열(+09:00)과 UTC CURRENT_TIMESTAMP 기본값이 섞여 있습니다.
+# julianday()는 오프셋을 UTC로 환산하고 오프셋이 없으면 UTC로 보므로, 둘 다 같은 기준의 epoch(ms)와
+# KST 날짜로 정규화됩니다. 해석할 수 없는 값은 epoch NULL, day는 앞 10글자로 둡니다.
+CHAT_EPOCH_SQL = "CAST(ROUND((julianday({col}) - 2440587.5) * 86400000) AS INTEGER)"
+CHAT_DAY_SQL = "COALESCE(date({col}, '+9 hours'), SUBSTR({col}, 1, 10))"
+
+
+def _chat_time_columns(conn: sqlite3.Connection) -> None:
+    _add_column_if_missing(conn, "chat_logs", "created_epoch", "INTEGER")
+    _add_column_if_missing(conn, "chat_logs", "day", "TEXT")
+
+
+_CHAT_TIME_DDL = f"""
+UPDATE chat_logs
+SET created_epoch = {CHAT_EPOCH_SQL.format(col="created_at")},
+    day = {CHAT_DAY_SQL.format(col="created_at")}
+WHERE created_epoch IS NULL OR day IS NULL;
+
+-- rowid(id)가 인덱스 끝에 자동으로 붙으므로 (created_epoch, id) 정렬도 인덱스 순서 그대로입니다
+CREATE INDEX IF NOT EXISTS idx_chat_logs_session_epoch ON chat_logs (session_id, created_epoch);
+CREATE INDEX IF NOT EXISTS idx_chat_logs_session_day ON chat_logs (session_id, day, created_epoch);
+
+-- 저장소를 거치지 않은 INSERT도 두 컬럼이 채워지도록 합니다
+CREATE TRIGGER IF NOT EXISTS trg_chat_logs_time_columns
+AFTER INSERT ON chat_logs
+WHEN NEW.created_epoch IS NULL OR NEW.day IS NULL
+BEGIN
+  UPDATE chat_logs
+  SET created_epoch = COALESCE(NEW.created_epoch, {CHAT_EPOCH_SQL.format(col="NEW.created_at")}),
+      day = COALESCE(NEW.day, {CHAT_DAY_SQL.format(col="NEW.created_at")})
+  WHERE id = NEW.id;
+END;
+"""
+
+def fts5_trigram_available(conn: sqlite3.Connection) -> bool:
+    """이 SQLite 빌드가 FTS5와 trigram 토크나이저(3.34+)를 지원하는지 확인합니다."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp._fts_probe USING fts5(x, tokenize='trigram')")
+        conn.execute("DROP TABLE IF EXISTS temp._fts_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+# 원본 테이블을 content로 쓰는 외부 콘텐츠 FTS5 인덱스. 한국어는 형태소 분리 없이도 부분 일치가 되도록
+# trigram 토크나이저를 씁니다. session_id도 색인해 세션 범위 검색을 MATCH 안에서 좁히며(bm25 가중치 0),
+# 인덱스는 트리거로 원본과 같은 트랜잭션에서 동기화됩니다.
+_FTS_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chat_logs_fts USING fts5(
+  session_id, text, content='chat_logs', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS trg_chat_logs_fts_ai AFTER INSERT ON chat_logs BEGIN
+  INSERT INTO chat_logs_fts(rowid, session_id, text) VALUES (NEW.id, NEW.session_id, NEW.text);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_chat_logs_fts_ad AFTER DELETE ON chat_logs BEGIN
+  INSERT INTO chat_logs_fts(chat_logs_fts, rowid, session_id, text) VALUES ('delete', OLD.id, OLD.session_id, OLD.text);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_chat_logs_fts_au AFTER UPDATE OF session_id, text ON chat_logs BEGIN
+  INSERT INTO chat_logs_fts(chat_logs_fts, rowid, session_id, text) VALUES ('delete', OLD.id, OLD.session_id, OLD.text);
+  INSERT INTO chat_logs_fts(rowid, session_id, text) VALUES (NEW.id, NEW.session_id, NEW.text);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS diaries_fts USING fts5(
+  session_id, title, content, content='diaries', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS trg_diaries_fts_ai AFTER INSERT ON diaries BEGIN
+  INSERT INTO diaries_fts(rowid, session_id, title, content) VALUES (NEW.id, NEW.session_id, NEW.title, NEW.content);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_diaries_fts_ad AFTER DELETE ON diaries BEGIN
+  INSERT INTO diaries_fts(diaries_fts, rowid, session_id, title, content)
+  VALUES ('delete', OLD.id, OLD.session_id, OLD.title, OLD.content);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_diaries_fts_au AFTER UPDATE OF session_id, title, content ON diaries BEGIN
+  INSERT INTO diaries_fts(diaries_fts, rowid, session_id, title, content)
+  VALUES ('delete', OLD.id, OLD.session_id, OLD.title, OLD.content);
+  INSERT INTO diaries_fts(rowid, session_id, title, content) VALUES (NEW.id, NEW.session_id, NEW.title, NEW.content);
+END;
+
+-- 기존 행으로 인덱스를 채웁니다
+INSERT INTO chat_logs_fts(chat_logs_fts) VALUES ('rebuild');
+INSERT INTO diaries_fts(diaries_fts) VALUES ('rebuild');
+"""
+
+
+def _fts_tables(conn: sqlite3.Connection) -> None:
+    if not fts5_trigram_available(conn):
+        # 검색은 LIKE 폴백으로 동작합니다. 지원 빌드에서는 SearchRepository.rebuild_index()로 만들 수 있습니다
+        logger.warning("FTS5 trigram 미지원 SQLite(%s): 전문 검색 인덱스를 만들지 않습니다", sqlite3.sqlite_version)
+        return
+    execute_script(conn, _FTS_DDL)
+
+
+# 오래된 chat_logs 행을 세션·월(KST) 단위로 묶어 zlib 압축 JSON으로 보관합니다(app.services.chat_archive).
+# (session_id, first_id) 인덱스로 id 범위 조회를, month UNIQUE 키로 날짜 조회를 처리합니다.
+_CHAT_ARCHIVE_DDL = """
+CREATE TABLE IF NOT EXISTS chat_archive_segments (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id TEXT NOT NULL,
+  month TEXT NOT NULL,
+  first_id INTEGER NOT NULL,
+  last_id INTEGER NOT NULL,
+  first_day TEXT,
+  last_day TEXT,
+  row_count INTEGER NOT NULL,
+  raw_bytes INTEGER NOT NULL,
+  codec TEXT NOT NULL DEFAULT 'zlib-json',
+  payload BLOB NOT NULL,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE (session_id, month)
+);
+CREATE INDEX IF NOT EXISTS idx_chat_archive_session_ids ON chat_archive_segments (session_id, first_id, last_id);
+"""
+
+
+def reencode_chat_meta(conn: sqlite3.Connection, batch_size: int = 1000) -> int:
+    """평문 JSON으로 저장된 기존 chat_logs.meta_json을 meta_codec 형식으로 다시 인코딩합니다.
+
+    id 순서로 batch_size개씩 읽어 갱신하며, 이미 인코딩된 행은 건너뜁니다. 갱신한 행 수를 반환합니다.
+    """
+    from app.utils.meta_codec import encode_meta, TEXT_PREFIX
+
+    last_id, total = 0, 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, text, meta_json FROM chat_logs "
+            "WHERE id > ? AND typeof(meta_json) = 'text' AND substr(meta_json, 1, ?) != ? ORDER BY id LIMIT ?",
+            (last_id, len(TEXT_PREFIX), TEXT_PREFIX, batch_size),
+        ).fetchall()
+        if not rows:
+            return total
+        updates = []
+        for r in rows:
+            rid, text, meta = (r["id"], r["text"], r["meta_json"]) if isinstance(r, dict) else r
+            encoded = encode_meta(meta, text)
+            if encoded != meta:
+                updates.append((encoded, rid))
+            last_id = rid
+        conn.executemany("UPDATE chat_logs SET meta_json = ? WHERE id = ?", updates)
+        total += len(updates)
+
+
+def _reencode_chat_meta(conn: sqlite3.Connection) -> None:
+    n = reencode_chat_meta(conn)
+    if n:
+        logger.info("chat meta_json 재인코딩: %d행", n)
+
+
+# 세션·날짜별 활동 집계 (달력 조회용). 삽입은 트리거가, 대화 삭제는 ChatRepository가 반영합니다.
+# 압축(보관 세그먼트 이동)과 보존 정책 삭제는 "그날 대화가 있었다"는 사실을 바꾸지 않으므로 반영하지 않습니다.
+_DAILY_ACTIVITY_DDL = f"""
+CREATE TABLE IF NOT EXISTS daily_activity (
+  session_id TEXT NOT NULL,
+  day TEXT NOT NULL,
+  user_msgs INTEGER NOT NULL DEFAULT 0,
+  assistant_msgs INTEGER NOT NULL DEFAULT 0,
+  has_diary INTEGER NOT NULL DEFAULT 0,
+  last_at TEXT,
+  PRIMARY KEY (session_id, day)
+) WITHOUT ROWID;
+
+-- day가 비어 있으면 trg_chat_logs_time_columns와 같은 규칙으로 계산합니다(트리거 실행 순서에 기대지 않음)
+CREATE TRIGGER IF NOT EXISTS trg_daily_activity_chat_ai
+AFTER INSERT ON chat_logs
+WHEN COALESCE(NEW.day, {CHAT_DAY_SQL.format(col="NEW.created_at")}) IS NOT NULL
+BEGIN
+  INSERT INTO daily_activity (session_id, day, user_msgs, assistant_msgs, last_at)
+  VALUES (
+    NEW.session_id,
+    COALESCE(NEW.day, {CHAT_DAY_SQL.format(col="NEW.created_at")}),
+    NEW.role = 'user',
+    NEW.role IN ('assistant', 'expert'),
+    NEW.created_at
+  )
+  ON CONFLICT (session_id, day) DO UPDATE SET
+    user_msgs = user_msgs + excluded.user_msgs,
+    assistant_msgs = assistant_msgs + excluded.assistant_msgs,
+    last_at = CASE WHEN last_at IS NULL OR excluded.last_at > last_at THEN excluded.last_at ELSE last_at END;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_activity_diary_ai AFTER INSERT ON diaries BEGIN
+  INSERT INTO daily_activity (session_id, day, has_diary) VALUES (NEW.session_id, NEW.date, 1)
+  ON CONFLICT (session_id, day) DO UPDATE SET has_diary = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_activity_diary_ad AFTER DELETE ON diaries BEGIN
+  UPDATE daily_activity SET has_diary = 0 WHERE session_id = OLD.session_id AND day = OLD.date;
+  DELETE FROM daily_activity
+  WHERE session_id = OLD.session_id AND day = OLD.date AND user_msgs = 0 AND assistant_msgs = 0 AND has_diary = 0;
+END;
+"""
+
+
+def _daily_activity_backfill_v10(conn: sqlite3.Connection) -> None:
+    """v10 백필(배포된 그대로 고정). 마지막 시각을 created_at 문자열로 비교하며, v11이 다시 계산합니다."""
+    from app.services.chat_archive import decode_segment
+
+    conn.execute("DELETE FROM daily_activity")
+    conn.execute(
+        """
+        INSERT INTO daily_activity (session_id, day, user_msgs, assistant_msgs, last_at)
+        SELECT session_id, day, SUM(role = 'user'), SUM(role IN ('assistant', 'expert')), MAX(created_at)
+        FROM chat_logs WHERE day IS NOT NULL
+        GROUP BY session_id, day
+        """
+    )
+    counts: Dict[Tuple[str, str], List[Any]] = {}
+    try:
+        segs = conn.execute("SELECT session_id, codec, payload FROM chat_archive_segments").fetchall()
+    except sqlite3.OperationalError:
+        segs = []
+    for seg in segs:
+        sid, codec, payload = (seg["session_id"], seg["codec"], seg["payload"]) if isinstance(seg, dict) else seg
+        for r in decode_segment(sid, payload, codec):
+            if not r.get("day"):
+                continue
+            c = counts.setdefault((sid, r["day"]), [0, 0, None])
+            c[0] += r["role"] == "user"
+            c[1] += r["role"] in ("assistant", "expert")
+            c[2] = max(c[2] or "", r.get("created_at") or "") or None
+    conn.executemany(
+        """
+        INSERT INTO daily_activity (session_id, day, user_msgs, assistant_msgs, last_at) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (session_id, day) DO UPDATE SET
+          user_msgs = user_msgs + excluded.user_msgs,
+          assistant_msgs = assistant_msgs + excluded.assistant_msgs,
+          last_at = CASE WHEN last_at IS NULL OR excluded.last_at > last_at THEN excluded.last_at ELSE last_at END
+        """,
+        [(sid, day, u, a, last) for (sid, day), (u, a, last) in counts.items()],
+    )
+    conn.execute(
+        """
+        INSERT INTO daily_activity (session_id, day, has_diary)
+        SELECT session_id, date, 1 FROM diaries WHERE date IS NOT NULL
+        ON CONFLICT (session_id, day) DO UPDATE SET has_diary = 1
+        """
+    )
+
+
+def _daily_activity_rebuild_v11(conn: sqlite3.Connection, session_id: Optional[str] = None) -> int:
+    """v11 백필이자 현재 재계산 규칙. 마지막 시각은 created_epoch가 가장 큰 행의 created_at(last_at)과 그 epoch입니다.
+
+    마이그레이션 단계이므로 규칙을 바꿀 때는 이 함수를 고치지 말고 새 버전 단계를 추가한 뒤
+    rebuild_daily_activity가 그것을 부르게 합니다.
+    """
+    from app.services.chat_archive import decode_segment
+
+    _daily_activity_last_epoch(conn)
+    where, params = ("WHERE session_id = ?", (session_id,)) if session_id else ("", ())
+    conn.execute(f"DELETE FROM daily_activity {where}", params)
+    # MAX()와 함께 고른 created_at은 SQLite 규칙상 created_epoch가 가장 큰 행의 값입니다
+    conn.execute(
+        f"""
+        INSERT INTO daily_activity (session_id, day, user_msgs, assistant_msgs, last_at, last_epoch)
+        SELECT session_id, day, SUM(role = 'user'), SUM(role IN ('assistant', 'expert')), created_at, MAX(created_epoch)
+        FROM chat_logs WHERE day IS NOT NULL {"AND session_id = ?" if session_id else ""}
+        GROUP BY session_id, day
+        """,
+        params,
+    )
+    counts: Dict[Tuple[str, str], List[Any]] = {}
+    try:
+        segs = conn.execute(f"SELECT session_id, codec, payload FROM chat_archive_segments {where}", params).fetchall()
+    except sqlite3.OperationalError:
+        segs = []
+    for seg in segs:
+        sid, codec, payload = (seg["session_id"], seg["codec"], seg["payload"]) if isinstance(seg, dict) else seg
+        for r in decode_segment(sid, payload, codec):
+            if not r.get("day"):
+                continue
+            c = counts.setdefault((sid, r["day"]), [0, 0, None, None])
+            c[0] += r["role"] == "user"
+            c[1] += r["role"] in ("assistant", "expert")
+            epoch = r.get("created_epoch")
+            if epoch is not None and (c[3] is None or epoch > c[3]):
+                c[2], c[3] = r.get("created_at"), epoch
+    conn.executemany(
+        f"""
+        INSERT INTO daily_activity (session_id, day, user_msgs, assistant_msgs, last_at, last_epoch)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (session_id, day) DO UPDATE SET
+          user_msgs = user_msgs + excluded.user_msgs,
+          assistant_msgs = assistant_msgs + excluded.assistant_msgs,
+          {_LAST_AT_UPDATE}
+        """,
+        [(sid, day, u, a, last, epoch) for (sid, day), (u, a, last, epoch) in counts.items()],
+    )
+    conn.execute(
+        f"""
+        INSERT INTO daily_activity (session_id, day, has_diary)
+        SELECT session_id, date, 1 FROM diaries WHERE date IS NOT NULL {"AND session_id = ?" if session_id else ""}
+        ON CONFLICT (session_id, day) DO UPDATE SET has_diary = 1
+        """,
+        params,
+    )
+    row = conn.execute(f"SELECT COUNT(*) AS n FROM daily_activity {where}", params).fetchone()
+    return int(row["n"] if isinstance(row, dict) else row[0])
+
+
+def rebuild_daily_activity(conn: sqlite3.Connection, session_id: Optional[str] = None) -> int:
+    """chat_logs, 보관 세그먼트, diaries로부터 daily_activity를 다시 계산합니다. 만든 행 수를 반환합니다.
+
+    created_at은 UTC 기본값과 +09:00 문자열이 섞여 있어 문자열로 비교하면 안 되므로 created_epoch 기준으로
+    마지막 시각을 고릅니다(v11 규칙).
+    """
+    return _daily_activity_rebuild_v11(conn, session_id)
+
+
+# ON CONFLICT SET의 식은 모두 갱신 전 행 기준으로 계산되므로 last_at과 last_epoch를 같은 조건으로 바꿉니다
+_LAST_AT_UPDATE = """last_at = CASE WHEN last_epoch IS NULL OR excluded.last_epoch > last_epoch THEN excluded.last_at ELSE last_at END,
+          last_epoch = CASE WHEN last_epoch IS NULL OR excluded.last_epoch > last_epoch THEN excluded.last_epoch ELSE last_epoch END"""
+
+
+def _daily_activity_last_epoch(conn: sqlite3.Connection) -> None:
+    _add_column_if_missing(conn, "daily_activity", "last_epoch", "INTEGER")
+
+
+# v10 트리거는 created_at 문자열을 비교해 'T' 형식(+09:00)과 ' ' 형식(UTC 기본값)이 섞이면 마지막 시각을 잘못 골랐습니다
+_DAILY_ACTIVITY_EPOCH_DDL = f"""
+DROP TRIGGER IF EXISTS trg_daily_activity_chat_ai;
+CREATE TRIGGER trg_daily_activity_chat_ai
+AFTER INSERT ON chat_logs
+WHEN COALESCE(NEW.day, {CHAT_DAY_SQL.format(col="NEW.created_at")}) IS NOT NULL
+BEGIN
+  INSERT INTO daily_activity (session_id, day, user_msgs, assistant_msgs, last_at, last_epoch)
+  VALUES (
+    NEW.session_id,
+    COALESCE(NEW.day, {CHAT_DAY_SQL.format(col="NEW.created_at")}),
+    NEW.role = 'user',
+    NEW.role IN ('assistant', 'expert'),
+    NEW.created_at,
+    COALESCE(NEW.created_epoch, {CHAT_EPOCH_SQL.format(col="NEW.created_at")})
+  )
+  ON CONFLICT (session_id, day) DO UPDATE SET
+    user_msgs = user_msgs + excluded.user_msgs,
+    assistant_msgs = assistant_msgs + excluded.assistant_msgs,
+    {_LAST_AT_UPDATE};
+END;
+"""
+
+
+# 압축(보관)된 대화의 검색 인덱스. 원본 chat_logs 행이 없으므로 외부 content 대신 본문을 직접 저장합니다.
+# rowid는 원래 chat id이며, chat_archive의 압축/삭제 경로가 같은 트랜잭션에서 갱신합니다
+_ARCHIVE_FTS_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chat_archive_fts USING fts5(
+  session_id, text, role UNINDEXED, day UNINDEXED, created_at UNINDEXED, tokenize='trigram'
+);
+"""
+
+
+def archive_fts_table(conn: sqlite3.Connection) -> None:
+    """chat_archive_fts를 (없으면 만들고) 기존 세그먼트로 채웁니다. trigram 미지원이면 만들지 않습니다."""
+    from app.services.chat_archive import rebuild_archive_index
+
+    if not fts5_trigram_available(conn):
+        logger.warning("FTS5 trigram 미지원 SQLite(%s): 보관 대화 검색 인덱스를 만들지 않습니다", sqlite3.sqlite_version)
+        return
+    execute_script(conn, _ARCHIVE_FTS_DDL)
+    n = rebuild_archive_index(conn)
+    if n:
+        logger.info("chat_archive_fts 채움: %d행", n)
+
+
+# (버전, 이름, 단계 목록). 버전은 1부터 빠짐없이 증가해야 하며, 한 번 배포된 단계는 수정하지 않고
+# 새 버전을 추가합니다. 모든 DDL은 IF NOT EXISTS로 작성해 user_version이 없던 기존 DB에도 안전합니다.
+SCHEMA_MIGRATIONS: List[Tuple[int, str, List[Step]]] = [
+    (1, "base_tables", [_BASE_DDL, _base_columns]),
+    (2, "child_persona_versions", [_PERSONA_VERSIONS_DDL]),
+    (3, "chat_embeddings", [_CHAT_EMBEDDINGS_DDL]),
+    (4, "session_snapshots", [_SESSION_SNAPSHOTS_DDL]),
+    (5, "chat_logs_epoch_day", [_chat_time_columns, _CHAT_TIME_DDL]),
+    # (session_id, rowid) 순서의 키셋 페이지네이션/건수 조회용
+    (6, "chat_logs_session_index", ["CREATE INDEX IF NOT EXISTS idx_chat_logs_session ON chat_logs (session_id);"]),
+    (7, "fts_chat_diary", [_fts_tables]),
+    (8, "chat_archive_segments", [_CHAT_ARCHIVE_DDL]),
+    # 어시스턴트 결과의 중복 본문 제거 + 큰 값 압축(app.utils.meta_codec). 그때의 현재 코덱으로 쓰며,
+    # 저장 값은 형식 접두사로 코덱을 밝히므로 코덱이 바뀌어도 이전에 쓴 값은 그대로 읽힙니다
+    (9, "chat_meta_compact_encoding", [_reencode_chat_meta]),
+    # 세션·날짜별 대화/일기 집계 (달력 조회)
+    (10, "daily_activity", [_DAILY_ACTIVITY_DDL, _daily_activity_backfill_v10]),
+    # 마지막 대화 시각을 created_at 문자열 대신 created_epoch로 비교
+    (11, "daily_activity_last_epoch", [_daily_activity_last_epoch, _DAILY_ACTIVITY_EPOCH_DDL, _daily_activity_rebuild_v11]),
+    # 보관 세그먼트로 옮긴 대화도 검색되도록 별도 FTS 인덱스
+    (12, "chat_archive_fts", [archive_fts_table]),
+]
+
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+# 이 프로세스에서 이미 확인한 DB 경로 -> 확인 시점의 user_version
+_ready: Dict[str, int] = {}
+_lock = Lock()
+
+
+def _user_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("PRAGMA user_version").fetchone()
+    return int(row["user_version"] if isinstance(row, dict) else row[0])
+
+
+def split_sql(sql: str) -> Iterator[str]:
+    """SQL 스크립트를 문장 단위로 나눕니다. 트리거 본문(BEGIN ... END;)과 문자열 안의 `;`는 나누지 않습니다."""
+    stmt = ""
+    for piece in sql.split(";"):
+        stmt += piece + ";"
+        if sqlite3.complete_statement(stmt):
+            if stmt.strip().rstrip(";").strip():
+                yield stmt
+            stmt = ""
+    if stmt.strip().rstrip(";").strip():
+        yield stmt
+
+
+def execute_script(conn: sqlite3.Connection, sql: str) -> None:
+    """executescript와 달리 현재 트랜잭션을 커밋하지 않고 문장을 하나씩 실행합니다."""
+    for stmt in split_sql(sql):
+        conn.execute(stmt)
+
+
+def step_checksum(steps: Sequence[Step]) -> str:
+    """마이그레이션 단계(SQL 또는 함수 소스)의 sha256. 배포 후 단계가 바뀌었는지 확인하는 데 씁니다.
+
+    함수는 그 함수의 소스만 해시하므로, 단계 함수는 바뀔 수 있는 공용 함수에 위임하지 말고 동작을
+    본문에 담아야 합니다(예: _daily_activity_backfill_v10).
+    """
+    h = hashlib.sha256()
+    for step in steps:
+        if callable(step):
+            try:
+                src = inspect.getsource(step)
+            except (OSError, TypeError):
+                src = getattr(step, "__qualname__", repr(step))
+        else:
+            src = step
+        h.update(src.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+_LEDGER_DDL = """
+CREATE TABLE IF NOT EXISTS migrations (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT NOT NULL UNIQUE,
+  checksum TEXT,
+  applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def ensure_ledger(conn: sqlite3.Connection) -> Dict[str, Optional[str]]:
+    """migrations 기록 테이블을 준비하고 {이름: checksum}을 반환합니다. 트랜잭션 안에서 호출합니다."""
+    conn.execute(_LEDGER_DDL)
+    _add_column_if_missing(conn, "migrations", "checksum", "TEXT")
+    rows = conn.execute("SELECT name, checksum FROM migrations").fetchall()
+    return {(r["name"] if isinstance(r, dict) else r[0]): (r["checksum"] if isinstance(r, dict) else r[1]) for r in rows}
+
+
+def record_migration(conn: sqlite3.Connection, name: str, checksum: str) -> None:
+    conn.execute(
+        "INSERT INTO migrations (name, checksum) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET checksum = COALESCE(migrations.checksum, excluded.checksum)",
+        (name, checksum),
+    )
+
+
+def _ledger_name(version: int, name: str) -> str:
+    return f"schema:v{version:03d}_{name}"
+
+
+@contextmanager
+def migration_lock(db_path: str) -> Iterator[None]:
+    """DB 파일 옆의 `.migrate.lock`에 프로세스 간 배타 잠금을 겁니다.
+
+    여러 uvicorn 워커가 동시에 시작해도 마이그레이션은 한 프로세스만 실행하고, 나머지는 기다렸다가
+    갱신된 user_version을 보고 바로 지나갑니다.
+    """
+    lock_path = Path(f"{db_path}.migrate.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        else:  # pragma: no cover - Windows
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:  # pragma: no cover - Windows
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection) -> Iterator[None]:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _apply_schema_file(conn: sqlite3.Connection, db_path: Path, current: int) -> None:
+    schema_file = db_path.parent / "schema.sql"
+    if not schema_file.exists():
+        return
+    sql = schema_file.read_text(encoding="utf-8")
+    checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+    with _transaction(conn):
+        applied = ensure_ledger(conn)
+        if "schema.sql" in applied:
+            if applied["schema.sql"] != checksum:
+                logger.warning("schema.sql이 적용 후 변경되었습니다(다시 적용하지 않음): %s", schema_file)
+            return
+        if current == 0 and sql.strip():
+            # 배포 환경에서 제공하는 스키마 파일은 새 DB에 한 번만 적용합니다
+            logger.info("schema.sql 적용: %s", schema_file)
+            execute_script(conn, sql)
+        record_migration(conn, "schema.sql", checksum)
+
+
+def _apply(conn: sqlite3.Connection, db_path: Path) -> int:
+    """잠금을 쥔 상태에서 호출합니다. 각 버전은 단계, user_version, 기록을 한 트랜잭션으로 적용합니다."""
+    current = _user_version(conn)
+    if current >= SCHEMA_VERSION:
+        return current  # 다른 프로세스가 먼저 적용했습니다
+    _apply_schema_file(conn, db_path, current)
+
+    for version, name, steps in SCHEMA_MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info("스키마 마이그레이션 적용: v%d %s (%s)", version, name, db_path)
+        with _transaction(conn):
+            ensure_ledger(conn)
+            checksum = step_checksum(steps)
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    execute_script(conn, step)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            record_migration(conn, _ledger_name(version, name), checksum)
+        current = version
+
+    # 기록이 없는 이전 버전(기록 도입 전에 적용된 DB)은 현재 checksum으로 채우고, 다르면 경고합니다
+    with _transaction(conn):
+        applied = ensure_ledger(conn)
+        for version, name, steps in SCHEMA_MIGRATIONS:
+            key, checksum = _ledger_name(version, name), step_checksum(steps)
+            if key not in applied:
+                record_migration(conn, key, checksum)
+            elif applied[key] and applied[key] != checksum:
+                logger.warning("적용된 스키마 마이그레이션이 변경되었습니다: %s", key)
+    return current
+
+
+def ensure_schema(db_path: str) -> int:
+    """DB 스키마를 최신 버전으로 맞추고 user_version을 반환합니다.
+
+    최신 DB는 `PRAGMA user_version` 한 번으로 확인이 끝납니다. 적용할 버전이 있으면 파일 잠금을 잡고
+    버전을 다시 읽은 뒤 적용하므로, 여러 프로세스가 동시에 시작해도 한 번만 실행됩니다.
+    프로세스 안에서 같은 경로는 한 번만 확인하며, 이후 호출은 레지스트리만 보고 바로 반환합니다.
+    """
+    key = str(db_path)
+    version = _ready.get(key)
+    if version is not None:
+        return version
+
+    from app.utils.db_utils import get_connection
+
+    with _lock:
+        version = _ready.get(key)
+        if version is not None:
+            return version
+        p = Path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        conn = get_connection(key)
+        current = _user_version(conn)
+        if current < SCHEMA_VERSION:
+            with migration_lock(key):
+                current = _apply(conn, p)
+        elif current > SCHEMA_VERSION:
+            logger.warning("DB 스키마 버전(v%d)이 코드(v%d)보다 높습니다: %s", current, SCHEMA_VERSION, key)
+        _ready[key] = current
+        return current
+
+
+def schema_status() -> Dict[str, int]:
+    """이 프로세스에서 확인한 DB 경로별 스키마 버전."""
+    return dict(_ready)
+
+
+def reset_schema_registry(db_path: Optional[str] = None) -> None:
+    """레지스트리를 비웁니다. DB 파일을 교체(복원 등)한 뒤 다시 확인하게 할 때 사용합니다."""
+    with _lock:
+        if db_path is None:
+            _ready.clear()
+        else:
+            _ready.pop(str(db_path), None)
+
+
+__all__ = [
+    "ensure_schema",
+    "schema_status",
+    "reset_schema_registry",
+    "fts5_trigram_available",
+    "archive_fts_table",
+    "reencode_chat_meta",
+    "rebuild_daily_activity",
+    "migration_lock",
+    "ensure_ledger",
+    "record_migration",
+    "execute_script",
+    "split_sql",
+    "step_checksum",
+    "SCHEMA_VERSION",
+    "SCHEMA_MIGRATIONS",
+]
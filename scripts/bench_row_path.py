@@ -0,0 +1,114 @@
+"""대량 조회 행 경로 벤치마크 (Pydantic 모델 vs model_construct vs 경량 튜플).
+
+임시 DB에 한 세션의 chat_logs / diaries 행을 N개 만들고, 행당 비용을 비교합니다.
+
+    python scripts/bench_row_path.py            # 기본 100,000행
+    python scripts/bench_row_path.py --rows 20000 --repeat 5
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.pydantic_utils import safe_model_dump  # noqa: E402
+from app.services.chat_repo import ChatLog, ChatRepository, rows_to_dicts  # noqa: E402
+from app.services.diary_repo import DiaryEntry, DiaryRepository  # noqa: E402
+from app.utils.db_utils import get_connection  # noqa: E402
+
+
+def _seed(db_path: str, n: int) -> None:
+    conn = get_connection(db_path)
+    conn.executemany(
+        "INSERT INTO chat_logs (session_id, role, text, meta_json, created_at, created_epoch, day) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            ("bench", "user" if i % 2 == 0 else "assistant", f"메시지 {i} " * 4, '{"route":"smalltalk"}',
+             "2025-01-01T09:00:00+09:00", 1735689600000 + i, "2025-01-01")
+            for i in range(n)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO diaries (session_id, date, title, content, used_chats_json) VALUES (?, ?, ?, ?, ?)",
+        (("bench", f"d{i:07d}", f"제목 {i}", f"일기 내용 {i} " * 8, "[1,2,3]") for i in range(n)),
+    )
+    conn.commit()
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="bulk read row path benchmark")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    n = args.rows
+
+    with tempfile.TemporaryDirectory() as d:
+        db = str(Path(d) / "bench.db")
+        chats = ChatRepository(db_path=db, write_behind=False)
+        diaries = DiaryRepository(db_path=db)
+        _seed(db, n)
+
+        def chat_validated():
+            # 이전 경로: dict_factory -> ChatLog(**r) 검증 -> safe_model_dump
+            with get_connection(db) as conn:
+                rows = conn.execute(
+                    "SELECT * FROM chat_logs WHERE session_id = ? ORDER BY created_epoch, id", ("bench",)
+                ).fetchall()
+            return [safe_model_dump(ChatLog(**r)) for r in rows]
+
+        def chat_model_construct():
+            with get_connection(db) as conn:
+                rows = conn.execute(
+                    "SELECT * FROM chat_logs WHERE session_id = ? ORDER BY created_epoch, id", ("bench",)
+                ).fetchall()
+            return [safe_model_dump(ChatLog.model_construct(**r)) for r in rows]
+
+        def chat_repo_models():
+            return [safe_model_dump(m) for m in chats.get_session_messages("bench")]
+
+        def chat_tuples():
+            return rows_to_dicts(chats.get_session_rows("bench"))
+
+        def chat_tuples_only():
+            return chats.get_session_rows("bench")
+
+        def diary_validated():
+            with get_connection(db) as conn:
+                rows = conn.execute("SELECT * FROM diaries WHERE session_id = ? ORDER BY date DESC", ("bench",)).fetchall()
+            return [safe_model_dump(DiaryEntry(**r)) for r in rows]
+
+        def diary_repo_models():
+            return [safe_model_dump(x) for x in diaries.list_diaries("bench")]
+
+        def diary_tuples():
+            return [r._asdict() for r in diaries.list_diary_rows("bench")]
+
+        cases = [
+            ("chat: ChatLog(**row) + model_dump (before)", chat_validated),
+            ("chat: model_construct + model_dump", chat_model_construct),
+            ("chat: get_session_messages + model_dump", chat_repo_models),
+            ("chat: ChatRow tuples -> dict", chat_tuples),
+            ("chat: ChatRow tuples only", chat_tuples_only),
+            ("diary: DiaryEntry(**row) + model_dump (before)", diary_validated),
+            ("diary: list_diaries + model_dump", diary_repo_models),
+            ("diary: DiaryRow tuples -> dict", diary_tuples),
+        ]
+        print(f"rows={n:,}, best of {args.repeat}")
+        for name, fn in cases:
+            secs = _time(fn, args.repeat)
+            print(f"  {name:<48} {secs * 1000:9.1f} ms  {secs / n * 1e6:6.2f} us/row")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,18 +12,34 @@ modules = [
     "app.services.diary_repo",
     "app.main",
     "app.adapters.rag.chroma_adapter",
+    "app.adapters.rag.chroma_cache",
+    "app.adapters.rag.retrieval_cache",
     "app.core.tooling",
     "app.tools.db_tools",
     "app.tools.rag_tools",
     "app.nodes.urgent_triage_node",
     "app.nodes.medical_qna_node",
     "app.nodes.baby_smalltalk_node",
+    "app.nodes.turn_insights_node",
     "app.utils.db_utils",
+    "app.utils.schema",
+    "app.utils.meta_codec",
+    "app.utils.backup",
     "app.tools.render_tools",
     "app.tools.tool_registry",
     "app.graphs.main_graph",
     "app.core.config",
     "app.core.state",
+    "app.core.background",
+    "app.core.db_executor",
+    "app.services.memory_repo",
+    "app.services.snapshot_repo",
+    "app.services.export_repo",
+    "app.services.search_repo",
+    "app.services.chat_archive",
+    "app.services.retention",
+    "app.services.chat_import",
+    "app.services.activity_repo",
 ]
 
 any_error = False
@@ -0,0 +1,39 @@
+"""오래된 채팅 로그를 세션·월별 압축 세그먼트로 옮기는 작업.
+
+사용 예:
+    python scripts/compact_chat_logs.py                 # CHAT_ARCHIVE_AFTER_DAYS 기준
+    python scripts/compact_chat_logs.py --days 30 --session demo-session
+    python scripts/compact_chat_logs.py --stats
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import config  # noqa: E402
+from app.services.chat_archive import archive_stats, compact_chat_logs  # noqa: E402
+from app.utils.db_utils import ensure_db_initialized  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="chat_logs 콜드 스토리지 압축")
+    parser.add_argument("--db", default=str(config.DB_PATH), help="SQLite DB 경로")
+    parser.add_argument("--days", type=int, default=None, help="이 일수보다 오래된 대화를 압축 (기본: CHAT_ARCHIVE_AFTER_DAYS)")
+    parser.add_argument("--session", default=None, help="특정 세션만 압축")
+    parser.add_argument("--max-sessions", type=int, default=None, help="한 번에 처리할 최대 세션 수")
+    parser.add_argument("--stats", action="store_true", help="압축하지 않고 보관 통계만 출력")
+    args = parser.parse_args()
+
+    ensure_db_initialized(args.db)
+    if args.stats:
+        result = archive_stats(args.db)
+    else:
+        result = compact_chat_logs(args.db, args.days, args.session, args.max_sessions)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""SQLite 온라인 백업/복원 CLI.
+
+사용 예:
+    python scripts/db_backup.py backup                     # BACKUP_DIR에 스냅샷, BACKUP_KEEP개 유지
+    python scripts/db_backup.py backup --pages 128 --sleep-ms 20
+    python scripts/db_backup.py list
+    python scripts/db_backup.py restore storage/backups/app-20250101T000000000000Z.db
+
+복원은 실행 중인 서버가 있어도 파일이 찢어지지 않지만, 서버 프로세스의 메모리 캐시(스냅샷/버퍼)는
+그대로이므로 복원 후 서버를 재시작하는 것을 권장합니다.
+DB_SHARDS > 1이면 backup/list는 모든 샤드를 다루고, restore는 --db로 대상 샤드 파일을 지정합니다.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import config  # noqa: E402
+from app.utils.backup import backup_all, list_all_backups, restore_backup  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="SQLite 온라인 백업/복원")
+    parser.add_argument("--db", default=str(config.DB_PATH), help="SQLite DB 경로")
+    parser.add_argument("--dir", default=str(config.BACKUP_DIR), help="백업 디렉토리")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("backup", help="온라인 스냅샷 생성")
+    b.add_argument("--pages", type=int, default=None, help="단계당 페이지 수 (기본: BACKUP_PAGES_PER_STEP, -1이면 한 번에)")
+    b.add_argument("--sleep-ms", type=int, default=None, help="단계 사이 쉬는 시간 (기본: BACKUP_STEP_SLEEP_MS)")
+    b.add_argument("--keep", type=int, default=None, help="남길 스냅샷 수 (기본: BACKUP_KEEP, 0이면 지우지 않음)")
+
+    sub.add_parser("list", help="스냅샷 목록")
+
+    r = sub.add_parser("restore", help="스냅샷으로 DB 복원")
+    r.add_argument("backup", help="복원할 백업 파일 경로 또는 list의 name")
+    r.add_argument("--no-keep-current", action="store_true", help="복원 전 현재 DB를 스냅샷으로 남기지 않음")
+    args = parser.parse_args()
+
+    if args.cmd == "backup":
+        result = backup_all(args.db, args.dir, pages=args.pages, sleep_ms=args.sleep_ms, keep=args.keep)
+    elif args.cmd == "list":
+        result = list_all_backups(args.db, args.dir)
+    else:
+        path = Path(args.backup)
+        if not path.exists() and (Path(args.dir) / args.backup).exists():
+            path = Path(args.dir) / args.backup
+        result = restore_backup(str(path), args.db, keep_current=not args.no_keep_current, dest_dir=args.dir)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
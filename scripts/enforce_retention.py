@@ -0,0 +1,52 @@
+"""보존 정책 적용 + 증분 VACUUM.
+
+사용 예:
+    python scripts/enforce_retention.py                  # RETENTION_* 정책 적용 후 증분 VACUUM
+    python scripts/enforce_retention.py --dry-run        # 지울 행 수만 확인
+    python scripts/enforce_retention.py --chat-days 180 --persona-keep 10
+    python scripts/enforce_retention.py --stats
+    python scripts/enforce_retention.py --convert        # 기존 DB를 auto_vacuum=INCREMENTAL로 전환 (전체 VACUUM, 한 번)
+
+--convert는 끝날 때까지 쓰기를 막으므로 서버를 멈추거나 한가할 때 실행합니다.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import config  # noqa: E402
+from app.services.retention import convert_to_incremental, enforce_retention, retention_stats  # noqa: E402
+from app.utils.db_utils import ensure_db_initialized, shard_paths  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="보존 정책 / 증분 VACUUM")
+    parser.add_argument("--db", default=str(config.DB_PATH), help="SQLite DB 경로")
+    parser.add_argument("--chat-days", type=int, default=None, help="요약된 원본 대화 보존 일수 (기본: RETENTION_CHAT_DAYS)")
+    parser.add_argument("--persona-keep", type=int, default=None, help="세션별 페르소나 버전 보존 개수 (기본: RETENTION_PERSONA_VERSIONS_KEEP)")
+    parser.add_argument("--dry-run", action="store_true", help="지우지 않고 대상 행 수만 출력")
+    parser.add_argument("--no-vacuum", action="store_true", help="증분 VACUUM을 건너뜀")
+    parser.add_argument("--convert", action="store_true", help="auto_vacuum=INCREMENTAL로 전환 (전체 VACUUM)")
+    parser.add_argument("--stats", action="store_true", help="정책과 빈 공간 통계만 출력")
+    args = parser.parse_args()
+
+    if args.chat_days is not None:
+        config.RETENTION_CHAT_DAYS = args.chat_days
+    if args.persona_keep is not None:
+        config.RETENTION_PERSONA_VERSIONS_KEEP = args.persona_keep
+
+    ensure_db_initialized(args.db)
+    if args.stats:
+        result = retention_stats(args.db)
+    elif args.convert:
+        result = {"shards": [convert_to_incremental(p) for p in shard_paths(args.db)]}
+    else:
+        result = enforce_retention(args.db, dry_run=args.dry_run, vacuum=not args.no_vacuum)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
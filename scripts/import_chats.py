@@ -0,0 +1,58 @@
+"""JSONL/CSV 대화 기록 일괄 가져오기.
+
+사용 예:
+    python scripts/import_chats.py export.jsonl
+    python scripts/import_chats.py partner.csv --session demo-session --no-summarize
+    python scripts/import_chats.py dump.txt --format jsonl --chunk 50000
+    python scripts/import_chats.py utc_export.csv --tz UTC
+
+레코드 필드: session_id, role, text(content), created_at(timestamp, ISO 또는 epoch), meta_json(선택).
+오프셋 없는 created_at은 --tz(기본 KST)의 현지 시각으로 봅니다.
+잘못된 행은 건너뛰고 개수와 처음 몇 개의 오류를 출력합니다. 요약/인덱싱은 이 프로세스의
+백그라운드 풀에서 실행되므로 끝날 때까지 기다린 뒤 종료합니다(--no-summarize --no-index로 끔).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.background import shutdown_background  # noqa: E402
+from app.core.config import config  # noqa: E402
+from app.services.chat_import import import_chat_records, iter_file_records  # noqa: E402
+from app.utils.db_utils import ensure_db_initialized  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="대화 기록 일괄 가져오기")
+    parser.add_argument("path", help="가져올 JSONL/CSV 파일")
+    parser.add_argument("--db", default=str(config.DB_PATH), help="SQLite DB 경로")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None, help="파일 형식 (기본: 확장자)")
+    parser.add_argument("--session", default=None, help="레코드에 session_id가 없을 때 쓸 세션")
+    parser.add_argument("--tz", default=None, help="오프셋 없는 created_at의 시간대 (기본 KST, 예: UTC, +00:00, Asia/Seoul)")
+    parser.add_argument("--chunk", type=int, default=None, help="트랜잭션당 행 수 (기본: IMPORT_CHUNK_ROWS)")
+    parser.add_argument("--no-summarize", action="store_true", help="세션 요약을 예약하지 않음")
+    parser.add_argument("--no-index", action="store_true", help="대화 메모리 인덱싱을 예약하지 않음")
+    args = parser.parse_args()
+
+    ensure_db_initialized(args.db)
+    try:
+        result = import_chat_records(
+            iter_file_records(args.path, args.format),
+            args.db,
+            default_session=args.session,
+            tz=args.tz,
+            chunk_rows=args.chunk,
+            summarize=not args.no_summarize,
+            index=not args.no_index,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    shutdown_background(wait=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -38,16 +38,65 @@ def get_diary(session_id: str, date: str) -> Dict[str, Any]:
     return r.json()
 
 
-def get_chat_history(session_id: str) -> Dict[str, Any]:
+def get_chat_history(
+    session_id: str,
+    *,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    limit: int | None = None,
+    include_meta: bool = False,
+    day: str | None = None,
+) -> Dict[str, Any]:
+    """대화 조회. 인자가 없으면 세션 전체, before_id/after_id/limit/day 중 하나라도 주면 키셋 페이지 하나를 반환합니다.
+
+    응답의 next_before_id를 before_id로 넘기면 더 오래된 페이지를 가져옵니다. day(YYYY-MM-DD)를 주면 그날 안에서만 넘깁니다.
+    기본(include_meta=False)은 meta_json(리치 결과)을 비워서 받습니다. has_meta인 메시지의 결과는
+    get_chat_message_result로 따로 조회하세요.
+    """
     url = f"{API_BASE}/api/chat/{session_id}/history"
-    r = requests.get(url, timeout=15)
+    params: Dict[str, Any] = {
+        k: v for k, v in {"before_id": before_id, "after_id": after_id, "limit": limit, "day": day}.items() if v is not None
+    }
+    params["include_meta"] = str(include_meta).lower()
+    r = requests.get(url, params=params, timeout=15)
+    r.raise_for_status()
+    return r.json()
+
+
+def get_chat_history_count(session_id: str) -> Dict[str, Any]:
+    url = f"{API_BASE}/api/chat/{session_id}/history/count"
+    r = requests.get(url, timeout=10)
     r.raise_for_status()
     return r.json()
 
 
-def get_chat_history_by_date(session_id: str, date: str) -> Dict[str, Any]:
+def search(query: str, session_id: str, *, types: str = "chat,diary", limit: int = 20) -> Dict[str, Any]:
+    url = f"{API_BASE}/api/search"
+    params: Dict[str, Any] = {"q": query, "session_id": session_id, "types": types, "limit": limit}
+    r = requests.get(url, params=params, timeout=10)
+    r.raise_for_status()
+    return r.json()
+
+
+def get_chat_history_by_date(session_id: str, date: str, include_meta: bool = False) -> Dict[str, Any]:
     url = f"{API_BASE}/api/chat/{session_id}/history/{date}"
-    r = requests.get(url, timeout=15)
+    r = requests.get(url, params={"include_meta": str(include_meta).lower()}, timeout=15)
+    r.raise_for_status()
+    return r.json()
+
+
+def get_calendar(session_id: str, month: str) -> Dict[str, Any]:
+    """month(YYYY-MM)에 대화/일기가 있는 날짜 (chat_days, diary_days)."""
+    url = f"{API_BASE}/api/session/{session_id}/calendar"
+    r = requests.get(url, params={"month": month}, timeout=10)
+    r.raise_for_status()
+    return r.json()
+
+
+def get_chat_message_result(session_id: str, message_id: int) -> Dict[str, Any]:
+    """메시지 한 건의 리치 결과(text, data, meta)만 조회."""
+    url = f"{API_BASE}/api/chat/{session_id}/message/{message_id}/result"
+    r = requests.get(url, timeout=10)
     r.raise_for_status()
     return r.json()
 
@@ -59,6 +108,18 @@ def init_profile(session_id: str) -> Dict[str, Any]:
     return r.json()
 
 
+def get_bootstrap(session_id: str, date: str | None = None) -> Dict[str, Any]:
+    """세션 초기화 데이터(프로필, 페르소나, 요약, 일기 상태, 최근 대화)를 한 번에 조회.
+
+    프로필이 없으면 서버에서 생성하므로 init_profile 호출을 대신합니다.
+    """
+    url = f"{API_BASE}/api/session/{session_id}/bootstrap"
+    params = {"target_date": date} if date else None
+    r = requests.get(url, params=params, timeout=10)
+    r.raise_for_status()
+    return r.json()
+
+
 def save_diary(session_id: str, date: str, content: str) -> Dict[str, Any]:
     url = f"{API_BASE}/api/diary"
     payload = {"session_id": session_id, "date": date, "content": content}
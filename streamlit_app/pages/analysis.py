@@ -34,32 +34,13 @@ with st.sidebar:
 # ------------------------------------------------------------------------------
 def load_chats(session_id: str, start: date, end: date):
     """
-    repo 표준이 서로 다를 수 있어 보수적으로 구현:
-    - 최근 메시지 N개를 가져와서 created_at으로 로컬 필터링
-    - role == 'user' 만 분석
+    기간 내 사용자(role == 'user') 채팅만 가져옵니다.
+    - KST 날짜(day) 인덱스 범위 조회 + 경량 튜플 경로(get_rows_by_day_range)
     """
     if not HAVE_REPO:
         return []
-    # 넉넉히 가져와서 필터 (필요시 repo에 기간조회 함수 추가 권장)
-    rows = chat_repo.get_recent_messages(session_id=session_id, limit=2000)
-    out = []
-    for m in rows:
-        # created_at 문자열 → date
-        created = getattr(m, "created_at", None) or getattr(m, "createdAt", None) or getattr(m, "created", None)
-        text = getattr(m, "text", None) or getattr(m, "message", None)
-        role = getattr(m, "role", "user")
-        if not created or not text:
-            continue
-        try:
-            # ISO-8601 or sqlite DATETIME
-            dt = datetime.fromisoformat(str(created).replace("Z", "+00:00"))
-        except Exception:
-            # fallback: treat as naive
-            dt = datetime.strptime(str(created), "%Y-%m-%d %H:%M:%S")
-        d = dt.astimezone(KST).date()
-        if start <= d <= end and role == "user":
-            out.append({"date": d, "text": text})
-    return out
+    rows = chat_repo.get_rows_by_day_range(session_id, start.isoformat(), end.isoformat(), role="user")
+    return [{"date": date.fromisoformat(r.day), "text": r.text} for r in rows if r.day and r.text]
 
 data = load_chats(session_id, start_date, end_date)
 
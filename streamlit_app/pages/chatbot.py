@@ -3,7 +3,7 @@ import streamlit as st
 from typing import Dict, Any
 import json
 from client_api import post_chat
-from client_api import get_chat_history_by_date, init_profile
+from client_api import get_chat_history, init_profile, get_calendar, get_chat_message_result
 from datetime import date as _date
 import base64
 from pathlib import Path
@@ -89,14 +89,22 @@ def main():
         session_id = st.text_input("세션 ID", value="user-123")
         selected_date = st.date_input("날짜", value=_date.today())
         target_date = selected_date.isoformat()
+        # 그달에 대화가 있는 날을 달력 API 한 번으로 표시합니다
+        try:
+            chat_days = get_calendar(session_id, selected_date.strftime("%Y-%m")).get("chat_days", [])
+            st.caption("이번 달 대화가 있는 날: " + (", ".join(d[-2:] for d in chat_days) or "없음"))
+        except Exception:
+            pass
 
-    # 이 세션에 대한 프로필이 존재하는지 확인합니다 (백엔드 초기화 호출)
-    try:
-        if session_id:
+    # 이 세션에 대한 프로필이 존재하는지 세션당 한 번 확인합니다.
+    # 화면은 그날의 대화 페이지로 그리므로 부트스트랩 데이터는 필요 없습니다
+    if session_id and st.session_state.get("profile_ready_session") != session_id:
+        try:
             init_profile(session_id)
-    except Exception:
-        # 초기화 실패는 무시합니다
-        pass
+            st.session_state["profile_ready_session"] = session_id
+        except Exception:
+            # 초기화 실패는 무시합니다
+            pass
 
     # UI 타이틀 영역에 현재 선택된 채팅 날짜를 표시합니다
     try:
@@ -130,31 +138,39 @@ def main():
                         res = {}
                     if res:
                         items.append({
+                            "id": m.get("id"),
                             "role": "assistant",
                             "content": res.get("text", ""),
                             "result": res,
                         })
                     else:
+                        # 페이지는 meta 없이 받고, 리치 결과는 렌더할 때 메시지별로 조회합니다
                         items.append({
+                            "id": m.get("id"),
                             "role": "assistant",
                             "content": m.get("text", ""),
+                            "has_meta": bool(m.get("has_meta")),
                         })
                 else:
                     items.append({
+                        "id": m.get("id"),
                         "role": role,
                         "content": m.get("text", ""),
                     })
         return items
 
     def load_chat_cached(sid: str, d: str, force: bool = False):
+        """그날의 최근 페이지를 불러옵니다. (메시지 목록, 그날 더 오래된 메시지가 있는지)를 반환합니다."""
         key = _chat_key(sid, d)
         if (not force) and key in st.session_state["chat_cache"]:
             # 캐시를 직접 변경하지 않도록 얕은 복사본을 반환합니다
-            return list(st.session_state["chat_cache"][key])
-        resp = get_chat_history_by_date(sid, d)
+            items, has_more = st.session_state["chat_cache"][key]
+            return list(items), has_more
+        resp = get_chat_history(sid, day=d, limit=50)
         items = _build_messages_from_response(resp)
-        st.session_state["chat_cache"][key] = list(items)
-        return items
+        has_more = bool(resp.get("has_more"))
+        st.session_state["chat_cache"][key] = (list(items), has_more)
+        return items, has_more
 
     # 수동 새로고침 버튼 (캐시 우회)
     refresh = st.button("🔄 채팅 새로고침", help="캐시를 무시하고 다시 불러옵니다")
@@ -163,22 +179,53 @@ def main():
     loaded_key = st.session_state.get("loaded_session_date")
     if loaded_key != (session_id, target_date) or refresh:
         try:
-            items = load_chat_cached(session_id, target_date, force=refresh)
+            items, has_more = load_chat_cached(session_id, target_date, force=refresh)
         except Exception:
-            items = []
+            items, has_more = [], False
         st.session_state["messages"] = list(items)
         st.session_state["loaded_session_date"] = (session_id, target_date)
+        st.session_state["older_exhausted"] = not has_more
+
+    # 이 날의 이전 대화 더 보기: 가장 오래된 메시지 id 이전 페이지를 같은 날 안에서만 불러와 앞에 붙입니다
+    loaded_ids = [m["id"] for m in st.session_state["messages"] if m.get("id")]
+    if loaded_ids and not st.session_state.get("older_exhausted"):
+        if st.button(f"⬆️ {target_date} 이전 대화 더 보기"):
+            try:
+                resp = get_chat_history(session_id, before_id=min(loaded_ids), limit=20, day=target_date)
+                older = _build_messages_from_response(resp)
+                st.session_state["messages"] = older + st.session_state["messages"]
+                if not resp.get("has_more"):
+                    st.session_state["older_exhausted"] = True
+            except Exception:
+                st.warning("이전 대화를 불러오지 못했습니다.")
 
     # -- 아바타 로드 (resources 폴더 내 이미지 우선, 없으면 이모지로 대체) --
     assistant_avatar = _load_avatar("assistant.png", "🤖")
     user_avatar = _load_avatar("user.png", "🧑‍🍼")
 
+    # 메시지 id별 리치 결과 캐시 (세션이 바뀌면 비웁니다)
+    if st.session_state.get("result_cache_session") != session_id:
+        st.session_state["result_cache"] = {}
+        st.session_state["result_cache_session"] = session_id
+
+    def load_result(msg: Dict[str, Any]):
+        if msg.get("result") or not msg.get("has_meta") or not msg.get("id"):
+            return msg.get("result")
+        cache = st.session_state["result_cache"]
+        if msg["id"] not in cache:
+            try:
+                cache[msg["id"]] = get_chat_message_result(session_id, msg["id"]).get("result") or None
+            except Exception:
+                cache[msg["id"]] = None
+        return cache[msg["id"]]
+
     # 1) 과거 메시지 먼저 렌더
     for msg in st.session_state["messages"]:
         avatar = assistant_avatar if msg.get("role") == "assistant" else user_avatar
         with st.chat_message(msg["role"], avatar=avatar):
-            if msg["role"] == "assistant" and msg.get("result"):
-                render_assistant(msg["result"])
+            result = load_result(msg) if msg["role"] == "assistant" else None
+            if result:
+                render_assistant(result)
             else:
                 st.markdown(msg["content"])
 
@@ -230,9 +277,10 @@ def main():
                 })
                 # 현재 (session_id, date)에 대한 캐시를 업데이트합니다
                 try:
-                    st.session_state["chat_cache"][
-                        f"{session_id}:{target_date}"
-                    ] = list(st.session_state["messages"])  # shallow copy
+                    st.session_state["chat_cache"][f"{session_id}:{target_date}"] = (
+                        list(st.session_state["messages"]),  # shallow copy
+                        not st.session_state.get("older_exhausted"),
+                    )
                 except Exception:
                     pass
 
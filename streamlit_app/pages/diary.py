@@ -1,7 +1,7 @@
 from __future__ import annotations
 import streamlit as st
 from datetime import date
-from client_api import post_chat, get_diary, save_diary, init_profile
+from client_api import post_chat, get_diary, save_diary, get_bootstrap, get_calendar
 
 st.subheader("📔 아기 일기 작성")
 
@@ -9,6 +9,12 @@ with st.sidebar:
     st.markdown("### 일기 옵션")
     session_id = st.text_input("Session ID", value="user-123")
     selected_date = st.date_input("날짜", value=date.today())
+    # 날짜를 하나씩 조회하지 않고 달력 API로 그달에 일기가 있는 날을 한 번에 보여 줍니다
+    try:
+        diary_days = get_calendar(session_id, selected_date.strftime("%Y-%m")).get("diary_days", [])
+        st.caption("이번 달 일기가 있는 날: " + (", ".join(d[-2:] for d in diary_days) or "없음"))
+    except Exception:
+        pass
 
 st.caption("달력에서 날짜를 선택하면 해당 날짜의 일기를 자동으로 불러옵니다. 필요시 새로고침으로 다시 가져올 수 있습니다.")
 
@@ -24,16 +30,20 @@ elif st.session_state.cache_session != session_id:
     st.session_state.diary_cache = {}
     st.session_state.cache_session = session_id
 
-# 선택한 세션에 대해 프로필이 존재하는지 확인합니다
-try:
-    if session_id:
-        init_profile(session_id)
-except Exception:
-    pass
-
 def _cache_key(sid: str, d: str) -> str:
     return f"{sid}:{d}"
 
+# 세션/날짜가 바뀔 때 부트스트랩을 한 번 호출합니다 (프로필 초기화 + 그날 일기 유무)
+# 일기가 없다고 나오면 get_diary를 호출하지 않고 빈 상태로 캐시해 둡니다
+if session_id and st.session_state.get("bootstrap_key") != _cache_key(session_id, target_date):
+    try:
+        boot = get_bootstrap(session_id, target_date)
+        st.session_state.bootstrap_key = _cache_key(session_id, target_date)
+        if not (boot.get("diary") or {}).get("exists"):
+            st.session_state.diary_cache.setdefault(_cache_key(session_id, target_date), None)
+    except Exception:
+        pass
+
 def load_diary_cached(sid: str, d: str, force: bool = False):
     key = _cache_key(sid, d)
     if not force and key in st.session_state.diary_cache:
@@ -2,7 +2,7 @@
 import json
 from typing import Any
 import streamlit as st
-from streamlit_app.client_api import get_persona, refresh_persona, init_profile
+from streamlit_app.client_api import get_bootstrap, refresh_persona, init_profile
 
 
 st.set_page_config(page_title="Profile")
@@ -20,7 +20,7 @@ st.title("아기 & 산모 프로필")
 session_id = st.sidebar.text_input("Session ID", value="user-123", disabled=True)
 
 try:
-    resp = get_persona(session_id)
+    resp = get_bootstrap(session_id)
 except Exception as e:
     st.error(f"조회 실패: {e}")
     st.stop()
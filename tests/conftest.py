@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.core.config import config  # noqa: E402
+from app.utils.db_utils import ensure_db_initialized  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """테스트마다 새 임시 DB (스키마 적용 완료). 앱 기본 DB 경로도 이 파일로 돌려 둡니다."""
+    path = tmp_path / "app.db"
+    monkeypatch.setattr(config, "DB_PATH", path)
+    ensure_db_initialized(str(path))
+    return str(path)
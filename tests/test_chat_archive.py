@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import chat_archive
+from app.services.chat_repo import KST, ChatLog, ChatRepository
+from app.services.search_repo import SearchRepository
+from app.utils.db_utils import get_connection
+
+SID = "s1"
+
+
+@pytest.fixture
+def repo(db_path):
+    """200일 전 두 달에 걸친 대화 10건(보관 대상)과 오늘 대화 5건이 있는 세션."""
+    r = ChatRepository(db_path, write_behind=False)
+    old = datetime.now(KST) - timedelta(days=200)
+    for i in range(10):
+        at = old + timedelta(days=i * 4, minutes=i)
+        r.save_message(ChatLog(session_id=SID, role="user" if i % 2 == 0 else "assistant", text=f"옛날 이야기 {i}",
+                               created_at=at.isoformat()))
+    for i in range(5):
+        r.save_message(ChatLog(session_id=SID, role="user", text=f"오늘 이야기 {i}",
+                               created_at=(datetime.now(KST) - timedelta(minutes=10 - i)).isoformat()))
+    r.save_message(ChatLog(session_id="other", role="user", text="다른 세션 옛날 이야기",
+                           created_at=old.isoformat()))
+    return r
+
+
+def _compact(repo):
+    result = chat_archive.compact_chat_logs(str(repo.db_path), older_than_days=90)
+    assert result["ok"]
+    return result
+
+
+def test_compaction_moves_old_rows_and_reads_through(repo):
+    before = repo.get_session_messages(SID)
+    _compact(repo)
+
+    conn = get_connection(str(repo.db_path), SID)
+    hot = conn.execute("SELECT COUNT(*) AS n FROM chat_logs WHERE session_id = ?", (SID,)).fetchone()["n"]
+    assert hot == 5
+    assert chat_archive.archive_counts(conn, SID)["count"] == 10
+
+    after = repo.get_session_messages(SID)
+    assert [(m.id, m.text, m.created_at) for m in after] == [(m.id, m.text, m.created_at) for m in before]
+    assert [r.id for r in repo.get_session_rows(SID)] == [m.id for m in before]
+    assert repo.count_messages(SID) == {"count": 15, "first_id": before[0].id, "last_id": before[-1].id}
+
+    old_day = before[3].day
+    assert [m.id for m in repo.get_messages_by_date(SID, old_day)] == [m.id for m in before if m.day == old_day]
+    assert [m.text for m in repo.get_messages_by_ids(SID, [before[2].id, before[12].id])] == ["옛날 이야기 2", "오늘 이야기 2"]
+    assert [m.id for m in repo.get_recent_messages(SID, 7)] == [m.id for m in before[-7:]]
+
+
+@pytest.mark.parametrize("limit", [1, 4, 5, 6, 15, 20])
+def test_keyset_pages_cross_hot_archive_boundary(repo, limit):
+    expected = [m.id for m in repo.get_session_messages(SID)]
+    _compact(repo)
+
+    # 뒤로 넘기기: 최신 페이지부터 next_before_id로
+    seen, before_id = [], None
+    while True:
+        msgs, has_more = repo.get_messages_page(SID, before_id=before_id, limit=limit)
+        assert len(msgs) <= limit
+        seen = [m.id for m in msgs] + seen
+        if not has_more:
+            break
+        before_id = msgs[0].id
+    assert seen == expected
+
+    # 앞으로 넘기기: 가장 오래된 것부터 after_id로
+    seen, after_id = [], 0
+    while True:
+        msgs, has_more = repo.get_messages_page(SID, after_id=after_id, limit=limit)
+        seen += [m.id for m in msgs]
+        if not has_more:
+            break
+        after_id = msgs[-1].id
+    assert seen == expected
+
+
+def test_day_filtered_page_stays_within_archived_day(repo):
+    msgs = repo.get_session_messages(SID)
+    _compact(repo)
+    day = msgs[0].day
+    page, has_more = repo.get_messages_page(SID, limit=50, day=day)
+    assert [m.id for m in page] == [m.id for m in msgs if m.day == day]
+    assert not has_more
+
+
+def test_compacted_chats_stay_searchable(repo):
+    _compact(repo)
+    search = SearchRepository(str(repo.db_path))
+    hits = search.search("옛날 이야기", session_id=SID, types=("chat",), limit=50)["chats"]
+    assert len(hits) == 10
+    assert all(h["archived"] for h in hits)
+    assert all(h["session_id"] == SID for h in hits)
+
+
+def test_delete_session_removes_archive(repo):
+    _compact(repo)
+    repo.delete_session(SID)
+    assert repo.get_session_messages(SID) == []
+    conn = get_connection(str(repo.db_path), SID)
+    assert chat_archive.archive_counts(conn, SID)["count"] == 0
+    assert len(repo.get_session_messages("other")) == 1
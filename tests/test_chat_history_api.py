@@ -0,0 +1,49 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.db_executor import AsyncFacade
+from app.services.chat_repo import ChatLog, ChatRepository
+
+SID = "s1"
+META = {"text": "답", "data": {"kind": "smalltalk"}}
+
+
+@pytest.fixture
+def client(db_path, monkeypatch):
+    from app.api import http
+
+    chats = ChatRepository(db_path, write_behind=False)
+    for i in range(30):
+        meta = json.dumps(META, ensure_ascii=False) if i % 2 else None
+        chats.save_message(ChatLog(session_id=SID, role="assistant" if i % 2 else "user", text=f"메시지 {i}", meta_json=meta))
+    facade = AsyncFacade(chats, reads=("get_session_messages", "get_messages_page", "get_rows_by_day_range"))
+    monkeypatch.setattr(http, "get_async_chat_repo", lambda: facade)
+    app = FastAPI()
+    app.include_router(http.router, prefix="/api")
+    return TestClient(app)
+
+
+def test_history_without_params_returns_full_session_with_meta(client):
+    body = client.get(f"/api/chat/{SID}/history").json()
+    assert set(body) == {"ok", "messages"}
+    assert [m["text"] for m in body["messages"]] == [f"메시지 {i}" for i in range(30)]
+    assert json.loads(body["messages"][1]["meta_json"]) == META
+
+
+def test_history_paging_is_opt_in(client):
+    body = client.get(f"/api/chat/{SID}/history", params={"limit": 10, "include_meta": "false"}).json()
+    assert [m["text"] for m in body["messages"]] == [f"메시지 {i}" for i in range(20, 30)]
+    assert body["has_more"] and body["next_before_id"] == body["messages"][0]["id"]
+    assert all(m["meta_json"] is None for m in body["messages"])
+    assert body["messages"][1]["has_meta"]
+
+
+def test_history_by_date_keeps_meta_by_default(client):
+    day = client.get(f"/api/chat/{SID}/history").json()["messages"][0]["created_at"][:10]
+    rows = client.get(f"/api/chat/{SID}/history/{day}").json()["messages"]
+    assert len(rows) == 30 and json.loads(rows[1]["meta_json"]) == META
+    rows = client.get(f"/api/chat/{SID}/history/{day}", params={"include_meta": "false"}).json()["messages"]
+    assert rows[1]["meta_json"] is None and rows[1]["has_meta"]
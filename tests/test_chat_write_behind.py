@@ -0,0 +1,67 @@
+import pytest
+
+from app.core.config import config
+from app.services.chat_repo import ChatLog, ChatRepository
+from app.utils.db_utils import get_connection
+
+
+@pytest.fixture
+def repo(db_path, monkeypatch):
+    # writer 스레드가 테스트 중에 스스로 flush하지 않도록 주기와 배치를 크게 잡습니다
+    monkeypatch.setattr(config, "CHAT_FLUSH_INTERVAL_MS", 60_000)
+    monkeypatch.setattr(config, "CHAT_FLUSH_BATCH", 10_000)
+    r = ChatRepository(db_path, write_behind=True)
+    yield r
+    r.close()
+
+
+def _stored(db_path, session_id):
+    conn = get_connection(db_path, session_id)
+    return conn.execute("SELECT COUNT(*) AS n FROM chat_logs WHERE session_id = ?", (session_id,)).fetchone()["n"]
+
+
+def _say(repo, sid, n, start=0):
+    for i in range(start, start + n):
+        repo.save_message(ChatLog(session_id=sid, role="user", text=f"m{i}", created_at=f"2026-10-18T10:00:{i:02d}+09:00"))
+
+
+def test_pending_messages_are_visible_before_flush(repo, db_path):
+    _say(repo, "s1", 3)
+    assert _stored(db_path, "s1") == 0
+    assert repo.pending_count() == 3
+
+    assert [m.text for m in repo.get_recent_messages("s1", 10)] == ["m0", "m1", "m2"]
+    assert [m.text for m in repo.get_messages_by_date("s1", "2026-10-18")] == ["m0", "m1", "m2"]
+    assert [r.text for r in repo.get_session_rows("s1")] == ["m0", "m1", "m2"]
+    assert all(m.id is None for m in repo.get_session_messages("s1"))
+    # 다른 세션에는 섞이지 않습니다
+    assert repo.get_session_messages("s2") == []
+
+
+def test_flush_writes_once_and_reads_do_not_duplicate(repo, db_path):
+    flushed = []
+    repo.add_flush_listener(flushed.append)
+    _say(repo, "s1", 2)
+    repo.save_message(ChatLog(session_id="s2", role="user", text="other", created_at="2026-10-18T11:00:00+09:00"))
+
+    assert repo.flush() == 3
+    assert repo.pending_count() == 0
+    assert (_stored(db_path, "s1"), _stored(db_path, "s2")) == (2, 1)
+    assert sorted(sum(flushed, [])) == ["s1", "s2"]
+
+    # 기록 후에는 id가 채워지고, DB 행과 overlay가 겹쳐 두 번 보이지 않습니다
+    _say(repo, "s1", 1, start=2)
+    msgs = repo.get_session_messages("s1")
+    assert [m.text for m in msgs] == ["m0", "m1", "m2"]
+    assert [m.id is None for m in msgs] == [False, False, True]
+
+
+def test_close_flushes_and_later_saves_are_synchronous(db_path, monkeypatch):
+    monkeypatch.setattr(config, "CHAT_FLUSH_INTERVAL_MS", 60_000)
+    repo = ChatRepository(db_path, write_behind=True)
+    _say(repo, "s1", 2)
+    repo.close()
+    assert _stored(db_path, "s1") == 2
+
+    _say(repo, "s1", 1, start=2)
+    assert _stored(db_path, "s1") == 3
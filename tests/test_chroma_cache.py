@@ -0,0 +1,72 @@
+import sys
+import types
+
+import pytest
+
+from app.adapters.rag.chroma_cache import VERSION_FILE, ChromaHandleCache
+
+
+class FakeSharedSystemClient:
+    _identifier_to_system: dict = {}
+
+
+@pytest.fixture
+def fake_chromadb(monkeypatch):
+    FakeSharedSystemClient._identifier_to_system = {}
+    for name in ("chromadb", "chromadb.api"):
+        monkeypatch.setitem(sys.modules, name, types.ModuleType(name))
+    mod = types.ModuleType("chromadb.api.shared_system_client")
+    mod.SharedSystemClient = FakeSharedSystemClient
+    monkeypatch.setitem(sys.modules, "chromadb.api.shared_system_client", mod)
+    return FakeSharedSystemClient._identifier_to_system
+
+
+def _bump(persist_dir, version):
+    (persist_dir / VERSION_FILE).write_text(version, encoding="utf-8")
+
+
+def test_version_change_swaps_handles_without_touching_old(tmp_path, fake_chromadb):
+    _bump(tmp_path, "1")
+    cache = ChromaHandleCache(str(tmp_path), check_interval_s=0)
+    built = []
+
+    def factory():
+        built.append(object())
+        return built[-1]
+
+    old = cache.get(("collection", "docs", "m"), factory)
+    assert cache.get(("collection", "docs", "m"), factory) is old
+
+    other_dir = str(tmp_path / "other")
+    fake_chromadb[str(tmp_path)] = "old-system"
+    fake_chromadb[other_dir] = "other-system"
+    _bump(tmp_path, "2")
+
+    new = cache.get(("collection", "docs", "m"), factory)
+    assert new is not old
+    assert len(built) == 2 and cache.stats["refreshes"] == 1
+    # 이 경로의 System만 떼어 내고, 다른 경로의 System은 그대로 둡니다
+    assert str(tmp_path) not in fake_chromadb
+    assert fake_chromadb[other_dir] == "other-system"
+
+
+def test_in_flight_handle_survives_refresh(tmp_path, fake_chromadb):
+    _bump(tmp_path, "1")
+    cache = ChromaHandleCache(str(tmp_path), check_interval_s=0)
+    old_table = cache._handles
+    held = cache.get("client", lambda: ["old"])
+    _bump(tmp_path, "2")
+    cache.get("client", lambda: ["new"])
+    assert held == ["old"]
+    assert old_table == {"client": ["old"]}
+
+
+def test_embedding_key_is_stable_model_name():
+    pytest.importorskip("chromadb")
+    from app.adapters.rag.chroma_adapter import _embedding_name
+
+    class Fn:
+        model_name = "text-embedding-3-small"
+
+    assert _embedding_name(Fn()) == _embedding_name(Fn()) == "text-embedding-3-small"
+    assert _embedding_name(None) is None
@@ -0,0 +1,46 @@
+import threading
+
+from app.core.db_executor import call_write, db_executor_stats
+from app.services.profile_repo import ProfileRepository
+from app.utils.db_utils import close_all_connections, connection_stats, get_connection
+
+
+def test_call_write_runs_on_single_writer_thread(db_path):
+    names = []
+
+    def write(tag):
+        names.append(threading.current_thread().name)
+        # writer 안에서 다시 불러도 교착 없이 바로 실행됩니다
+        return call_write(lambda: tag)
+
+    before = db_executor_stats()["write"]["completed"]
+    assert [call_write(write, i) for i in range(3)] == [0, 1, 2]
+    assert len(set(names)) == 1 and names[0].startswith("db-write")
+    assert db_executor_stats()["write"]["completed"] - before == 3
+
+
+def test_call_write_with_repository(db_path):
+    repo = ProfileRepository(db_path)
+    assert call_write(repo.ensure_profiles, "s1") == {"baby": True, "mother": True}
+    assert repo.get_baby("s1") is not None
+
+
+def test_close_all_connections_keeps_live_threads(db_path):
+    started, release = threading.Event(), threading.Event()
+    seen = {}
+
+    def worker():
+        conn = get_connection(db_path)
+        started.set()
+        release.wait(5)
+        seen["value"] = conn.execute("SELECT 1 AS v").fetchone()["v"]
+
+    t = threading.Thread(target=worker)
+    t.start()
+    started.wait(5)
+    get_connection(db_path)
+    close_all_connections()
+    assert connection_stats()["open"] >= 1
+    release.set()
+    t.join(5)
+    assert seen["value"] == 1
@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+
+from app.services.profile_repo import BabyProfile, MotherProfile, ProfileRepository
+from app.services.snapshot_repo import SnapshotRepository
+from app.utils.db_utils import _upsert_sql, bulk_upsert_models, fetch_one, get_connection
+
+N = 3000
+
+
+def test_bulk_upsert_inserts_then_updates(db_path):
+    conn = get_connection(db_path)
+    assert bulk_upsert_models(conn, "baby_profile", [BabyProfile(session_id=f"s{i}", week=10) for i in range(N)]) == N
+    assert conn.execute("SELECT COUNT(*) AS n FROM baby_profile").fetchone()["n"] == N
+
+    # 갱신 패스: 일부만 이름을 줘서 컬럼 구성이 다른 두 그룹이 되게 합니다
+    _upsert_sql.cache_clear()
+    updates = [BabyProfile(session_id=f"s{i}", week=20, name=f"b{i}" if i % 2 else None) for i in range(N)]
+    assert bulk_upsert_models(conn, "baby_profile", updates) == N
+    assert _upsert_sql.cache_info().currsize == 2
+
+    row = fetch_one(conn, "baby_profile", "session_id", "s1")
+    assert (row["week"], row["name"]) == (20, "b1")
+    row = fetch_one(conn, "baby_profile", "session_id", "s2")
+    assert (row["week"], row["name"]) == (20, None)
+    assert conn.execute("SELECT COUNT(*) AS n FROM baby_profile").fetchone()["n"] == N
+
+
+def test_bulk_upsert_rolls_back_on_failure(db_path):
+    conn = get_connection(db_path)
+    bad = [MotherProfile(session_id="ok1"), MotherProfile(session_id="ok2")]
+
+    def fail(conn, models):
+        raise sqlite3.IntegrityError("boom")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        bulk_upsert_models(conn, "mother_profile", bad, on_written=fail)
+    assert conn.execute("SELECT COUNT(*) AS n FROM mother_profile").fetchone()["n"] == 0
+
+
+def test_profile_bulk_upsert_touches_snapshot(db_path):
+    repo = ProfileRepository(db_path)
+    snapshots = SnapshotRepository(db_path)
+    repo.ensure_profiles("s1")
+    assert snapshots.bootstrap("s1", "2026-01-01")["baby"]["week"] is None
+
+    assert repo.bulk_upsert([BabyProfile(session_id="s1", week=30), MotherProfile(session_id="s1", age=33)]) == 2
+    data = snapshots.bootstrap("s1", "2026-01-01")
+    assert data["snapshot"] == "hit"
+    assert data["baby"]["week"] == 30
+    assert data["mother"]["age"] == 33
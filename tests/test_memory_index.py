@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from app.core import background
+from app.services.chat_repo import ChatLog, ChatRepository
+from app.services.memory_repo import ChatMemoryIndex
+
+VOCAB = ["입덧", "태동", "수면", "병원"]
+
+
+def _vec(text):
+    v = np.array([text.count(w) for w in VOCAB], dtype=np.float32) + 0.01
+    return v / np.linalg.norm(v)
+
+
+@pytest.fixture
+def index(db_path, monkeypatch):
+    """임베딩 API 대신 단어 수로 벡터를 만들고, 백그라운드 작업은 예약만 기록합니다."""
+    idx = ChatMemoryIndex(db_path)
+    idx.embedded = []
+    idx.submitted = []
+
+    def fake_embed(texts):
+        idx.embedded.extend(texts)
+        return np.vstack([_vec(t) for t in texts])
+
+    monkeypatch.setattr(idx, "_embed", fake_embed)
+    monkeypatch.setattr(background, "submit_background", lambda fn, *a: idx.submitted.append((fn, a)))
+    chats = ChatRepository(db_path, write_behind=False)
+    for text in ["입덧이 심해요", "태동이 느껴져요", "잠을 못 자요 수면", "병원 예약했어요"]:
+        chats.save_message(ChatLog(session_id="s1", role="user", text=text))
+    idx.index_pending("s1")
+    idx.embedded.clear()
+    return idx
+
+
+def test_search_does_not_embed_on_request_path(index):
+    hits = index.search("s1", "입덧 때문에 힘들어요", top_k=2)
+    assert len(hits) == 2
+    assert index.embedded == []
+    # 검색어 임베딩은 백그라운드로만 예약합니다
+    assert [fn.__name__ for fn, _ in index.submitted] == ["_prefetch"]
+
+
+def test_prefetched_query_is_used_and_reused_for_indexing(index):
+    index.prefetch_query("입덧 때문에 힘들어요")
+    fn, args = index.submitted.pop()
+    fn(*args)
+    assert index.embedded == ["입덧 때문에 힘들어요"]
+
+    hits = index.search("s1", "입덧 때문에 힘들어요", top_k=1)
+    text = ChatRepository(str(index.db_path), write_behind=False).get_messages_by_ids("s1", [hits[0][0]])[0].text
+    assert text == "입덧이 심해요"
+    assert index.submitted == []
+
+    # 같은 문장이 대화로 저장되면 인덱싱은 미리 계산한 벡터를 씁니다
+    ChatRepository(str(index.db_path), write_behind=False).save_message(
+        ChatLog(session_id="s1", role="user", text="입덧 때문에 힘들어요"))
+    assert index.index_pending("s1") == 1
+    assert index.embedded == ["입덧 때문에 힘들어요"]
@@ -0,0 +1,72 @@
+import json
+import zlib
+
+import pytest
+
+from app.services.chat_repo import ChatLog, ChatRepository, rows_to_dicts
+from app.utils import meta_codec
+from app.utils.meta_codec import decode_meta, encode_meta, is_encoded, meta_to_json, to_text
+
+TEXT = "임신 중 타이레놀은 괜찮아요"
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {"text": TEXT, "data": {"raw": TEXT, "list": [TEXT, "x", {"deep": TEXT}]}, "meta": {"type": "expert_answer"}},
+        TEXT,  # 값 전체가 행 text
+        [TEXT, TEXT],
+        {"a": "\x7ft", "b": "", "r": [["a"]], "v": TEXT},  # 이전 자리표시자와 m2 봉투 키를 값으로 가진 경우
+        {"a": 1, "b": None, "c": [1.5, True]},
+        {},
+    ],
+)
+@pytest.mark.parametrize("min_compress", [0, 1])
+def test_round_trip(obj, min_compress):
+    raw = json.dumps(obj, ensure_ascii=False)
+    stored = encode_meta(raw, TEXT, min_compress=min_compress)
+    assert is_encoded(stored)
+    assert decode_meta(stored, TEXT) == obj
+    assert json.loads(meta_to_json(stored, TEXT)) == obj
+    assert decode_meta(to_text(stored), TEXT) == obj
+
+
+def test_sentinel_like_values_do_not_collide():
+    stored = encode_meta('{"a":"\x7ft"}', "hello")
+    assert decode_meta(stored, "hello") == {"a": "\x7ft"}
+
+
+def test_text_refs_are_deduplicated():
+    long_text = "가" * 500
+    stored = encode_meta(json.dumps({"text": long_text, "data": {"raw": long_text}}), long_text, min_compress=0)
+    assert long_text not in stored
+    assert decode_meta(stored, long_text) == {"text": long_text, "data": {"raw": long_text}}
+
+
+def test_legacy_and_passthrough_values():
+    assert decode_meta('m1:{"a":"\x7ft"}', "hi") == {"a": "hi"}
+    assert decode_meta(b"m1z" + zlib.compress(b'{"a":"\x7ft"}'), "hi") == {"a": "hi"}
+    assert to_text(b"m1z" + zlib.compress(b"{}")) == "m1:{}"
+    # 평문(레거시) JSON은 그대로, JSON이 아니면 인코딩하지 않습니다
+    assert encode_meta("not json", TEXT) == "not json"
+    assert meta_to_json('{"x": 1}', TEXT) == '{"x": 1}'
+    assert encode_meta(None, TEXT) is None
+    # 이미 인코딩된 값은 다시 인코딩하지 않습니다
+    stored = encode_meta('{"x": 1}', TEXT)
+    assert encode_meta(stored, TEXT) == stored
+
+
+def test_repository_stores_encoded_and_reads_plain(db_path, monkeypatch):
+    monkeypatch.setattr(meta_codec.config, "CHAT_META_COMPRESS_MIN_BYTES", 64)
+    repo = ChatRepository(db_path, write_behind=False)
+    result = {"text": TEXT, "data": {"raw": TEXT * 20}, "meta": {"type": "expert_answer"}}
+    repo.save_message(ChatLog(session_id="s1", role="assistant", text=TEXT, meta_json=json.dumps(result, ensure_ascii=False)))
+
+    raw = repo.get_session_rows("s1")[0].meta_json
+    assert is_encoded(raw)
+    msg = repo.get_session_messages("s1")[0]
+    assert msg.meta_json is None and msg.has_meta()
+    assert json.loads(msg.meta_text()) == result
+    assert msg.decoded_meta() == result
+    (row,) = rows_to_dicts(repo.get_session_rows("s1"), include_meta=True)
+    assert json.loads(row["meta_json"]) == result and row["has_meta"]
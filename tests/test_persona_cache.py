@@ -0,0 +1,74 @@
+import pytest
+
+from app.core.config import config
+from app.services import persona_repo
+from app.services.persona_repo import (
+    get_latest_child_persona,
+    insert_child_persona,
+    invalidate_persona_cache,
+    observe_child_persona,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(db_path, monkeypatch):
+    monkeypatch.setattr(persona_repo, "DB_PATH", db_path)
+    invalidate_persona_cache()
+    yield
+    invalidate_persona_cache()
+
+
+def _write_behind_cache(session_id, version):
+    """다른 워커가 쓴 것처럼 캐시를 거치지 않고 DB에 직접 새 버전을 넣습니다."""
+    with persona_repo._conn(session_id) as conn:
+        conn.execute(
+            "INSERT INTO child_persona_versions (session_id, version, persona_json) VALUES (?, ?, '{}')",
+            (session_id, version),
+        )
+        conn.commit()
+
+
+def _count_queries(monkeypatch):
+    calls = []
+    real = persona_repo._conn
+
+    def counting(session_id, *a, **kw):
+        calls.append(session_id)
+        return real(session_id, *a, **kw)
+
+    monkeypatch.setattr(persona_repo, "_conn", counting)
+    return calls
+
+
+def test_cached_read_does_not_touch_db(monkeypatch):
+    insert_child_persona("s1", '{"a": 1}')
+    calls = _count_queries(monkeypatch)
+    for _ in range(5):
+        assert get_latest_child_persona("s1")["version"] == 1
+    assert calls == []
+
+
+def test_revalidates_after_interval(monkeypatch):
+    insert_child_persona("s1", "{}")
+    _write_behind_cache("s1", 5)
+    assert get_latest_child_persona("s1")["version"] == 1
+    assert get_latest_child_persona("s1", validate=True)["version"] == 5
+
+    _write_behind_cache("s1", 6)
+    monkeypatch.setattr(config, "PERSONA_CACHE_REVALIDATE_S", 0)
+    assert get_latest_child_persona("s1")["version"] == 6
+
+
+def test_negative_entry_is_replaced_by_insert():
+    assert get_latest_child_persona("s1") is None
+    insert_child_persona("s1", "{}")
+    assert get_latest_child_persona("s1")["version"] == 1
+
+
+def test_observe_only_moves_forward():
+    insert_child_persona("s1", "{}")
+    insert_child_persona("s1", "{}")
+    observe_child_persona("s1", {"session_id": "s1", "version": 1, "persona_json": "{}"})
+    assert get_latest_child_persona("s1")["version"] == 2
+    observe_child_persona("s1", None)
+    assert get_latest_child_persona("s1")["version"] == 2
@@ -0,0 +1,50 @@
+import pytest
+
+from app.nodes import persona_updater_node as node
+from app.nodes.persona_updater_node import prefilter_profile
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("저는 32살이에요", {"mother": {"age": 32}}),
+        ("제 나이는 29세입니다.", {"mother": {"age": 29}}),
+        ("우리 아기는 아들이래요!", {"baby": {"gender": "M"}}),
+        ("제 아기 성별은 딸이에요", {"baby": {"gender": "F"}}),
+        ("오늘 병원 갔는데 임신 20주래요", {"baby": {"week": 20}}),
+    ],
+)
+def test_confident_local_extraction(text, expected):
+    assert prefilter_profile(text) == (expected, False)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "나는 20살 때 처음 서울 왔어요",  # 과거 시점의 나이
+        "언니는 30살이에요",  # 다른 사람의 나이
+        "언니네 아기가 아들이래요",  # 다른 사람의 아기
+        "친구는 딸이래요",
+        "성별은 아들이래요",  # 누구의 아기인지 없음
+    ],
+)
+def test_unanchored_facts_are_escalated(text):
+    local, ambiguous = prefilter_profile(text)
+    assert ambiguous is True
+    assert "age" not in local.get("mother", {})
+    assert "gender" not in local.get("baby", {})
+
+
+def test_small_talk_is_skipped():
+    assert prefilter_profile("오늘 산책했어요") == ({}, False)
+
+
+def test_llm_values_win_over_local_on_escalation(monkeypatch):
+    # 로컬에서 주차를 확정해도 문장이 애매하면 LLM 값이 우선이고, 비어 있는 필드만 로컬 값으로 채웁니다
+    monkeypatch.setattr(node, "_llm_extract_candidates", lambda text: {"baby": {"week": 21}})
+    cands = node._extract_candidates("임신 20주차인데 언니네 아기가 아들이래요")
+    assert cands == {"baby": {"week": 21}}
+
+    monkeypatch.setattr(node, "_llm_extract_candidates", lambda text: {})
+    cands = node._extract_candidates("임신 20주차인데 언니네 아기가 아들이래요")
+    assert cands == {"baby": {"week": 20}}
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import config
+from app.services import persona_repo, retention
+from app.services.chat_repo import KST, ChatLog, ChatRepository
+from app.services.diary_repo import DiaryEntry, DiaryRepository
+from app.utils.db_utils import get_connection
+
+SID = "s1"
+
+
+@pytest.fixture
+def seeded(db_path, monkeypatch):
+    """100일 전 이틀(하루만 일기 있음)과 오늘의 대화, 페르소나 5개 버전."""
+    monkeypatch.setattr(persona_repo, "DB_PATH", db_path)
+    monkeypatch.setattr(config, "RETENTION_CHAT_DAYS", 30)
+    monkeypatch.setattr(config, "RETENTION_PERSONA_VERSIONS_KEEP", 2)
+    monkeypatch.setattr(config, "RETENTION_BATCH_SIZE", 2)
+    monkeypatch.setattr(config, "RETENTION_BATCH_SLEEP_MS", 0)
+    persona_repo.invalidate_persona_cache()
+
+    chats = ChatRepository(db_path, write_behind=False)
+    old = datetime.now(KST) - timedelta(days=100)
+    days = {}
+    for offset, label in ((0, "diary"), (1, "open")):
+        at = old + timedelta(days=offset)
+        days[label] = at.date().isoformat()
+        for i in range(3):
+            chats.save_message(ChatLog(session_id=SID, role="user", text=f"{label} {i}",
+                                       created_at=(at + timedelta(minutes=i)).isoformat()))
+    chats.save_message(ChatLog(session_id=SID, role="user", text="today"))
+    DiaryRepository(db_path).save_diary(DiaryEntry(session_id=SID, date=days["diary"], content="일기"))
+    for v in range(5):
+        persona_repo.insert_child_persona(SID, f'{{"v": {v}}}')
+    yield chats
+    persona_repo.invalidate_persona_cache()
+
+
+def _texts(chats):
+    return [m.text for m in chats.get_session_messages(SID)]
+
+
+def test_dry_run_counts_without_deleting(seeded, db_path):
+    result = retention.enforce_retention(db_path, dry_run=True)
+    shard = result["shards"][0]
+    assert shard["chat_logs"]["chat_logs"] == 3
+    assert shard["child_persona_versions"]["rows"] == 3
+    assert len(_texts(seeded)) == 7
+
+
+def test_prunes_only_covered_old_days_and_old_versions(seeded, db_path):
+    result = retention.enforce_retention(db_path, vacuum=False)
+    assert result["ok"]
+    # 일기가 있는 옛날 대화만 지우고, 정리되지 않은 날과 오늘 대화는 남깁니다
+    assert _texts(seeded) == ["open 0", "open 1", "open 2", "today"]
+
+    versions = [v["version"] for v in persona_repo.list_child_persona_versions(SID)]
+    assert versions == [5, 4]
+    assert persona_repo.get_latest_child_persona(SID)["version"] == 5
+
+    conn = get_connection(db_path, SID)
+    assert conn.execute("SELECT COUNT(*) AS n FROM chat_logs WHERE text LIKE 'diary%'").fetchone()["n"] == 0
+    # 다시 돌려도 더 지울 것이 없습니다
+    again = retention.enforce_retention(db_path, vacuum=False)["shards"][0]
+    assert again["chat_logs"]["chat_logs"] == 0 and again["child_persona_versions"]["rows"] == 0
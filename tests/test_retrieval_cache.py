@@ -0,0 +1,35 @@
+from app.adapters.rag.retrieval_cache import RetrievalCache, normalize_query
+
+
+def test_normalize_folds_case_spacing_and_punctuation_only():
+    assert normalize_query("임신 중  타이레놀 먹어도 돼?") == normalize_query("임신중 타이레놀 먹어도 돼")
+    assert normalize_query("Tylenol OK?") == normalize_query("tylenol ok")
+    assert normalize_query("ＡＢＣ") == "abc"
+    # 조사는 뜻을 바꾸므로 남깁니다
+    assert normalize_query("타이레놀만") != normalize_query("타이레놀도")
+    assert normalize_query("요가") == "요가"
+
+
+def test_search_caches_results_and_embeddings():
+    cache = RetrievalCache()
+    calls = {"embed": 0, "search": 0}
+
+    def embed(q):
+        calls["embed"] += 1
+        return [1.0, 0.0]
+
+    def search(emb, k):
+        calls["search"] += 1
+        return [("doc-1", 0.9)][:k]
+
+    kw = dict(embed_model="m", embed_fn=embed, search_fn=search)
+    assert cache.search("c", "타이레놀만 먹어도 돼?", 5, version="v1", **kw) == [("doc-1", 0.9)]
+    cache.search("c", "타이레놀만 먹어도 돼", 5, version="v1", **kw)
+    assert calls == {"embed": 1, "search": 1}
+
+    cache.search("c", "타이레놀도 먹어도 돼?", 5, version="v1", **kw)
+    assert calls == {"embed": 2, "search": 2}
+
+    # 인덱스 버전이 바뀌면 다시 검색하지만 임베딩은 재사용합니다
+    cache.search("c", "타이레놀만 먹어도 돼?", 5, version="v2", **kw)
+    assert calls == {"embed": 2, "search": 3}
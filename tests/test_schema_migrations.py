@@ -0,0 +1,162 @@
+import json
+import sqlite3
+
+import pytest
+
+from app.utils import schema
+from app.utils.db_utils import get_connection
+from app.utils.meta_codec import decode_meta, is_encoded
+from app.utils.schema import SCHEMA_MIGRATIONS, SCHEMA_VERSION, ensure_schema, reset_schema_registry, step_checksum
+
+# 기준 버전(스키마 버전 관리 도입 전)이 만들던 DB: 폴백 스키마 + 이름만 있는 migrations 기록
+BASELINE_DDL = """
+CREATE TABLE chat_logs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id TEXT NOT NULL,
+  role TEXT NOT NULL,
+  text TEXT NOT NULL,
+  meta_json TEXT,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE diaries (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id TEXT NOT NULL,
+  date TEXT NOT NULL,
+  title TEXT,
+  content TEXT NOT NULL,
+  tags_json TEXT,
+  week INTEGER,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE (session_id, date)
+);
+CREATE TABLE migrations (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT NOT NULL UNIQUE,
+  applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+RESULT = {"text": "아기가 발로 찼어요", "meta": {"type": "chat"}}
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    path = tmp_path / "app.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_DDL)
+    conn.executemany(
+        "INSERT INTO chat_logs (session_id, role, text, meta_json, created_at) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("s1", "user", "오늘 태동이 느껴졌어요", None, "2026-10-17 14:59:00"),  # UTC, KST로는 17일 23:59
+            ("s1", "assistant", RESULT["text"], json.dumps(RESULT, ensure_ascii=False), "2026-10-17 15:01:00"),
+            ("s2", "user", "안녕", None, "2026-10-18T09:00:00+09:00"),
+        ],
+    )
+    conn.execute("INSERT INTO diaries (session_id, date, content) VALUES ('s1', '2026-10-17', '태동 일기')")
+    conn.commit()
+    conn.close()
+    reset_schema_registry(str(path))
+    yield str(path)
+    reset_schema_registry(str(path))
+
+
+def _fingerprint(db_path):
+    conn = get_connection(db_path)
+    objects = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name"
+    ).fetchall()
+    counts = {
+        o["name"]: conn.execute(f'SELECT COUNT(*) AS n FROM "{o["name"]}"').fetchone()["n"]
+        for o in objects
+        if o["type"] == "table" and "_fts_" not in o["name"]
+    }
+    chats = conn.execute("SELECT * FROM chat_logs ORDER BY id").fetchall()
+    activity = conn.execute("SELECT * FROM daily_activity ORDER BY session_id, day").fetchall()
+    return objects, counts, chats, activity
+
+
+def test_baseline_db_upgrades_to_latest(baseline_db):
+    assert ensure_schema(baseline_db) == SCHEMA_VERSION
+    conn = get_connection(baseline_db)
+    assert conn.execute("PRAGMA user_version").fetchone()["user_version"] == SCHEMA_VERSION
+
+    chats = conn.execute("SELECT * FROM chat_logs ORDER BY id").fetchall()
+    assert [c["day"] for c in chats] == ["2026-10-17", "2026-10-18", "2026-10-18"]
+    assert all(c["created_epoch"] for c in chats)
+    assert is_encoded(chats[1]["meta_json"])
+    assert decode_meta(chats[1]["meta_json"], chats[1]["text"]) == RESULT
+
+    ledger = dict(
+        (r["name"], r["checksum"]) for r in conn.execute("SELECT name, checksum FROM migrations").fetchall()
+    )
+    for version, name, steps in SCHEMA_MIGRATIONS:
+        assert ledger[schema._ledger_name(version, name)] == step_checksum(steps)
+
+    days = {(r["session_id"], r["day"]): r for r in conn.execute("SELECT * FROM daily_activity").fetchall()}
+    assert days[("s1", "2026-10-17")]["user_msgs"] == 1
+    assert days[("s1", "2026-10-18")]["assistant_msgs"] == 1
+
+
+def test_daily_activity_last_at_uses_epoch_across_formats(baseline_db):
+    """UTC 기본값(' ')과 +09:00('T') 형식이 섞여도 마지막 시각은 실제로 가장 늦은 행입니다."""
+    conn = sqlite3.connect(baseline_db)
+    conn.executemany(
+        "INSERT INTO chat_logs (session_id, role, text, created_at) VALUES ('s3', 'user', ?, ?)",
+        [("늦은 것", "2026-10-17 15:30:00"), ("이른 것", "2026-10-18T00:00:30+09:00")],
+    )
+    conn.commit()
+    conn.close()
+    ensure_schema(baseline_db)
+    row = get_connection(baseline_db).execute(
+        "SELECT last_at, user_msgs FROM daily_activity WHERE session_id = 's3' AND day = '2026-10-18'"
+    ).fetchone()
+    assert row == {"last_at": "2026-10-17 15:30:00", "user_msgs": 2}
+
+
+def test_ensure_schema_is_a_noop_on_latest_db(baseline_db):
+    ensure_schema(baseline_db)
+    before = _fingerprint(baseline_db)
+    reset_schema_registry(baseline_db)
+    assert ensure_schema(baseline_db) == SCHEMA_VERSION
+    assert _fingerprint(baseline_db) == before
+
+
+def test_every_step_can_be_rerun(baseline_db, caplog):
+    """user_version을 되돌려 모든 단계를 다시 실행해도 스키마와 데이터가 그대로여야 합니다."""
+    ensure_schema(baseline_db)
+    before = _fingerprint(baseline_db)
+
+    conn = get_connection(baseline_db)
+    conn.execute("PRAGMA user_version = 0")
+    reset_schema_registry(baseline_db)
+    assert ensure_schema(baseline_db) == SCHEMA_VERSION
+    assert _fingerprint(baseline_db) == before
+    assert "변경되었습니다" not in caplog.text
+
+
+def test_partial_upgrade_resumes(baseline_db):
+    """중간 버전에서 멈춘 DB도 남은 버전만 적용해 같은 결과가 됩니다."""
+    conn = get_connection(baseline_db)
+    middle = SCHEMA_MIGRATIONS[len(SCHEMA_MIGRATIONS) // 2][0]
+    for version, _name, steps in SCHEMA_MIGRATIONS:
+        if version > middle:
+            break
+        for step in steps:
+            step(conn) if callable(step) else schema.execute_script(conn, step)
+    conn.execute(f"PRAGMA user_version = {middle}")
+    conn.commit()
+
+    assert ensure_schema(baseline_db) == SCHEMA_VERSION
+    chats = conn.execute("SELECT day FROM chat_logs ORDER BY id").fetchall()
+    assert [c["day"] for c in chats] == ["2026-10-17", "2026-10-18", "2026-10-18"]
+
+
+def test_changed_step_is_reported(baseline_db, caplog):
+    ensure_schema(baseline_db)
+    conn = get_connection(baseline_db)
+    key = schema._ledger_name(*SCHEMA_MIGRATIONS[0][:2])
+    conn.execute("UPDATE migrations SET checksum = 'stale' WHERE name = ?", (key,))
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION - 1}")
+    conn.commit()
+    reset_schema_registry(baseline_db)
+    ensure_schema(baseline_db)
+    assert key in caplog.text
@@ -0,0 +1,35 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services.chat_repo import ChatLog, ChatRepository
+from app.services.search_repo import SearchRepository
+
+
+@pytest.fixture
+def client(db_path, monkeypatch):
+    from app.api import http
+
+    chats = ChatRepository(db_path, write_behind=False)
+    chats.save_message(ChatLog(session_id="mine", role="user", text="입덧이 심해요"))
+    chats.save_message(ChatLog(session_id="theirs", role="user", text="입덧 때문에 힘들어요"))
+    monkeypatch.setattr(http, "get_chat_repo", lambda: chats)
+    monkeypatch.setattr(http, "get_search_repo", lambda: SearchRepository(db_path))
+    app = FastAPI()
+    app.include_router(http.router, prefix="/api")
+    return TestClient(app)
+
+
+def test_search_requires_session_id(client):
+    assert client.get("/api/search", params={"q": "입덧"}).status_code == 422
+    assert client.get("/api/search", params={"q": "입덧", "session_id": " "}).status_code == 422
+
+
+def test_search_stays_in_session(client):
+    body = client.get("/api/search", params={"q": "입덧", "session_id": "mine"}).json()
+    assert {r["session_id"] for r in body["chats"]} == {"mine"}
+
+
+def test_admin_search_can_span_sessions(client):
+    body = client.get("/api/admin/search", params={"q": "입덧"}).json()
+    assert {r["session_id"] for r in body["chats"]} == {"mine", "theirs"}
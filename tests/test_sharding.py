@@ -0,0 +1,93 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from app.core.config import config
+from app.services.chat_repo import ChatLog, ChatRepository
+from app.services.diary_repo import DiaryEntry, DiaryRepository
+from app.services.search_repo import SearchRepository
+from app.utils.db_utils import (
+    SHARD_ID_BITS,
+    ensure_db_initialized,
+    shard_index,
+    shard_path,
+    shard_path_for_id,
+    shard_paths,
+)
+
+SHARDS = 4
+SESSIONS = [f"user-{i}" for i in range(24)]
+
+
+@pytest.fixture
+def sharded_db(tmp_path, monkeypatch):
+    path = tmp_path / "app.db"
+    monkeypatch.setattr(config, "DB_PATH", path)
+    monkeypatch.setattr(config, "DB_SHARDS", SHARDS)
+    ensure_db_initialized(str(path))
+    return str(path)
+
+
+def _raw_count(path, table, session_id):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+
+def test_shard_files_and_routing(sharded_db):
+    paths = shard_paths(sharded_db)
+    assert paths[0] == sharded_db and len(paths) == SHARDS
+    assert all(Path(p).exists() for p in paths)
+    assert {shard_index(s) for s in SESSIONS} == set(range(SHARDS))
+    assert shard_path(sharded_db, None) == sharded_db
+
+
+def test_sessions_live_in_one_shard_with_disjoint_ids(sharded_db):
+    repo = ChatRepository(sharded_db, write_behind=False)
+    for sid in SESSIONS:
+        for i in range(3):
+            repo.save_message(ChatLog(session_id=sid, role="user", text=f"{sid} 메시지 {i}"))
+
+    ids = set()
+    for sid in SESSIONS:
+        home = shard_path(sharded_db, sid)
+        for p in shard_paths(sharded_db):
+            assert _raw_count(p, "chat_logs", sid) == (3 if p == home else 0)
+        msgs = repo.get_session_messages(sid)
+        assert [m.text for m in msgs] == [f"{sid} 메시지 {i}" for i in range(3)]
+        for m in msgs:
+            assert shard_path_for_id(sharded_db, m.id) == home
+            assert m.id >> SHARD_ID_BITS == shard_index(sid)
+        ids.update(m.id for m in msgs)
+    assert len(ids) == len(SESSIONS) * 3
+
+
+def test_write_behind_batches_span_shards(sharded_db, monkeypatch):
+    monkeypatch.setattr(config, "CHAT_FLUSH_INTERVAL_MS", 60_000)
+    repo = ChatRepository(sharded_db, write_behind=True)
+    try:
+        for sid in SESSIONS:
+            repo.save_message(ChatLog(session_id=sid, role="user", text="배치"))
+        assert repo.flush() == len(SESSIONS)
+    finally:
+        repo.close()
+    for sid in SESSIONS:
+        assert _raw_count(shard_path(sharded_db, sid), "chat_logs", sid) == 1
+
+
+def test_diaries_and_search_are_routed(sharded_db):
+    diaries = DiaryRepository(sharded_db)
+    for sid in SESSIONS[:8]:
+        diaries.save_diary(DiaryEntry(session_id=sid, date="2026-10-18", content=f"{sid}의 산책 일기"))
+    for sid in SESSIONS[:8]:
+        d = diaries.get_diary_by_date(sid, "2026-10-18")
+        assert d.content == f"{sid}의 산책 일기"
+        assert shard_path_for_id(sharded_db, d.id) == shard_path(sharded_db, sid)
+
+    target = SESSIONS[5]
+    diaries.delete_diary(diaries.get_diary_by_date(target, "2026-10-18").id)
+    assert diaries.get_diary_by_date(target, "2026-10-18") is None
+    assert diaries.get_diary_by_date(SESSIONS[6], "2026-10-18") is not None
+
+    hits = SearchRepository(sharded_db).search("산책 일기", session_id=SESSIONS[3], types=("diary",))["diaries"]
+    assert [h["session_id"] for h in hits] == [SESSIONS[3]]